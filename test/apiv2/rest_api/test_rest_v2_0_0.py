@@ -4,33 +4,32 @@ import random
 import string
 import subprocess
 import sys
-import time
 import unittest
 from multiprocessing import Process
 
-import requests
 from dateutil.parser import parse
 
-from test.apiv2.rest_api import Podman
+from test.python.harness import (
+    SERVICE_URI,
+    WORKER,
+    LibpodClient,
+    get_session,
+    service_url,
+)
+from test.python.harness.schema import SchemaError, response_validator
 
-PODMAN_URL = "http://localhost:8080"
+PODMAN_URL = service_url(SERVICE_URI)
+ALPINE = "docker.io/library/alpine:latest"
 
-
-def _url(path):
-    return PODMAN_URL + "/v2.0.0/libpod" + path
+# keep-alive clients sharing one connection pool, one per API prefix
+API = LibpodClient(PODMAN_URL)
+COMPAT = API.compat
+ROOT = API.with_prefix("")
 
 
 def ctnr(path):
-    try:
-        r = requests.get(_url("/containers/json?all=true"))
-        ctnrs = json.loads(r.text)
-    except Exception as e:
-        msg = f"Bad container response: {e}"
-        if r is not None:
-            msg = msg + " " + r.text
-        sys.stderr.write(msg + "\n")
-        raise
-    return path.format(ctnrs[0]["Id"])
+    """Format path with the id of the container run by the last setUp()"""
+    return path.format(get_session().fixtures.latest("container").id)
 
 
 def validateObjectFields(buffer):
@@ -44,14 +43,14 @@ def validateObjectFields(buffer):
 
 
 class TestApi(unittest.TestCase):
+    session = None  # podman service and storage shared by all suites
     podman = None  # initialized podman configuration for tests
-    service = None  # podman service instance
 
     def setUp(self):
         super().setUp()
 
         try:
-            TestApi.podman.run("run", "alpine", "/bin/ls", check=True)
+            TestApi.session.run_container("alpine", "/bin/ls")
         except subprocess.CalledProcessError as e:
             if e.stdout:
                 sys.stdout.write("\nRun Stdout:\n" + e.stdout.decode("utf-8"))
@@ -63,128 +62,121 @@ class TestApi(unittest.TestCase):
     def setUpClass(cls):
         super().setUpClass()
 
-        TestApi.podman = Podman()
-        TestApi.service = TestApi.podman.open(
-            "system", "service", "tcp:localhost:8080", "--time=0"
-        )
-        # give the service some time to be ready...
-        time.sleep(2)
-
-        returncode = TestApi.service.poll()
-        if returncode is not None:
-            raise subprocess.CalledProcessError(returncode, "podman system service")
-
-        r = requests.post(_url("/images/pull?reference=docker.io%2Falpine%3Alatest"))
-        if r.status_code != 200:
-            raise subprocess.CalledProcessError(
-                r.status_code, f"podman images pull docker.io/alpine:latest {r.text}"
-            )
+        TestApi.session = get_session()
+        TestApi.podman = TestApi.session.podman
+        if TestApi.session.reset(images=[ALPINE]):
+            TestApi.podman.restore_image_from_cache(TestApi.session.api, ALPINE)
 
     @classmethod
     def tearDownClass(cls):
-        TestApi.service.terminate()
-        stdout, stderr = TestApi.service.communicate(timeout=0.5)
-        if stdout:
-            sys.stdout.write("\nService Stdout:\n" + stdout.decode("utf-8"))
-        if stderr:
-            sys.stderr.write("\nService Stderr:\n" + stderr.decode("utf-8"))
-        return super().tearDownClass()
+        TestApi.session.profile(cls.__name__)
+        super().tearDownClass()
+
+    def validateResponse(self, r, require=()):
+        """Check the JSON body of r against the swagger document of its operation
+
+        :param require: keys documented by Docker, of each element for lists
+        :return: decoded body
+        """
+        validate = response_validator(
+            r.request.method, r.request.path_url, r.status_code, require, api=API
+        )
+        try:
+            return validate(r.json())
+        except SchemaError as e:
+            self.fail(f"{validate.name}: {e}")
 
     def test_info(self):
-        r = requests.get(_url("/info"))
+        r = API.get("/info")
         self.assertEqual(r.status_code, 200)
         self.assertIsNotNone(r.content)
         _ = json.loads(r.text)
 
-        info = requests.get(PODMAN_URL + "/v1.40/info")
+        info = COMPAT.get("/info")
         self.assertEqual(info.status_code, 200, info.content)
         _ = json.loads(info.text)
 
     def test_events(self):
-        r = requests.get(_url("/events?stream=false"))
-        self.assertEqual(r.status_code, 200, r.text)
-        self.assertIsNotNone(r.content)
-
-        report = r.text.splitlines()
-        self.assertGreater(len(report), 0, "No events found!")
-        for line in report:
-            obj = json.loads(line)
-            # Actor.ID is uppercase for compatibility
-            self.assertIn("ID", obj["Actor"])
+        with API.stream_json("GET", "/events?stream=false") as events:
+            for obj in events:
+                # Actor.ID is uppercase for compatibility
+                self.assertIn("ID", obj["Actor"])
+        self.assertGreater(events.stats["objects"], 0, "No events found!")
 
     def test_containers(self):
-        r = requests.get(_url("/containers/json"), timeout=5)
+        r = API.get("/containers/json", timeout=5)
         self.assertEqual(r.status_code, 200, r.text)
         obj = json.loads(r.text)
         self.assertEqual(len(obj), 0)
 
     def test_containers_all(self):
-        r = requests.get(_url("/containers/json?all=true"))
+        r = API.get("/containers/json?all=true")
         self.assertEqual(r.status_code, 200, r.text)
         validateObjectFields(r.text)
 
     def test_inspect_container(self):
-        r = requests.get(_url(ctnr("/containers/{}/json")))
+        r = API.get(ctnr("/containers/{}/json"))
         self.assertEqual(r.status_code, 200, r.text)
         obj = validateObjectFields(r.content)
         _ = parse(obj["Created"])
 
     def test_stats(self):
-        r = requests.get(_url(ctnr("/containers/{}/stats?stream=false")))
+        r = API.get(ctnr("/containers/{}/stats?stream=false"))
         self.assertIn(r.status_code, (200, 409), r.text)
         if r.status_code == 200:
             validateObjectFields(r.text)
 
     def test_delete_containers(self):
-        r = requests.delete(_url(ctnr("/containers/{}")))
+        r = API.delete(ctnr("/containers/{}"))
         self.assertEqual(r.status_code, 204, r.text)
 
     def test_stop_containers(self):
-        r = requests.post(_url(ctnr("/containers/{}/start")))
+        r = API.post(ctnr("/containers/{}/start"))
         self.assertIn(r.status_code, (204, 304), r.text)
 
-        r = requests.post(_url(ctnr("/containers/{}/stop")))
+        r = API.post(ctnr("/containers/{}/stop"))
         self.assertIn(r.status_code, (204, 304), r.text)
 
     def test_start_containers(self):
-        r = requests.post(_url(ctnr("/containers/{}/stop")))
+        r = API.post(ctnr("/containers/{}/stop"))
         self.assertIn(r.status_code, (204, 304), r.text)
 
-        r = requests.post(_url(ctnr("/containers/{}/start")))
+        r = API.post(ctnr("/containers/{}/start"))
         self.assertIn(r.status_code, (204, 304), r.text)
 
     def test_restart_containers(self):
-        r = requests.post(_url(ctnr("/containers/{}/start")))
+        r = API.post(ctnr("/containers/{}/start"))
         self.assertIn(r.status_code, (204, 304), r.text)
 
-        r = requests.post(_url(ctnr("/containers/{}/restart")), timeout=5)
+        r = API.post(ctnr("/containers/{}/restart"), timeout=5)
         self.assertEqual(r.status_code, 204, r.text)
 
     def test_resize(self):
-        r = requests.post(_url(ctnr("/containers/{}/resize?h=43&w=80")))
+        r = API.post(ctnr("/containers/{}/resize?h=43&w=80"))
         self.assertIn(r.status_code, (200, 409), r.text)
         if r.status_code == 200:
             self.assertEqual(r.text, "", r.text)
 
     def test_attach_containers(self):
         self.skipTest("FIXME: Test timeouts")
-        r = requests.post(_url(ctnr("/containers/{}/attach")), timeout=5)
+        r = API.post(ctnr("/containers/{}/attach"), timeout=5)
         self.assertIn(r.status_code, (101, 500), r.text)
 
     def test_logs_containers(self):
-        r = requests.get(_url(ctnr("/containers/{}/logs?stdout=true")))
+        r = API.get(ctnr("/containers/{}/logs?stdout=true"))
         self.assertEqual(r.status_code, 200, r.text)
 
     # TODO Need to support Docker-py order of network/container creates
     def test_post_create_compat_connect(self):
         """Create network and container then connect to network"""
-        net_default = requests.post(
-            PODMAN_URL + "/v1.40/networks/create", json={"Name": "TestDefaultNetwork"}
+        net_default = COMPAT.post(
+            "/networks/create", json={"Name": "TestDefaultNetwork"}
         )
         self.assertEqual(net_default.status_code, 201, net_default.text)
+        TestApi.session.record("network", net_default, name="TestDefaultNetwork")
 
-        create = requests.post(
-            PODMAN_URL + "/v1.40/containers/create?name=postCreateConnect",
+        create = COMPAT.post(
+            "/containers/create?name=postCreateConnect",
             json={
                 "Cmd": ["top"],
                 "Image": "alpine:latest",
@@ -207,20 +199,21 @@ class TestApi(unittest.TestCase):
             },
         )
         self.assertEqual(create.status_code, 201, create.text)
+        TestApi.session.record("container", create, name="postCreateConnect")
         payload = json.loads(create.text)
         self.assertIsNotNone(payload["Id"])
 
-        start = requests.post(PODMAN_URL + f"/v1.40/containers/{payload['Id']}/start")
+        start = COMPAT.post(f"/containers/{payload['Id']}/start")
         self.assertEqual(start.status_code, 204, start.text)
 
-        connect = requests.post(
-            PODMAN_URL + "/v1.40/networks/TestDefaultNetwork/connect",
+        connect = COMPAT.post(
+            "/networks/TestDefaultNetwork/connect",
             json={"Container": payload["Id"]},
         )
         self.assertEqual(connect.status_code, 200, connect.text)
         self.assertEqual(connect.text, "OK\n")
 
-        inspect = requests.get(f"{PODMAN_URL}/v1.40/containers/{payload['Id']}/json")
+        inspect = COMPAT.get(f"/containers/{payload['Id']}/json")
         self.assertEqual(inspect.status_code, 200, inspect.text)
 
         payload = json.loads(inspect.text)
@@ -243,13 +236,12 @@ class TestApi(unittest.TestCase):
 
     def test_post_create_compat(self):
         """Create network and connect container during create"""
-        net = requests.post(
-            PODMAN_URL + "/v1.40/networks/create", json={"Name": "TestNetwork"}
-        )
+        net = COMPAT.post("/networks/create", json={"Name": "TestNetwork"})
         self.assertEqual(net.status_code, 201, net.text)
+        TestApi.session.record("network", net, name="TestNetwork")
 
-        create = requests.post(
-            PODMAN_URL + "/v1.40/containers/create?name=postCreate",
+        create = COMPAT.post(
+            "/containers/create?name=postCreate",
             json={
                 "Cmd": ["date"],
                 "Image": "alpine:latest",
@@ -258,10 +250,11 @@ class TestApi(unittest.TestCase):
             },
         )
         self.assertEqual(create.status_code, 201, create.text)
+        TestApi.session.record("container", create, name="postCreate")
         payload = json.loads(create.text)
         self.assertIsNotNone(payload["Id"])
 
-        inspect = requests.get(f"{PODMAN_URL}/v1.40/containers/{payload['Id']}/json")
+        inspect = COMPAT.get(f"/containers/{payload['Id']}/json")
         self.assertEqual(inspect.status_code, 200, inspect.text)
         payload = json.loads(inspect.text)
         self.assertFalse(payload["Config"].get("NetworkDisabled", False))
@@ -271,87 +264,84 @@ class TestApi(unittest.TestCase):
         )
 
     def test_commit(self):
-        r = requests.post(_url(ctnr("/commit?container={}")))
+        r = API.post(ctnr("/commit?container={}"))
         self.assertEqual(r.status_code, 200, r.text)
+        TestApi.session.record("image", r)
 
         obj = json.loads(r.content)
         self.assertIsInstance(obj, dict)
         self.assertIn("Id", obj)
 
     def test_images_compat(self):
-        r = requests.get(PODMAN_URL + "/v1.40/images/json")
+        r = COMPAT.get("/images/json")
         self.assertEqual(r.status_code, 200, r.text)
 
         # See https://docs.docker.com/engine/api/v1.40/#operation/ImageList
-        required_keys = (
-            "Id",
-            "ParentId",
-            "RepoTags",
-            "RepoDigests",
-            "Created",
-            "Size",
-            "SharedSize",
-            "VirtualSize",
-            "Labels",
-            "Containers",
+        objs = self.validateResponse(
+            r,
+            require=(
+                "Id",
+                "ParentId",
+                "RepoTags",
+                "RepoDigests",
+                "Created",
+                "Size",
+                "SharedSize",
+                "VirtualSize",
+                "Labels",
+                "Containers",
+            ),
         )
-        objs = json.loads(r.content)
         self.assertIn(type(objs), (list,))
-        for o in objs:
-            self.assertIsInstance(o, dict)
-            for k in required_keys:
-                self.assertIn(k, o)
 
     def test_inspect_image_compat(self):
-        r = requests.get(PODMAN_URL + "/v1.40/images/alpine/json")
+        r = COMPAT.get("/images/alpine/json")
         self.assertEqual(r.status_code, 200, r.text)
 
         # See https://docs.docker.com/engine/api/v1.40/#operation/ImageInspect
-        required_keys = (
-            "Id",
-            "Parent",
-            "Comment",
-            "Created",
-            "Container",
-            "DockerVersion",
-            "Author",
-            "Architecture",
-            "Os",
-            "Size",
-            "VirtualSize",
-            "GraphDriver",
-            "RootFS",
-            "Metadata",
+        obj = self.validateResponse(
+            r,
+            require=(
+                "Id",
+                "Parent",
+                "Comment",
+                "Created",
+                "Container",
+                "DockerVersion",
+                "Author",
+                "Architecture",
+                "Os",
+                "Size",
+                "VirtualSize",
+                "GraphDriver",
+                "RootFS",
+                "Metadata",
+            ),
         )
-
-        obj = json.loads(r.content)
         self.assertIn(type(obj), (dict,))
-        for k in required_keys:
-            self.assertIn(k, obj)
         _ = parse(obj["Created"])
 
     def test_delete_image_compat(self):
-        r = requests.delete(PODMAN_URL + "/v1.40/images/alpine?force=true")
+        r = COMPAT.delete("/images/alpine?force=true")
         self.assertEqual(r.status_code, 200, r.text)
         obj = json.loads(r.content)
         self.assertIn(type(obj), (list,))
 
     def test_pull(self):
-        r = requests.post(_url("/images/pull?reference=alpine"), timeout=15)
-        self.assertEqual(r.status_code, 200, r.status_code)
-        text = r.text
         keys = {
             "error": False,
             "id": False,
             "images": False,
             "stream": False,
         }
-        # Read and record stanza's from pull
-        for line in str.splitlines(text):
-            obj = json.loads(line)
-            key_list = list(obj.keys())
-            for k in key_list:
-                keys[k] = True
+        # Read and record stanza's from pull as they arrive
+        with API.stream_json(
+            "POST", "/images/pull?reference=alpine", timeout=15
+        ) as pull:
+            for obj in pull:
+                for k in obj.keys():
+                    keys[k] = True
+        self.assertIsNotNone(pull.stats["time_to_first"])
 
         self.assertFalse(keys["error"], "Expected no errors")
         self.assertTrue(keys["id"], "Expected to find id stanza")
@@ -359,19 +349,19 @@ class TestApi(unittest.TestCase):
         self.assertTrue(keys["stream"], "Expected to find stream progress stanza's")
 
     def test_search_compat(self):
-        url = PODMAN_URL + "/v1.40/images/search"
+        url = "/images/search"
 
         # Had issues with this test hanging when repositories not happy
         def do_search1():
             payload = {"term": "alpine"}
-            r = requests.get(url, params=payload, timeout=5)
+            r = COMPAT.get(url, params=payload, timeout=5)
             self.assertEqual(r.status_code, 200, r.text)
             objs = json.loads(r.text)
             self.assertIn(type(objs), (list,))
 
         def do_search2():
             payload = {"term": "alpine", "limit": 1}
-            r = requests.get(url, params=payload, timeout=5)
+            r = COMPAT.get(url, params=payload, timeout=5)
             self.assertEqual(r.status_code, 200, r.text)
             objs = json.loads(r.text)
             self.assertIn(type(objs), (list,))
@@ -379,7 +369,7 @@ class TestApi(unittest.TestCase):
 
         def do_search3():
             payload = {"term": "alpine", "filters": '{"is-official":["true"]}'}
-            r = requests.get(url, params=payload, timeout=5)
+            r = COMPAT.get(url, params=payload, timeout=5)
             self.assertEqual(r.status_code, 200, r.text)
             objs = json.loads(r.text)
             self.assertIn(type(objs), (list,))
@@ -389,13 +379,13 @@ class TestApi(unittest.TestCase):
         def do_search4():
             headers = {"X-Registry-Auth": "null"}
             payload = {"term": "alpine"}
-            r = requests.get(url, params=payload, headers=headers, timeout=5)
+            r = COMPAT.get(url, params=payload, headers=headers, timeout=5)
             self.assertEqual(r.status_code, 200, r.text)
 
         def do_search5():
             headers = {"X-Registry-Auth": "invalid value"}
             payload = {"term": "alpine"}
-            r = requests.get(url, params=payload, headers=headers, timeout=5)
+            r = COMPAT.get(url, params=payload, headers=headers, timeout=5)
             self.assertEqual(r.status_code, 400, r.text)
 
         search_methods = [do_search1, do_search2, do_search3, do_search4, do_search5]
@@ -419,39 +409,35 @@ class TestApi(unittest.TestCase):
             for k in required_headers:
                 self.assertIn(k, req.headers)
 
-        r = requests.get(PODMAN_URL + "/_ping")
+        r = ROOT.get("/_ping")
         self.assertEqual(r.status_code, 200, r.text)
         self.assertEqual(r.text, "OK")
         check_headers(r)
 
-        r = requests.head(PODMAN_URL + "/_ping")
+        r = ROOT.head("/_ping")
         self.assertEqual(r.status_code, 200, r.text)
         self.assertEqual(r.text, "")
         check_headers(r)
 
-        r = requests.get(_url("/_ping"))
+        r = API.get("/_ping")
         self.assertEqual(r.status_code, 200, r.text)
         self.assertEqual(r.text, "OK")
         check_headers(r)
 
-        r = requests.head(_url("/_ping"))
+        r = API.head("/_ping")
         self.assertEqual(r.status_code, 200, r.text)
         self.assertEqual(r.text, "")
         check_headers(r)
 
     def test_history_compat(self):
-        r = requests.get(PODMAN_URL + "/v1.40/images/alpine/history")
+        r = COMPAT.get("/images/alpine/history")
         self.assertEqual(r.status_code, 200, r.text)
 
         # See https://docs.docker.com/engine/api/v1.40/#operation/ImageHistory
-        required_keys = ("Id", "Created", "CreatedBy", "Tags", "Size", "Comment")
-
-        objs = json.loads(r.content)
+        objs = self.validateResponse(
+            r, require=("Id", "Created", "CreatedBy", "Tags", "Size", "Comment")
+        )
         self.assertIn(type(objs), (list,))
-        for o in objs:
-            self.assertIsInstance(o, dict)
-            for k in required_keys:
-                self.assertIn(k, o)
 
     def test_network_compat(self):
         name = "Network_" + "".join(
@@ -460,17 +446,16 @@ class TestApi(unittest.TestCase):
 
         # Cannot test for 0 existing networks because default "podman" network always exists
 
-        create = requests.post(
-            PODMAN_URL + "/v1.40/networks/create", json={"Name": name}
-        )
+        create = COMPAT.post("/networks/create", json={"Name": name})
         self.assertEqual(create.status_code, 201, create.content)
+        TestApi.session.record("network", create, name=name)
         obj = json.loads(create.content)
         self.assertIn(type(obj), (dict,))
         self.assertIn("Id", obj)
         ident = obj["Id"]
         self.assertNotEqual(name, ident)
 
-        ls = requests.get(PODMAN_URL + "/v1.40/networks")
+        ls = COMPAT.get("/networks")
         self.assertEqual(ls.status_code, 200, ls.content)
         objs = json.loads(ls.content)
         self.assertIn(type(objs), (list,))
@@ -481,26 +466,25 @@ class TestApi(unittest.TestCase):
                 found = True
         self.assertTrue(found, f"Network {name} not found")
 
-        inspect = requests.get(PODMAN_URL + f"/v1.40/networks/{ident}")
+        inspect = COMPAT.get(f"/networks/{ident}")
         self.assertEqual(inspect.status_code, 200, inspect.content)
         obj = json.loads(create.content)
         self.assertIn(type(obj), (dict,))
 
-        inspect = requests.delete(PODMAN_URL + f"/v1.40/networks/{ident}")
+        inspect = COMPAT.delete(f"/networks/{ident}")
         self.assertEqual(inspect.status_code, 204, inspect.content)
-        inspect = requests.get(PODMAN_URL + f"/v1.40/networks/{ident}")
+        inspect = COMPAT.get(f"/networks/{ident}")
         self.assertEqual(inspect.status_code, 404, inspect.content)
 
         # network prune
         prune_name = "Network_" + "".join(
             random.choice(string.ascii_letters) for i in range(10)
         )
-        prune_create = requests.post(
-            PODMAN_URL + "/v1.40/networks/create", json={"Name": prune_name}
-        )
+        prune_create = COMPAT.post("/networks/create", json={"Name": prune_name})
         self.assertEqual(create.status_code, 201, prune_create.content)
+        TestApi.session.record("network", prune_create, name=prune_name)
 
-        prune = requests.post(PODMAN_URL + "/v1.40/networks/prune")
+        prune = COMPAT.post("/networks/prune")
         self.assertEqual(prune.status_code, 200, prune.content)
         obj = json.loads(prune.content)
         self.assertTrue(prune_name in obj["NetworksDeleted"])
@@ -510,24 +494,16 @@ class TestApi(unittest.TestCase):
             random.choice(string.ascii_letters) for i in range(10)
         )
 
-        ls = requests.get(PODMAN_URL + "/v1.40/volumes")
+        ls = COMPAT.get("/volumes")
         self.assertEqual(ls.status_code, 200, ls.content)
 
         # See https://docs.docker.com/engine/api/v1.40/#operation/VolumeList
-        required_keys = (
-            "Volumes",
-            "Warnings",
-        )
-
-        obj = json.loads(ls.content)
+        obj = self.validateResponse(ls, require=("Volumes", "Warnings"))
         self.assertIn(type(obj), (dict,))
-        for k in required_keys:
-            self.assertIn(k, obj)
 
-        create = requests.post(
-            PODMAN_URL + "/v1.40/volumes/create", json={"Name": name}
-        )
+        create = COMPAT.post("/volumes/create", json={"Name": name})
         self.assertEqual(create.status_code, 201, create.content)
+        TestApi.session.record("volume", create, name=name)
 
         # See https://docs.docker.com/engine/api/v1.40/#operation/VolumeCreate
         # and https://docs.docker.com/engine/api/v1.40/#operation/VolumeInspect
@@ -540,39 +516,36 @@ class TestApi(unittest.TestCase):
             "Options",
         )
 
-        obj = json.loads(create.content)
+        obj = self.validateResponse(create, require=required_keys)
         self.assertIn(type(obj), (dict,))
-        for k in required_keys:
-            self.assertIn(k, obj)
         self.assertEqual(obj["Name"], name)
 
-        inspect = requests.get(PODMAN_URL + f"/v1.40/volumes/{name}")
+        inspect = COMPAT.get(f"/volumes/{name}")
         self.assertEqual(inspect.status_code, 200, inspect.content)
 
-        obj = json.loads(create.content)
+        obj = self.validateResponse(inspect, require=required_keys)
         self.assertIn(type(obj), (dict,))
-        for k in required_keys:
-            self.assertIn(k, obj)
 
-        rm = requests.delete(PODMAN_URL + f"/v1.40/volumes/{name}")
+        rm = COMPAT.delete(f"/volumes/{name}")
         self.assertEqual(rm.status_code, 204, rm.content)
 
         # recreate volume with data and then prune it
-        r = requests.post(PODMAN_URL + "/v1.40/volumes/create", json={"Name": name})
+        r = COMPAT.post("/volumes/create", json={"Name": name})
         self.assertEqual(create.status_code, 201, create.content)
+        TestApi.session.record("volume", r, name=name)
         create = json.loads(r.content)
         with open(os.path.join(create["Mountpoint"], "test_prune"), "w") as file:
             file.writelines(["This is a test\n", "This is a good test\n"])
 
-        prune = requests.post(PODMAN_URL + "/v1.40/volumes/prune")
+        prune = COMPAT.post("/volumes/prune")
         self.assertEqual(prune.status_code, 200, prune.content)
         payload = json.loads(prune.content)
         self.assertIn(name, payload["VolumesDeleted"])
         self.assertGreater(payload["SpaceReclaimed"], 0)
 
     def test_auth_compat(self):
-        r = requests.post(
-            PODMAN_URL + "/v1.40/auth",
+        r = COMPAT.post(
+            "/auth",
             json={
                 "username": "bozo",
                 "password": "wedontneednopasswords",
@@ -582,14 +555,14 @@ class TestApi(unittest.TestCase):
         self.assertEqual(r.status_code, 404, r.content)
 
     def test_version(self):
-        r = requests.get(PODMAN_URL + "/v1.40/version")
+        r = COMPAT.get("/version")
         self.assertEqual(r.status_code, 200, r.content)
 
-        r = requests.get(_url("/version"))
+        r = API.get("/version")
         self.assertEqual(r.status_code, 200, r.content)
 
     def test_df_compat(self):
-        r = requests.get(PODMAN_URL + "/v1.40/system/df")
+        r = COMPAT.get("/system/df")
         self.assertEqual(r.status_code, 200, r.content)
 
         obj = json.loads(r.content)
@@ -601,8 +574,8 @@ class TestApi(unittest.TestCase):
     def test_prune_compat(self):
         name = "Ctnr_" + "".join(random.choice(string.ascii_letters) for i in range(10))
 
-        r = requests.post(
-            PODMAN_URL + f"/v1.40/containers/create?name={name}",
+        r = COMPAT.post(
+            f"/containers/create?name={name}",
             json={
                 "Cmd": ["cp", "/etc/motd", "/motd.size_test"],
                 "Image": "alpine:latest",
@@ -610,29 +583,30 @@ class TestApi(unittest.TestCase):
             },
         )
         self.assertEqual(r.status_code, 201, r.text)
+        TestApi.session.record("container", r, name=name)
         create = json.loads(r.text)
 
-        r = requests.post(PODMAN_URL + f"/v1.40/containers/{create['Id']}/start")
+        r = COMPAT.post(f"/containers/{create['Id']}/start")
         self.assertEqual(r.status_code, 204, r.text)
 
-        r = requests.post(PODMAN_URL + f"/v1.40/containers/{create['Id']}/wait")
+        r = COMPAT.post(f"/containers/{create['Id']}/wait")
         self.assertEqual(r.status_code, 200, r.text)
         wait = json.loads(r.text)
         self.assertEqual(wait["StatusCode"], 0, wait["Error"]["Message"])
 
-        prune = requests.post(PODMAN_URL + "/v1.40/containers/prune")
+        prune = COMPAT.post("/containers/prune")
         self.assertEqual(prune.status_code, 200, prune.status_code)
         prune_payload = json.loads(prune.text)
         self.assertGreater(prune_payload["SpaceReclaimed"], 0)
         self.assertIn(create["Id"], prune_payload["ContainersDeleted"])
 
         # Delete any orphaned containers
-        r = requests.get(PODMAN_URL + "/v1.40/containers/json?all=true")
+        r = COMPAT.get("/containers/json?all=true")
         self.assertEqual(r.status_code, 200, r.text)
         for ctnr in json.loads(r.text):
-            requests.delete(PODMAN_URL + f"/v1.40/containers/{ctnr['Id']}?force=true")
+            COMPAT.delete(f"/containers/{ctnr['Id']}?force=true")
 
-        prune = requests.post(PODMAN_URL + "/v1.40/images/prune")
+        prune = COMPAT.post("/images/prune")
         self.assertEqual(prune.status_code, 200, prune.text)
         prune_payload = json.loads(prune.text)
         self.assertGreater(prune_payload["SpaceReclaimed"], 0)
@@ -643,64 +617,53 @@ class TestApi(unittest.TestCase):
         self.assertIsNotNone(prune_payload["ImagesDeleted"][1]["Deleted"])
 
     def test_status_compat(self):
-        r = requests.post(
-            PODMAN_URL + "/v1.40/containers/create?name=topcontainer",
+        waiter = TestApi.session.waiter
+
+        def status(container_id):
+            r = COMPAT.get(
+                "/containers/json",
+                params={"all": "true", "filters": f'{{"id":["{container_id}"]}}'},
+            )
+            self.assertEqual(r.status_code, 200, r.text)
+            return str(json.loads(r.text)[0]["Status"])
+
+        r = COMPAT.post(
+            "/containers/create?name=topcontainer",
             json={"Cmd": ["top"], "Image": "alpine:latest"},
         )
         self.assertEqual(r.status_code, 201, r.text)
+        TestApi.session.record("container", r, name="topcontainer")
         payload = json.loads(r.text)
         container_id = payload["Id"]
         self.assertIsNotNone(container_id)
+        self.assertEqual(status(container_id), "Created")
 
-        r = requests.get(
-            PODMAN_URL + "/v1.40/containers/json",
-            params={"all": "true", "filters": f'{{"id":["{container_id}"]}}'},
-        )
-        self.assertEqual(r.status_code, 200, r.text)
-        payload = json.loads(r.text)
-        self.assertEqual(payload[0]["Status"], "Created")
-
-        r = requests.post(PODMAN_URL + f"/v1.40/containers/{container_id}/start")
+        r = COMPAT.post(f"/containers/{container_id}/start")
         self.assertEqual(r.status_code, 204, r.text)
+        waiter.wait_for(container_id, "running")
+        self.assertTrue(status(container_id).startswith("Up"))
 
-        r = requests.get(
-            PODMAN_URL + "/v1.40/containers/json",
-            params={"all": "true", "filters": f'{{"id":["{container_id}"]}}'},
-        )
-        self.assertEqual(r.status_code, 200, r.text)
-        payload = json.loads(r.text)
-        self.assertTrue(str(payload[0]["Status"]).startswith("Up"))
-
-        r = requests.post(PODMAN_URL + f"/v1.40/containers/{container_id}/pause")
+        r = COMPAT.post(f"/containers/{container_id}/pause")
         self.assertEqual(r.status_code, 204, r.text)
+        waiter.wait_for(container_id, "paused")
+        paused = status(container_id)
+        self.assertTrue(paused.startswith("Up"))
+        self.assertTrue(paused.endswith("(Paused)"))
 
-        r = requests.get(
-            PODMAN_URL + "/v1.40/containers/json",
-            params={"all": "true", "filters": f'{{"id":["{container_id}"]}}'},
-        )
-        self.assertEqual(r.status_code, 200, r.text)
-        payload = json.loads(r.text)
-        self.assertTrue(str(payload[0]["Status"]).startswith("Up"))
-        self.assertTrue(str(payload[0]["Status"]).endswith("(Paused)"))
-
-        r = requests.post(PODMAN_URL + f"/v1.40/containers/{container_id}/unpause")
+        r = COMPAT.post(f"/containers/{container_id}/unpause")
         self.assertEqual(r.status_code, 204, r.text)
-        r = requests.post(PODMAN_URL + f"/v1.40/containers/{container_id}/stop")
+        r = COMPAT.post(f"/containers/{container_id}/stop")
         self.assertEqual(r.status_code, 204, r.text)
+        waiter.wait_for(container_id, ("stopped", "exited"))
+        self.assertTrue(status(container_id).startswith("Exited"))
 
-        r = requests.get(
-            PODMAN_URL + "/v1.40/containers/json",
-            params={"all": "true", "filters": f'{{"id":["{container_id}"]}}'},
-        )
-        self.assertEqual(r.status_code, 200, r.text)
-        payload = json.loads(r.text)
-        self.assertTrue(str(payload[0]["Status"]).startswith("Exited"))
-
-        r = requests.delete(PODMAN_URL + f"/v1.40/containers/{container_id}")
+        r = COMPAT.delete(f"/containers/{container_id}")
         self.assertEqual(r.status_code, 204, r.text)
 
     def test_pod_start_conflict(self):
         """Verify issue #8865"""
+        # sharded workers run this test concurrently on one host
+        port = 8889 + WORKER
 
         pod_name = list()
         pod_name.append(
@@ -710,19 +673,20 @@ class TestApi(unittest.TestCase):
             "Pod_" + "".join(random.choice(string.ascii_letters) for i in range(10))
         )
 
-        r = requests.post(
-            _url("/pods/create"),
+        r = API.post(
+            "/pods/create",
             json={
                 "name": pod_name[0],
                 "no_infra": False,
                 "portmappings": [
-                    {"host_ip": "127.0.0.1", "host_port": 8889, "container_port": 89}
+                    {"host_ip": "127.0.0.1", "host_port": port, "container_port": 89}
                 ],
             },
         )
         self.assertEqual(r.status_code, 201, r.text)
-        r = requests.post(
-            _url("/containers/create"),
+        TestApi.session.record("pod", r, name=pod_name[0])
+        r = API.post(
+            "/containers/create",
             json={
                 "pod": pod_name[0],
                 "image": "docker.io/alpine:latest",
@@ -730,20 +694,22 @@ class TestApi(unittest.TestCase):
             },
         )
         self.assertEqual(r.status_code, 201, r.text)
+        TestApi.session.record("container", r)
 
-        r = requests.post(
-            _url("/pods/create"),
+        r = API.post(
+            "/pods/create",
             json={
                 "name": pod_name[1],
                 "no_infra": False,
                 "portmappings": [
-                    {"host_ip": "127.0.0.1", "host_port": 8889, "container_port": 89}
+                    {"host_ip": "127.0.0.1", "host_port": port, "container_port": 89}
                 ],
             },
         )
         self.assertEqual(r.status_code, 201, r.text)
-        r = requests.post(
-            _url("/containers/create"),
+        TestApi.session.record("pod", r, name=pod_name[1])
+        r = API.post(
+            "/containers/create",
             json={
                 "pod": pod_name[1],
                 "image": "docker.io/alpine:latest",
@@ -751,11 +717,12 @@ class TestApi(unittest.TestCase):
             },
         )
         self.assertEqual(r.status_code, 201, r.text)
+        TestApi.session.record("container", r)
 
-        r = requests.post(_url(f"/pods/{pod_name[0]}/start"))
+        r = API.post(f"/pods/{pod_name[0]}/start")
         self.assertEqual(r.status_code, 200, r.text)
 
-        r = requests.post(_url(f"/pods/{pod_name[1]}/start"))
+        r = API.post(f"/pods/{pod_name[1]}/start")
         self.assertEqual(r.status_code, 409, r.text)
 
         start = json.loads(r.text)
@@ -1,11 +1,7 @@
 import json
-import os
 import shlex
 import signal
 import string
-import subprocess
-import sys
-import time
 import unittest
 from collections.abc import Iterable
 from multiprocessing import Process
@@ -13,81 +9,40 @@ from multiprocessing import Process
 import requests
 from dateutil.parser import parse
 
-PODMAN_URL = "http://localhost:8080"
+from test.python.harness import SERVICE_URI, get_session, service_url
+
+PODMAN_URL = service_url(SERVICE_URI)
 
 
 def _url(path):
     return PODMAN_URL + "/v1.0.0/libpod" + path
 
 
-def podman():
-    binary = os.getenv("PODMAN_BINARY")
-    if binary is None:
-        binary = "bin/podman"
-    return binary
-
-
 def ctnr(path):
-    r = requests.get(_url("/containers/json?all=true"))
-    try:
-        ctnrs = json.loads(r.text)
-    except Exception as e:
-        sys.stderr.write("Bad container response: {}/{}".format(r.text, e))
-        raise e
-    return path.format(ctnrs[0]["Id"])
+    """Format path with the id of the container run by the last setUp()"""
+    return path.format(get_session().fixtures.latest("container").id)
 
 
 class TestApi(unittest.TestCase):
-    podman = None
+    session = None  # podman service and storage shared by all suites
+    podman = None  # initialized podman configuration for tests
 
     def setUp(self):
         super().setUp()
-        if TestApi.podman.poll() is not None:
-            sys.stderr.write("podman service returned {}", TestApi.podman.returncode)
-            sys.exit(2)
         requests.get(_url("/images/create?fromSrc=docker.io%2Falpine%3Alatest"))
         # calling out to podman is easier than the API for running a container
-        subprocess.run(
-            [podman(), "run", "alpine", "/bin/ls"],
-            check=True,
-            stdout=subprocess.DEVNULL,
-            stderr=subprocess.DEVNULL,
-        )
+        TestApi.session.run_container("alpine", "/bin/ls")
 
     @classmethod
     def setUpClass(cls):
         super().setUpClass()
-
-        TestApi.podman = subprocess.Popen(
-            [
-                podman(),
-                "system",
-                "service",
-                "tcp:localhost:8080",
-                "--log-level=debug",
-                "--time=0",
-            ],
-            shell=False,
-            stdin=subprocess.DEVNULL,
-            stdout=subprocess.DEVNULL,
-            stderr=subprocess.DEVNULL,
-        )
-        time.sleep(2)
+        TestApi.session = get_session()
+        TestApi.podman = TestApi.session.podman
 
     @classmethod
     def tearDownClass(cls):
-        TestApi.podman.terminate()
-        stdout, stderr = TestApi.podman.communicate(timeout=0.5)
-        if stdout:
-            print("\nService Stdout:\n" + stdout.decode("utf-8"))
-        if stderr:
-            print("\nService Stderr:\n" + stderr.decode("utf-8"))
-
-        if TestApi.podman.returncode > 0:
-            sys.stderr.write("podman exited with error code {}\n".format(TestApi.podman.returncode))
-            sys.exit(2)
-
-        return super().tearDownClass()
+        TestApi.session.profile(cls.__name__)
+        super().tearDownClass()
 
     def test_info(self):
         r = requests.get(_url("/info"))
@@ -175,6 +130,7 @@ class TestApi(unittest.TestCase):
     def test_commit(self):
         r = requests.post(_url(ctnr("/commit?container={}")))
         self.assertEqual(r.status_code, 200, r.text)
+        TestApi.session.record("image", r)
         self.validateObjectFields(r.text)
 
     def test_images(self):
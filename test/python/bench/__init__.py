@@ -0,0 +1,176 @@
+"""Benchmarks driving `podman system service` through the python test harness
+
+Each module is runnable, e.g. python3 -m test.python.bench.transport, and
+writes its report as JSON.
+"""
+import contextlib
+import io
+import json
+import os
+import sys
+import threading
+import zlib
+
+from test.python.harness import Podman, PodmanService
+from test.python.harness.metrics import percentile
+from test.python.harness.profiling import PROFILE_DIR, Profiler
+
+
+def summarize(latencies, elapsed):
+    """Summarize request latencies
+
+    :param latencies: seconds per request
+    :param elapsed: wall clock seconds for all requests
+    :return: dict with count, rps and p50/p90/p99/max/mean in milliseconds
+    """
+    samples = sorted(latencies)
+    count = len(samples)
+
+    def ms(value):
+        return None if value is None else round(value * 1000.0, 3)
+
+    return {
+        "count": count,
+        "rps": round(count / elapsed, 1) if elapsed > 0 else None,
+        "p50_ms": ms(percentile(samples, 50)),
+        "p90_ms": ms(percentile(samples, 90)),
+        "p99_ms": ms(percentile(samples, 99)),
+        "max_ms": ms(samples[-1] if samples else None),
+        "mean_ms": ms(sum(samples) / count if count else None),
+    }
+
+
+def write_report(report, path=None):
+    """Write report as JSON to path, or stdout when path is None or "-" """
+    if path in (None, "-"):
+        json.dump(report, sys.stdout, indent=2)
+        sys.stdout.write("\n")
+        return
+
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2)
+
+
+def process_cpu_seconds(pid="self"):
+    """Return user plus system CPU seconds consumed by a process, from /proc"""
+    with open(f"/proc/{pid}/stat") as f:
+        # the command may contain blanks, fields are counted after it
+        fields = f.read().rsplit(")", 1)[1].split()
+    return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+
+
+def process_rss(pid="self", field="VmRSS"):
+    """Return the resident set size of a process in bytes, from /proc
+
+    :param field: line of /proc/<pid>/status, RssAnon leaves out mapped files
+    """
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            if line.startswith(field + ":"):
+                return int(line.split()[1]) * 1024
+    return None
+
+
+class Sampler(object):
+    """Sample the resident memory and CPU time of a process in a thread
+
+    with Sampler(service.process.pid) as sampler:
+        ...
+    sampler.peak_rss, sampler.cpu_seconds
+    """
+
+    def __init__(self, pid, interval=0.05, field="VmRSS"):
+        self.pid = pid
+        self.interval = interval
+        self.field = field
+        self.peak_rss = 0
+        self.cpu_seconds = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def __enter__(self):
+        self._cpu = process_cpu_seconds(self.pid)
+        self.peak_rss = process_rss(self.pid, self.field) or 0
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._stop.set()
+        self._thread.join()
+        self.cpu_seconds = round(process_cpu_seconds(self.pid) - self._cpu, 3)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.peak_rss = max(
+                    self.peak_rss, process_rss(self.pid, self.field) or 0
+                )
+            except FileNotFoundError:
+                # the process exited
+                return
+
+
+# SyntheticFile alternates blocks of these random bytes and of zeros,
+# compressing about 2:1 as file systems of real images do
+_POOL = os.urandom(1024 * 1024)
+_BLOCK = 32 * 1024
+
+
+class SyntheticFile(io.RawIOBase):
+    """Readable file of size generated bytes, without holding them
+
+    :param size: bytes of the file
+    :param salt: str making the content differ between files
+    """
+
+    def __init__(self, size, salt=""):
+        self.size = size
+        self.position = 0
+        self.offset = zlib.crc32(salt.encode())
+
+    def readable(self):
+        return True
+
+    def read(self, n=-1):
+        end = self.size if n is None or n < 0 else min(self.size, self.position + n)
+        chunks = []
+        while self.position < end:
+            block, within = divmod(self.position, _BLOCK)
+            length = min(_BLOCK - within, end - self.position)
+            if block % 2:
+                chunks.append(bytes(length))
+            else:
+                start = (self.offset + block * _BLOCK + within) % (len(_POOL) - _BLOCK)
+                chunks.append(_POOL[start : start + length])
+            self.position += length
+        return b"".join(chunks)
+
+
+@contextlib.contextmanager
+def podman_service(
+    uri="tcp:127.0.0.1:8080", prefix="podman_bench_", profile=PROFILE_DIR, **kwargs
+):
+    """Run a service on a scratch storage root for the duration of a benchmark
+
+    :param uri: listener, e.g. tcp:127.0.0.1:8080 or unix:///tmp/podman.sock
+    :param profile: directory receiving CPU and heap profiles of the service
+    :param kwargs: passed to Podman(), e.g. storage_driver
+    :return: context manager yielding the started PodmanService
+    """
+    podman = Podman(prefix=prefix, **kwargs)
+    profiler = Profiler(profile, binary=podman.cmd[0]) if profile else None
+    try:
+        with PodmanService(podman, uri, profiler=profiler) as service:
+            yield service
+    finally:
+        if profiler is not None:
+            profiler.summarize()
+        podman.tear_down()
+
+
+async def ensure_image(client, reference):
+    """Pull reference through an AsyncLibpodClient unless it is already in storage"""
+    r = await client.get(f"/images/{reference}/json")
+    if r.status == 404:
+        await client.pull_image(reference)
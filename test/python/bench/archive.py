@@ -0,0 +1,178 @@
+"""Time copying trees into and out of a running container
+
+Each of --trees, e.g. 1x1GiB for one file of 1GiB, 100000x1KiB for
+100000 files of 1KiB or 1000x4KiB/64 for 1000 files spread over a chain
+of 64 nested directories, is generated as a tar stream
+(harness/tarstream.py) and sent to PUT /containers/{id}/archive, then
+fetched back with GET and digested as it arrives. Nothing is written to
+disk on the client, copies go to /tmp of an alpine container running
+top, whose storage root holds them.
+
+The report holds per copy MB/s, files/s, the peak anonymous memory the
+client gained and the service's peak resident memory and CPU seconds.
+
+    python3 -m test.python.bench.archive --trees 1x1GiB,100000x1KiB,1000x4KiB/64 --output archive.json
+"""
+import argparse
+import sys
+import time
+
+from test.python.docker.compat import constant
+from test.python.harness import LibpodClient
+from test.python.harness.tarstream import (
+    TarStream,
+    dir_member,
+    file_member,
+    read_members,
+)
+
+from . import Sampler, SyntheticFile, podman_service, process_rss, write_report
+from .distribution import parse_shape
+
+# files per directory of a flat tree
+_FANOUT = 1000
+
+
+def parse_tree(text):
+    """Return (files, bytes per file, depth) of e.g. 1000x4KiB/64"""
+    shape, _, depth = text.partition("/")
+    files, size = parse_shape(shape)
+    return files, size, int(depth or 1)
+
+
+def tree_members(root, files, size, depth):
+    """Yield (TarInfo, content) of a generated tree below root
+
+    Files are spread evenly over depth nested directories, or over
+    directories of _FANOUT files each when depth is 1.
+    """
+    yield dir_member(root), None
+    if depth > 1:
+        per_level = -(-files // depth)
+        directory = root
+        for index in range(files):
+            if index % per_level == 0:
+                directory = f"{directory}/l{index // per_level}"
+                yield dir_member(directory), None
+            path = f"{directory}/f{index}"
+            yield file_member(path, size), SyntheticFile(size, path)
+        return
+
+    for index in range(files):
+        directory, name = divmod(index, _FANOUT)
+        if name == 0:
+            yield dir_member(f"{root}/d{directory}"), None
+        path = f"{root}/d{directory}/f{name}"
+        yield file_member(path, size), SyntheticFile(size, path)
+
+
+def _check(r):
+    if r.status_code >= 400:
+        raise RuntimeError(f"{r.request.method} {r.url}: {r.status_code} {r.text}")
+    return r
+
+
+def copy_in(api, container, root, tree):
+    """PUT a generated tree, return (bytes, files) sent"""
+    files, size, depth = tree
+    stream = TarStream(tree_members(root, files, size, depth))
+    _check(
+        api.put(
+            f"/containers/{container}/archive",
+            params={"path": "/tmp"},
+            data=stream,
+            headers={"Content-Type": "application/x-tar"},
+        )
+    )
+    return stream.bytes, files
+
+
+def copy_out(api, container, root, tree):
+    """GET a tree back, digesting each file, return (bytes, files) received"""
+    expected = tree[0]
+    files = 0
+    with api.get(
+        f"/containers/{container}/archive",
+        params={"path": f"/tmp/{root}"},
+        stream=True,
+    ) as r:
+        _check(r)
+        for _, digest in read_members(r.raw):
+            if digest is not None:
+                files += 1
+        received = r.raw.tell()
+    if files != expected:
+        raise RuntimeError(f"{root}: {files} files copied out, {expected} copied in")
+    return received, files
+
+
+def measure(service, copy, *args):
+    """Run copy(*args), return its throughput and peak memory"""
+    baseline = process_rss("self", "RssAnon") or 0
+    with Sampler("self", field="RssAnon") as client, Sampler(
+        service.process.pid
+    ) as server:
+        started = time.monotonic()
+        transferred, files = copy(*args)
+        elapsed = time.monotonic() - started
+    return {
+        "seconds": round(elapsed, 3),
+        "bytes": transferred,
+        "files": files,
+        "mb_per_s": round(transferred / elapsed / 1e6, 2) if elapsed else None,
+        "files_per_s": round(files / elapsed, 1) if elapsed else None,
+        "client_peak_rss_growth": max(0, client.peak_rss - baseline),
+        "client_cpu_seconds": client.cpu_seconds,
+        "service_peak_rss": server.peak_rss,
+        "service_cpu_seconds": server.cpu_seconds,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--trees",
+        default="1x1GiB,100000x1KiB,1000x4KiB/64",
+        help="comma separated file counts, sizes and optional depth, e.g. 1000x4KiB/64",
+    )
+    parser.add_argument(
+        "--uri", default="tcp:127.0.0.1:8080", help="listener of the service"
+    )
+    parser.add_argument("--output", help="JSON report, stdout by default")
+    args = parser.parse_args(argv)
+
+    runs = []
+    with podman_service(args.uri) as service, LibpodClient(
+        service.url, timeout=3600
+    ) as api:
+        service.podman.restore_image_from_cache(api, constant.ALPINE)
+        r = _check(
+            api.post(
+                "/containers/create",
+                json={"image": constant.ALPINE, "command": ["top"]},
+            )
+        )
+        container = r.json()["Id"]
+        _check(api.post(f"/containers/{container}/start"))
+
+        for index, text in enumerate(args.trees.split(",")):
+            tree = parse_tree(text)
+            root = f"tree{index}"
+            for direction, copy in (("in", copy_in), ("out", copy_out)):
+                result = measure(service, copy, api.compat, container, root, tree)
+                result.update(tree=text, direction=direction)
+                runs.append(result)
+                sys.stderr.write(
+                    f"{text} {direction}: {result['mb_per_s']} MB/s,"
+                    f" {result['files_per_s']} files/s,"
+                    f" client peak RSS +{result['client_peak_rss_growth']} bytes\n"
+                )
+
+        api.delete(f"/containers/{container}", params={"force": "true"})
+
+    write_report({"runs": runs}, args.output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,142 @@
+"""Time builds of generated contexts of increasing size and file count
+
+Each of --contexts, e.g. 100000x1KiB for 100000 files of 1KiB, is
+generated as a tar stream (harness/tarstream.py) sent to /build while
+it is produced, nothing is written to disk on the client. The
+Containerfile copies the context into an alpine image and lists it:
+
+    FROM quay.io/libpod/alpine:latest
+    COPY . /context
+    RUN find /context -type f | wc -l
+
+Each context is built twice with layers cached, the second build from
+an identical stream. The report holds per build the time to upload the
+context, to the response headers, sent once the service has unpacked
+it, and to the end of the build, and the ratio of steps answered from
+the layer cache, counted from "--> Using cache" lines of the stream.
+
+    python3 -m test.python.bench.build --contexts 10x1MiB,1000x16KiB,100000x1KiB --output build.json
+"""
+import argparse
+import re
+import sys
+import time
+
+from test.python.docker.compat import constant
+from test.python.harness import LibpodClient
+from test.python.harness.tarstream import TarStream, dir_member, file_member
+
+from . import Sampler, SyntheticFile, podman_service, write_report
+from .distribution import parse_shape
+
+CONTAINERFILE = f"""FROM {constant.ALPINE}
+COPY . /context
+RUN find /context -type f | wc -l
+"""
+
+# files per directory of a generated context
+_FANOUT = 1000
+
+_STEP = re.compile(r"^STEP \d+: (\w+)")
+_CACHE_HIT = re.compile(r"^--> Using cache ")
+
+
+def context_members(files, size):
+    """Yield (TarInfo, content) of a context of files of size bytes each"""
+    data = CONTAINERFILE.encode()
+    yield file_member("Containerfile", len(data)), data
+    for index in range(files):
+        directory, name = divmod(index, _FANOUT)
+        if name == 0:
+            yield dir_member(f"d{directory}"), None
+        path = f"d{directory}/f{name}"
+        yield file_member(path, size), SyntheticFile(size, path)
+
+
+def build(api, shape, tag):
+    """Build a generated context of shape, return the build's timings"""
+    files, size = parse_shape(shape)
+    stream = TarStream(context_members(files, size))
+    started = time.monotonic()
+    steps = []
+    hits = 0
+    errors = []
+    with api.compat.stream_json(
+        "POST",
+        "/build",
+        params={"t": tag, "dockerfile": "Containerfile", "layers": "true"},
+        data=stream,
+        headers={"Content-Type": "application/x-tar"},
+    ) as reports:
+        headers = time.monotonic()
+        for report in reports:
+            if report.get("error"):
+                errors.append(report["error"].strip())
+            for line in report.get("stream", "").splitlines():
+                step = _STEP.match(line)
+                if step:
+                    steps.append(step.group(1).upper())
+                elif _CACHE_HIT.match(line):
+                    hits += 1
+    ended = time.monotonic()
+
+    # the service may answer before reading the whole context on errors
+    uploaded = stream.finished or headers
+    # FROM is never cached, it starts every stage
+    cacheable = len([s for s in steps if s != "FROM"])
+    return {
+        "context_bytes": stream.bytes,
+        "context_members": stream.members,
+        "upload_seconds": round(uploaded - started, 3),
+        "unpack_seconds": round(headers - uploaded, 3),
+        "build_seconds": round(ended - started, 3),
+        "steps": len(steps),
+        "cache_hits": hits,
+        "cache_hit_ratio": round(hits / cacheable, 3) if cacheable else None,
+        "errors": errors[:10],
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--contexts",
+        default="10x1MiB,1000x16KiB,100000x1KiB",
+        help="comma separated file counts and sizes, e.g. 1000x16KiB",
+    )
+    parser.add_argument(
+        "--uri", default="tcp:127.0.0.1:8080", help="listener of the service"
+    )
+    parser.add_argument("--output", help="JSON report, stdout by default")
+    args = parser.parse_args(argv)
+
+    runs = []
+    with podman_service(args.uri) as service, LibpodClient(
+        service.url, timeout=3600
+    ) as api:
+        service.podman.restore_image_from_cache(api, constant.ALPINE)
+        for index, shape in enumerate(args.contexts.split(",")):
+            tag = f"localhost/bench/build-{index}:latest"
+            for phase in ("build", "rebuild"):
+                with Sampler(service.process.pid) as sampler:
+                    result = build(api, shape, tag)
+                result.update(
+                    context=shape,
+                    phase=phase,
+                    service_peak_rss=sampler.peak_rss,
+                    service_cpu_seconds=sampler.cpu_seconds,
+                )
+                runs.append(result)
+                sys.stderr.write(
+                    f"{shape} {phase}: upload {result['upload_seconds']}s,"
+                    f" build {result['build_seconds']}s,"
+                    f" cache hits {result['cache_hits']}/{result['steps']}\n"
+                )
+            api.delete(f"/images/{tag}", params={"force": "true"})
+
+    write_report({"containerfile": CONTAINERFILE, "runs": runs}, args.output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,281 @@
+"""Time image pulls and pushes of synthetic images at increasing concurrency
+
+Images of each --shapes, e.g. 64x256KiB for 64 layers of 256KiB, are
+generated into a registry running in process (harness/distribution.py),
+their layers stored as is or gzip compressed per --compression. At each
+--concurrency level as many distinct images are pulled at once through
+/libpod/images/pull, then pushed at once through /images/{name}/push to
+a second, empty registry, so every layer is transferred and compressed.
+
+The report holds per run the MB/s transferred, the time from sending the
+request to the first progress line and the service's peak resident
+memory and CPU seconds. CPU seconds growing with the bytes rather than
+the wall clock point to decompression or compression as the bottleneck,
+MB/s not growing with concurrency to the transfer of layers.
+
+    python3 -m test.python.bench.distribution --shapes 64x256KiB,4x64MiB -c 1,4,16 --output distribution.json
+"""
+import argparse
+import asyncio
+import gzip
+import hashlib
+import json
+import re
+import sys
+import tarfile
+import tempfile
+import time
+
+from test.python.harness.aio import APIError, AsyncLibpodClient
+from test.python.harness.client import COMPAT_PREFIX
+from test.python.harness.distribution import LAYER, LAYER_GZIP, Registry
+
+from . import Sampler, SyntheticFile, podman_service, summarize, write_report
+
+_UNITS = {"": 1, "k": 1024, "m": 1024**2, "g": 1024**3}
+
+
+def parse_size(text):
+    """Return the bytes of e.g. 256KiB, 64M or 1g"""
+    match = re.match(r"^(\d+)\s*([kmg]?)(i?b)?$", text.strip().lower())
+    if match is None:
+        raise ValueError(f"Unsupported size: {text}")
+    return int(match.group(1)) * _UNITS[match.group(2)]
+
+
+def parse_shape(text):
+    """Return (layer count, layer bytes) of e.g. 64x256KiB"""
+    count, _, size = text.partition("x")
+    return int(count), parse_size(size)
+
+
+class _Hashing(object):
+    """Write through to f, hashing what passes"""
+
+    def __init__(self, f):
+        self.f = f
+        self.sha256 = hashlib.sha256()
+
+    def write(self, data):
+        self.sha256.update(data)
+        return self.f.write(data)
+
+
+def synthetic_layer(f, size, name, compress):
+    """Write a layer tarball holding one file of size bytes to f
+
+    :param name: path of the file, distinct names give distinct layers
+    :return: digest of the uncompressed tarball, the layer's diff ID
+    """
+    out = (
+        gzip.GzipFile(fileobj=f, mode="wb", compresslevel=1, mtime=0) if compress else f
+    )
+    hashing = _Hashing(out)
+    with tarfile.open(fileobj=hashing, mode="w|") as tar:
+        info = tarfile.TarInfo(name)
+        info.size = size
+        info.mtime = 0
+        tar.addfile(info, SyntheticFile(size, name))
+    if compress:
+        out.close()
+    return "sha256:" + hashing.sha256.hexdigest()
+
+
+def seed(registry, shape, compress, count):
+    """Generate count distinct images of shape into registry
+
+    :return: repository names of the images, tagged latest
+    """
+    layers, size = parse_shape(shape)
+    kind = "gzip" if compress else "tar"
+    names = []
+    for index in range(count):
+        name = f"bench/{shape.lower()}-{kind}-{index}"
+        files = []
+        diff_ids = []
+        try:
+            for layer in range(layers):
+                f = tempfile.TemporaryFile(dir=registry.directory)
+                diff_ids.append(synthetic_layer(f, size, f"{name}/{layer}", compress))
+                f.seek(0)
+                files.append(f)
+            config = {
+                "architecture": "amd64",
+                "os": "linux",
+                "config": {"Cmd": ["/data"]},
+                "rootfs": {"type": "layers", "diff_ids": diff_ids},
+            }
+            registry.put_image(
+                name, "latest", config, files, LAYER_GZIP if compress else LAYER
+            )
+        finally:
+            for f in files:
+                f.close()
+        names.append(name)
+    return names
+
+
+async def _progress(response, started):
+    """Consume a progress stream
+
+    :param started: monotonic time the request was sent
+    :return: (seconds to the first progress line, seconds to the end)
+    """
+    first = None
+    try:
+        await response.raise_for_status()
+        async for report in response.json_objects():
+            if first is None:
+                first = time.monotonic() - started
+            error = report.get("error") or report.get("errorDetail")
+            if error:
+                raise APIError(
+                    response.method,
+                    response.path,
+                    response.status,
+                    json.dumps(error).encode(),
+                )
+    finally:
+        response.close()
+    return first, time.monotonic() - started
+
+
+async def pull(client, reference):
+    started = time.monotonic()
+    response = await client.stream(
+        "POST", "/images/pull", params={"reference": reference, "tlsVerify": "false"}
+    )
+    return await _progress(response, started)
+
+
+async def push(client, reference, destination):
+    started = time.monotonic()
+    response = await client.stream(
+        "POST",
+        f"/images/{reference}/push",
+        params={"destination": destination, "tlsVerify": "false"},
+        prefix=COMPAT_PREFIX,
+    )
+    return await _progress(response, started)
+
+
+async def run_level(url, operation, references, destinations=None):
+    """Run one operation per reference at once
+
+    :return: (list of (first progress, seconds) or exceptions, wall seconds)
+    """
+    async with AsyncLibpodClient(url, pool_size=len(references)) as client:
+        started = time.monotonic()
+        if operation == "pull":
+            calls = [pull(client, r) for r in references]
+        else:
+            calls = [push(client, r, d) for r, d in zip(references, destinations)]
+        results = await asyncio.gather(*calls, return_exceptions=True)
+        return results, time.monotonic() - started
+
+
+async def remove_images(url, references):
+    async with AsyncLibpodClient(url, pool_size=8) as client:
+        for reference in references:
+            await client.delete(f"/images/{reference}", params={"force": "true"})
+
+
+def measure(service, operation, references, transferred, destinations=None):
+    """Run one level and summarize it
+
+    :param transferred: callable returning the registry's byte counter
+    """
+    before = transferred()
+    with Sampler(service.process.pid) as sampler:
+        results, elapsed = asyncio.run(
+            run_level(service.url, operation, references, destinations)
+        )
+    moved = transferred() - before
+
+    errors = [str(r) for r in results if isinstance(r, BaseException)]
+    timings = [r for r in results if not isinstance(r, BaseException)]
+    first = [f for f, _ in timings if f is not None]
+    return {
+        "operation": operation,
+        "concurrency": len(references),
+        "seconds": round(elapsed, 3),
+        "bytes": moved,
+        "mb_per_s": round(moved / elapsed / 1e6, 2) if elapsed else None,
+        "first_progress": summarize(first, elapsed),
+        "operation_ms": summarize([s for _, s in timings], elapsed),
+        "service_peak_rss": sampler.peak_rss,
+        "service_cpu_seconds": sampler.cpu_seconds,
+        "errors": errors[:10],
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--shapes",
+        default="64x256KiB,4x64MiB",
+        help="comma separated layer counts and sizes, e.g. 64x256KiB",
+    )
+    parser.add_argument(
+        "--compression", default="none,gzip", help="layer encodings, none and gzip"
+    )
+    parser.add_argument(
+        "-c", "--concurrency", default="1,2,4,8,16", help="concurrent operations"
+    )
+    parser.add_argument(
+        "--operations",
+        default="pull,push",
+        help="operations reported, pull, push or both; images are pulled before a push",
+    )
+    parser.add_argument(
+        "--uri", default="tcp:127.0.0.1:8080", help="listener of the service"
+    )
+    parser.add_argument("--output", help="JSON report, stdout by default")
+    args = parser.parse_args(argv)
+
+    levels = sorted(int(n) for n in args.concurrency.split(","))
+    operations = args.operations.split(",")
+    runs = []
+    with podman_service(args.uri) as service, Registry() as source:
+        for shape in args.shapes.split(","):
+            for compression in args.compression.split(","):
+                names = seed(source, shape, compression == "gzip", levels[-1])
+                references = [f"{source.host}/{n}:latest" for n in names]
+                for level in levels:
+                    pulled = measure(
+                        service, "pull", references[:level], lambda: source.bytes_sent
+                    )
+                    results = [pulled] if "pull" in operations else []
+                    if "push" in operations:
+                        with Registry() as target:
+                            destinations = [
+                                f"{target.host}/{n}:latest" for n in names[:level]
+                            ]
+                            results.append(
+                                measure(
+                                    service,
+                                    "push",
+                                    references[:level],
+                                    lambda: target.bytes_received,
+                                    destinations,
+                                )
+                            )
+                    asyncio.run(remove_images(service.url, references[:level]))
+
+                    for result in results:
+                        result.update(shape=shape, compression=compression)
+                        runs.append(result)
+                        sys.stderr.write(
+                            f"{shape} {compression} {result['operation']}"
+                            f" x{level}: {result['mb_per_s']} MB/s,"
+                            f" first progress p50"
+                            f" {result['first_progress']['p50_ms']}ms,"
+                            f" peak RSS {result['service_peak_rss']} bytes\n"
+                        )
+
+    write_report({"runs": runs}, args.output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,168 @@
+"""Load read-mostly REST endpoints at increasing concurrency
+
+Every endpoint is hammered for --duration seconds at each --concurrency
+level. The report holds latency percentiles, requests per second and
+errors per level, and the level with the highest throughput per endpoint.
+
+    python3 -m test.python.bench.endpoints -c 1,8,32,128 --duration 10 --output endpoints.json
+"""
+import argparse
+import asyncio
+import sys
+import time
+
+from test.python.docker.compat import constant
+from test.python.harness.aio import AsyncLibpodClient
+from test.python.harness.client import COMPAT_PREFIX, LIBPOD_PREFIX
+
+from . import ensure_image, podman_service, summarize, write_report
+
+# name: (compat path, libpod path)
+ENDPOINTS = {
+    "ping": ("/_ping", "/_ping"),
+    "version": ("/version", "/version"),
+    "info": ("/info", "/info"),
+    "containers": ("/containers/json?all=true", "/containers/json?all=true"),
+    "images": ("/images/json", "/images/json"),
+    "networks": ("/networks", "/networks/json"),
+    "volumes": ("/volumes", "/volumes/json"),
+    "system_df": ("/system/df", "/system/df"),
+}
+
+
+async def seed(url, containers, volumes):
+    """Populate storage so list endpoints have something to return"""
+    async with AsyncLibpodClient(url) as client:
+        await ensure_image(client, constant.ALPINE)
+
+        await client.gather_create(
+            [
+                {"name": f"bench_{i}", "image": constant.ALPINE, "command": ["top"]}
+                for i in range(containers)
+            ]
+        )
+        for i in range(volumes):
+            r = await client.post("/volumes/create", json={"Name": f"bench_{i}"})
+            r.raise_for_status()
+
+
+async def hammer(url, prefix, path, concurrency, duration):
+    """GET path from concurrency clients until duration has passed
+
+    :return: (latencies, errors, elapsed seconds)
+    """
+    latencies = []
+    errors = 0
+
+    async with AsyncLibpodClient(
+        url, prefix=prefix, pool_size=concurrency, timeout=30.0
+    ) as client:
+        deadline = time.perf_counter() + duration
+
+        async def worker():
+            nonlocal errors
+            while time.perf_counter() < deadline:
+                started = time.perf_counter()
+                try:
+                    r = await client.get(path)
+                except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError):
+                    errors += 1
+                    continue
+                if r.status == 200:
+                    latencies.append(time.perf_counter() - started)
+                else:
+                    errors += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+    return latencies, errors, elapsed
+
+
+def run(url, api, endpoints, levels, duration, warmup):
+    prefix = LIBPOD_PREFIX if api == "libpod" else COMPAT_PREFIX
+    index = 1 if api == "libpod" else 0
+
+    results = {}
+    for name in endpoints:
+        path = ENDPOINTS[name][index]
+        results[name] = {"path": prefix + path, "levels": {}}
+        if warmup:
+            asyncio.run(hammer(url, prefix, path, 1, warmup))
+
+        for level in levels:
+            latencies, errors, elapsed = asyncio.run(
+                hammer(url, prefix, path, level, duration)
+            )
+            summary = summarize(latencies, elapsed)
+            summary["errors"] = errors
+            results[name]["levels"][str(level)] = summary
+            sys.stderr.write(
+                f"{name} c={level}: p50 {summary['p50_ms']}ms p99 {summary['p99_ms']}ms"
+                f" {summary['rps']} req/s {errors} errors\n"
+            )
+
+        peak = max(
+            results[name]["levels"].items(), key=lambda item: item[1]["rps"] or 0
+        )
+        results[name]["peak"] = {"concurrency": int(peak[0]), "rps": peak[1]["rps"]}
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "-c",
+        "--concurrency",
+        default="1,4,16,64",
+        help="comma separated concurrency levels",
+    )
+    parser.add_argument(
+        "--duration", type=float, default=5.0, help="seconds per endpoint and level"
+    )
+    parser.add_argument(
+        "--warmup", type=float, default=1.0, help="unmeasured seconds per endpoint"
+    )
+    parser.add_argument("--api", choices=("compat", "libpod"), default="compat")
+    parser.add_argument(
+        "--endpoint",
+        action="append",
+        choices=sorted(ENDPOINTS),
+        help="endpoint to measure, may be repeated, all by default",
+    )
+    parser.add_argument(
+        "--containers", type=int, default=0, help="containers created before measuring"
+    )
+    parser.add_argument(
+        "--volumes", type=int, default=0, help="volumes created before measuring"
+    )
+    parser.add_argument(
+        "--uri", default="tcp:127.0.0.1:8080", help="listener of the service"
+    )
+    parser.add_argument("--output", help="JSON report, stdout by default")
+    args = parser.parse_args(argv)
+
+    levels = [int(c) for c in args.concurrency.split(",")]
+    endpoints = args.endpoint or list(ENDPOINTS)
+
+    with podman_service(args.uri) as service:
+        if args.containers or args.volumes:
+            asyncio.run(seed(service.url, args.containers, args.volumes))
+        results = run(
+            service.url, args.api, endpoints, levels, args.duration, args.warmup
+        )
+
+    report = {
+        "api": args.api,
+        "uri": args.uri,
+        "duration": args.duration,
+        "containers": args.containers,
+        "volumes": args.volumes,
+        "endpoints": results,
+    }
+    write_report(report, args.output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
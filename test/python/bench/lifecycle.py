@@ -0,0 +1,185 @@
+"""Measure container create, start, stop and remove throughput as the container count grows
+
+For each N in --counts and each --concurrency level, N containers are
+created, started, stopped and removed, one phase at a time. Each phase
+reports its latency percentiles and operations per second. Creates and
+removes are additionally bucketed by the number of containers existing
+when the operation was issued, showing whether cost grows with the count.
+
+    python3 -m test.python.bench.lifecycle --counts 1,10,100,1000 -c 1,8,32 --output lifecycle.json
+"""
+import argparse
+import asyncio
+import sys
+import time
+
+from test.python.docker.compat import constant
+from test.python.harness.aio import AsyncLibpodClient
+
+from . import ensure_image, percentile, podman_service, summarize, write_report
+
+PHASES = ("create", "start", "stop", "remove")
+
+# exits promptly on SIGTERM, unlike top or sleep running as pid 1
+COMMAND = ["sh", "-c", "trap 'exit 0' TERM; while :; do sleep 0.1; done"]
+
+
+class Phase(object):
+    """Per operation latencies of one phase, with the container count at issue time"""
+
+    def __init__(self, existing):
+        self.existing = existing
+        self.samples = []
+        self.elapsed = None
+
+    async def run(self, func, items, limit, delta):
+        """Run func over items with bounded concurrency
+
+        :param delta: change of the container count per completed operation
+        """
+        semaphore = asyncio.Semaphore(limit)
+
+        async def call(item):
+            async with semaphore:
+                existing = self.existing
+                started = time.perf_counter()
+                result = await func(item)
+                self.samples.append((existing, time.perf_counter() - started))
+                self.existing += delta
+                return result
+
+        started = time.perf_counter()
+        results = await asyncio.gather(*(call(item) for item in items))
+        self.elapsed = time.perf_counter() - started
+        return results
+
+    def summary(self):
+        return summarize([latency for _, latency in self.samples], self.elapsed)
+
+    def by_existing(self, buckets=10):
+        """Latency percentiles grouped into buckets of the existing container count"""
+        if not self.samples:
+            return []
+
+        low = min(existing for existing, _ in self.samples)
+        high = max(existing for existing, _ in self.samples)
+        width = max(1, (high - low + buckets) // buckets)
+
+        groups = {}
+        for existing, latency in self.samples:
+            groups.setdefault((existing - low) // width, []).append(latency)
+
+        report = []
+        for index in sorted(groups):
+            latencies = sorted(groups[index])
+            report.append(
+                {
+                    "existing_from": low + index * width,
+                    "existing_to": min(high, low + (index + 1) * width - 1),
+                    "count": len(latencies),
+                    "p50_ms": round(percentile(latencies, 50) * 1000.0, 3),
+                    "p99_ms": round(percentile(latencies, 99) * 1000.0, 3),
+                }
+            )
+        return report
+
+
+async def cycle(url, count, concurrency, stop_timeout):
+    """Create, start, stop and remove count containers
+
+    :return: dict of Phase keyed by phase name
+    """
+    async with AsyncLibpodClient(url, pool_size=concurrency) as client:
+        existing = len(await client.list_containers())
+        phases = {}
+
+        phases["create"] = Phase(existing)
+        ids = await phases["create"].run(
+            client.create_container,
+            [
+                {"image": constant.ALPINE, "command": COMMAND, "labels": {"bench": ""}}
+                for _ in range(count)
+            ],
+            concurrency,
+            1,
+        )
+
+        phases["start"] = Phase(existing + count)
+        await phases["start"].run(client.start_container, ids, concurrency, 0)
+
+        phases["stop"] = Phase(existing + count)
+        await phases["stop"].run(
+            lambda id: client.stop_container(id, timeout=stop_timeout),
+            ids,
+            concurrency,
+            0,
+        )
+
+        phases["remove"] = Phase(existing + count)
+        await phases["remove"].run(client.delete_container, ids, concurrency, -1)
+    return phases
+
+
+async def prepare(url):
+    async with AsyncLibpodClient(url) as client:
+        await ensure_image(client, constant.ALPINE)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--counts",
+        default="1,10,100,1000",
+        help="comma separated numbers of containers per cycle",
+    )
+    parser.add_argument(
+        "-c",
+        "--concurrency",
+        default="1,8,32",
+        help="comma separated concurrency levels",
+    )
+    parser.add_argument(
+        "--stop-timeout",
+        type=int,
+        default=10,
+        help="seconds a container may take to stop before it is killed",
+    )
+    parser.add_argument(
+        "--uri", default="tcp:127.0.0.1:8080", help="listener of the service"
+    )
+    parser.add_argument("--output", help="JSON report, stdout by default")
+    args = parser.parse_args(argv)
+
+    counts = [int(n) for n in args.counts.split(",")]
+    levels = [int(c) for c in args.concurrency.split(",")]
+
+    runs = []
+    scaling = {phase: {str(level): [] for level in levels} for phase in PHASES}
+    with podman_service(args.uri) as service:
+        asyncio.run(prepare(service.url))
+        for count in counts:
+            for level in levels:
+                phases = asyncio.run(
+                    cycle(service.url, count, level, args.stop_timeout)
+                )
+                run = {"count": count, "concurrency": level, "phases": {}}
+                for name in PHASES:
+                    summary = phases[name].summary()
+                    run["phases"][name] = summary
+                    scaling[name][str(level)].append(
+                        {"count": count, "p50_ms": summary["p50_ms"]}
+                    )
+                    sys.stderr.write(
+                        f"N={count} c={level} {name}: p50 {summary['p50_ms']}ms"
+                        f" p99 {summary['p99_ms']}ms {summary['rps']} ops/s\n"
+                    )
+                run["create_by_existing"] = phases["create"].by_existing()
+                run["remove_by_existing"] = phases["remove"].by_existing()
+                runs.append(run)
+
+    write_report({"uri": args.uri, "runs": runs, "scaling": scaling}, args.output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
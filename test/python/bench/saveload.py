@@ -0,0 +1,156 @@
+"""Compare ways of saving and loading large images
+
+An image of --layers uncompressed layers totalling --size bytes is
+generated into a registry running in process and pulled by the service.
+It is then saved to a tarball and loaded back once per --methods:
+
+    naive      iter_content() chunks written to the file on save, the
+               tarball read whole into the request body on load, as
+               docker-py's image.save() and images.load() are used
+    streaming  LibpodClient.save_image() and load_image(), reading into
+               one preallocated buffer and uploading chunks of an mmap
+
+The report holds MB/s of each transfer and the peak anonymous resident
+memory the client gained during it, pages of the mapped tarball left
+out, along with the service's peak resident memory.
+
+    python3 -m test.python.bench.saveload --size 4GiB --layers 8 --output saveload.json
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+from test.python.harness import LibpodClient
+from test.python.harness.distribution import Registry
+
+from . import Sampler, podman_service, process_rss, write_report
+from .distribution import parse_size, seed
+
+# docker-py's DEFAULT_DATA_CHUNK_SIZE
+_NAIVE_CHUNK = 2 * 1024 * 1024
+
+
+def _check(r):
+    if r.status_code >= 400:
+        raise RuntimeError(f"{r.request.method} {r.url}: {r.status_code} {r.text}")
+    return r
+
+
+def naive_save(api, reference, path):
+    with open(path, "wb") as f:
+        with api.get(
+            f"/images/{reference}/get",
+            params={"format": "docker-archive"},
+            stream=True,
+        ) as r:
+            _check(r)
+            for chunk in r.iter_content(chunk_size=_NAIVE_CHUNK):
+                f.write(chunk)
+
+
+def naive_load(api, path):
+    with open(path, "rb") as f:
+        return _check(api.post("/images/load", data=f.read()))
+
+
+def streaming_save(api, reference, path):
+    with open(path, "wb") as f:
+        api.save_image(reference, f)
+
+
+def streaming_load(api, path):
+    return _check(api.load_image(path))
+
+
+METHODS = {
+    "naive": (naive_save, naive_load),
+    "streaming": (streaming_save, streaming_load),
+}
+
+
+def measure(service, transfer, *args):
+    """Run transfer(*args), return its seconds and peak memory"""
+    baseline = process_rss("self", "RssAnon") or 0
+    with Sampler("self", field="RssAnon") as client, Sampler(
+        service.process.pid
+    ) as server:
+        started = time.monotonic()
+        transfer(*args)
+        elapsed = time.monotonic() - started
+    return {
+        "seconds": round(elapsed, 3),
+        "client_peak_rss_growth": max(0, client.peak_rss - baseline),
+        "client_cpu_seconds": client.cpu_seconds,
+        "service_peak_rss": server.peak_rss,
+        "service_cpu_seconds": server.cpu_seconds,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size", default="2GiB", help="bytes of the image's layers")
+    parser.add_argument("--layers", type=int, default=8, help="layers of the image")
+    parser.add_argument(
+        "--methods", default="naive,streaming", help="save and load paths compared"
+    )
+    parser.add_argument(
+        "--directory", help="directory of the tarballs, a temporary one by default"
+    )
+    parser.add_argument(
+        "--uri", default="tcp:127.0.0.1:8080", help="listener of the service"
+    )
+    parser.add_argument("--output", help="JSON report, stdout by default")
+    args = parser.parse_args(argv)
+
+    shape = f"{args.layers}x{parse_size(args.size) // args.layers}"
+    runs = []
+    with podman_service(args.uri) as service, Registry() as registry, LibpodClient(
+        service.url, timeout=3600
+    ) as api, tempfile.TemporaryDirectory(
+        prefix="podman_bench_", dir=args.directory
+    ) as directory:
+        (name,) = seed(registry, shape, False, 1)
+        reference = f"{registry.host}/{name}:latest"
+        with api.stream_json(
+            "POST",
+            "/images/pull",
+            params={"reference": reference, "tlsVerify": "false"},
+        ) as pull:
+            for report in pull:
+                if report.get("error"):
+                    raise RuntimeError(f"pull {reference}: {report['error']}")
+
+        for method in args.methods.split(","):
+            save, load = METHODS[method]
+            path = os.path.join(directory, f"{method}.tar")
+
+            saved = measure(service, save, api, reference, path)
+            size = os.path.getsize(path)
+            _check(api.delete(f"/images/{reference}", params={"force": "true"}))
+            loaded = measure(service, load, api, path)
+            _check(api.get(f"/images/{reference}/json"))
+            os.unlink(path)
+
+            for operation, result in (("save", saved), ("load", loaded)):
+                result.update(
+                    method=method,
+                    operation=operation,
+                    bytes=size,
+                    mb_per_s=round(size / result["seconds"] / 1e6, 2)
+                    if result["seconds"]
+                    else None,
+                )
+                runs.append(result)
+                sys.stderr.write(
+                    f"{method} {operation}: {result['mb_per_s']} MB/s,"
+                    f" client peak RSS +{result['client_peak_rss_growth']} bytes\n"
+                )
+
+    write_report({"shape": shape, "runs": runs}, args.output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
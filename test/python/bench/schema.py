@@ -0,0 +1,174 @@
+"""Measure response validation throughput of compiled swagger schemas
+
+For each operation, a list of --sizes objects matching its response
+schema is generated and validated with the compiled validator of
+harness/schema.py and, as a baseline, with a validator interpreting the
+schema for every value. The report holds objects per second of both and
+the time to compile.
+
+    python3 -m test.python.bench.schema --spec pkg/api/swagger.yaml --sizes 1000,10000,50000
+"""
+import argparse
+import json
+import sys
+import time
+
+from test.python.harness.schema import (
+    SPEC_PATH,
+    TYPES,
+    Compiler,
+    SchemaError,
+    Schemas,
+    Validator,
+    load_spec,
+)
+
+from . import write_report
+
+OPERATIONS = (
+    "GET /images/json",
+    "GET /libpod/images/json",
+    "GET /volumes",
+    "GET /libpod/volumes/json",
+    "GET /libpod/pods/json",
+)
+
+
+def example(compiler, schema, depth=0):
+    """Return a value matching schema, recursive definitions end after a few levels"""
+    if "$ref" in schema:
+        if depth > 4:
+            return None
+        return example(compiler, compiler.resolve(schema["$ref"]), depth + 1)
+    if "allOf" in schema:
+        value = {}
+        for part in schema["allOf"]:
+            value.update(example(compiler, part, depth) or {})
+        return value
+
+    kind = schema.get("type") or ("object" if "properties" in schema else None)
+    if kind == "object":
+        value = {
+            name: example(compiler, s, depth + 1)
+            for name, s in schema.get("properties", {}).items()
+        }
+        if isinstance(schema.get("additionalProperties"), dict):
+            value["key"] = example(compiler, schema["additionalProperties"], depth + 1)
+        return value
+    if kind == "array":
+        item = example(compiler, schema.get("items") or {}, depth + 1)
+        return [] if item is None else [item, item]
+    if schema.get("enum"):
+        return schema["enum"][0]
+    return {"string": "x", "integer": 1, "number": 1.5, "boolean": True}.get(kind)
+
+
+def interpret(spec, schema, value):
+    """Validate by walking the schema for every value, the baseline"""
+    if "$ref" in schema:
+        node = spec
+        for part in schema["$ref"][2:].split("/"):
+            node = node[part]
+        return interpret(spec, node, value)
+    for part in schema.get("allOf", ()):
+        interpret(spec, part, value)
+
+    kind = schema.get("type") or ("object" if "properties" in schema else None)
+    if value is None and kind in ("object", "array"):
+        return
+    if kind in TYPES and type(value) not in TYPES[kind]:
+        raise SchemaError(f"expected {kind}")
+    if kind == "object" or "properties" in schema:
+        for key in schema.get("required", ()):
+            if key not in value:
+                raise SchemaError(f"missing {key}")
+        for key, item in value.items():
+            sub = schema.get("properties", {}).get(key)
+            if sub is None and isinstance(schema.get("additionalProperties"), dict):
+                sub = schema["additionalProperties"]
+            if sub is not None:
+                interpret(spec, sub, item)
+    elif kind == "array":
+        for item in value:
+            interpret(spec, schema.get("items") or {}, item)
+
+
+def measure(spec, operation, sizes):
+    method, path = operation.split(" ", 1)
+    schemas = Schemas(spec)
+
+    started = time.perf_counter()
+    validate = schemas.response(method, path)
+    compile_ms = (time.perf_counter() - started) * 1000.0
+
+    template = schemas.route(method, path)
+    response = spec["paths"][template][method.lower()]["responses"]
+    response = response.get(200, response.get("200"))
+    if "$ref" in response:
+        response = schemas.compiler.resolve(response["$ref"])
+    schema = response.get("schema") or {}
+    item = example(schemas.compiler, schema)
+    if isinstance(item, list):
+        item = item[0] if item else {}
+        schema = schema.get("items") or {}
+    else:
+        # single object responses are validated as a list of them
+        validate = Validator(Compiler(spec).compile({"type": "array", "items": schema}))
+
+    results = {"operation": operation, "compile_ms": round(compile_ms, 3), "runs": []}
+    for size in sizes:
+        # distinct objects, as decoded from a response body
+        values = json.loads(json.dumps([item] * size))
+
+        started = time.perf_counter()
+        validate(values)
+        compiled = time.perf_counter() - started
+
+        started = time.perf_counter()
+        interpret(spec, {"type": "array", "items": schema}, values)
+        interpreted = time.perf_counter() - started
+
+        results["runs"].append(
+            {
+                "objects": size,
+                "compiled_per_second": round(size / compiled),
+                "interpreted_per_second": round(size / interpreted),
+                "speedup": round(interpreted / compiled, 2),
+            }
+        )
+        sys.stderr.write(
+            f"{operation} x{size}: {size / compiled:,.0f} objects/s compiled,"
+            f" {size / interpreted:,.0f} objects/s interpreted\n"
+        )
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--spec", default=SPEC_PATH, help="swagger document")
+    parser.add_argument(
+        "--operation",
+        action="append",
+        help="method and path of a list operation, repeatable",
+    )
+    parser.add_argument(
+        "--sizes", default="1000,10000,50000", help="comma separated list lengths"
+    )
+    parser.add_argument("--output", help="JSON report, stdout by default")
+    args = parser.parse_args(argv)
+
+    spec = load_spec(args.spec)
+    sizes = [int(n) for n in args.sizes.split(",")]
+    results = []
+    for operation in args.operation or OPERATIONS:
+        try:
+            results.append(measure(spec, operation, sizes))
+        except KeyError as e:
+            sys.stderr.write(f"{operation}: skipped, {e}\n")
+
+    write_report({"spec": args.spec, "operations": results}, args.output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
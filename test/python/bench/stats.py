@@ -0,0 +1,115 @@
+"""Measure the overhead of collecting streaming stats as the container count grows
+
+For each count in --counts, running containers are added up to that
+count. The service CPU is measured for --duration seconds idle, then
+again while a StatsCollector subscribes to all containers. The report
+holds both, the bytes of JSON received and the bytes held by the ring
+buffers and the client's resident memory.
+
+    python3 -m test.python.bench.stats --counts 10,100,300 --duration 30 --output stats.json
+"""
+import argparse
+import asyncio
+import sys
+import time
+
+from test.python.docker.compat import constant
+from test.python.harness import LibpodClient
+from test.python.harness.aio import AsyncLibpodClient
+from test.python.harness.telemetry import StatsCollector
+
+from . import (
+    ensure_image,
+    podman_service,
+    process_cpu_seconds,
+    process_rss,
+    write_report,
+)
+
+
+async def scale(url, ids, count, concurrency):
+    """Create and start containers until count are running, return all ids"""
+    async with AsyncLibpodClient(url, pool_size=concurrency) as client:
+        await ensure_image(client, constant.ALPINE)
+        new = await client.gather_create(
+            [{"image": constant.ALPINE, "command": ["top"]}] * (count - len(ids)),
+            limit=concurrency,
+        )
+        await client.gather_start(new, limit=concurrency)
+    return ids + new
+
+
+def service_cpu(pid, duration):
+    """Return the service's CPU usage in percent of one core over duration"""
+    before = process_cpu_seconds(pid)
+    started = time.monotonic()
+    time.sleep(duration)
+    used = process_cpu_seconds(pid) - before
+    return round(100.0 * used / (time.monotonic() - started), 2)
+
+
+def measure(service, ids, duration, capacity):
+    pid = service.process.pid
+    idle = service_cpu(pid, duration)
+
+    rss_before = process_rss()
+    with LibpodClient(service.url) as api:
+        collector = StatsCollector(api, capacity=capacity).start(ids)
+        collecting = service_cpu(pid, duration)
+        collector.stop()
+
+    samples = sum(len(s) for s in collector.series.values())
+    return {
+        "containers": len(ids),
+        "service_cpu_idle_pct": idle,
+        "service_cpu_collecting_pct": collecting,
+        "samples": samples,
+        "json_bytes": collector.bytes_received,
+        "ring_bytes": collector.nbytes,
+        "client_rss_delta": process_rss() - rss_before,
+        "errors": collector.errors[:10],
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--counts", default="10,50,100,300", help="comma separated container counts"
+    )
+    parser.add_argument(
+        "--duration", type=float, default=20.0, help="seconds measured per phase"
+    )
+    parser.add_argument(
+        "--capacity", type=int, default=300, help="samples kept per container"
+    )
+    parser.add_argument(
+        "-c", "--concurrency", type=int, default=32, help="concurrent creates"
+    )
+    parser.add_argument(
+        "--uri", default="tcp:127.0.0.1:8080", help="listener of the service"
+    )
+    parser.add_argument("--output", help="JSON report, stdout by default")
+    args = parser.parse_args(argv)
+
+    results = []
+    with podman_service(args.uri) as service:
+        ids = []
+        for count in sorted(int(n) for n in args.counts.split(",")):
+            ids = asyncio.run(scale(service.url, ids, count, args.concurrency))
+            result = measure(service, ids, args.duration, args.capacity)
+            results.append(result)
+            sys.stderr.write(
+                f"N={count}: service CPU {result['service_cpu_idle_pct']}% idle,"
+                f" {result['service_cpu_collecting_pct']}% collecting,"
+                f" {result['json_bytes']} JSON bytes, {result['ring_bytes']} ring bytes\n"
+            )
+
+    write_report(
+        {"duration": args.duration, "capacity": args.capacity, "runs": results},
+        args.output,
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
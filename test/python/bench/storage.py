@@ -0,0 +1,177 @@
+"""Compare storage drivers on the same workload
+
+For each driver a service is started on a fresh storage root and the
+same workload is run: --containers creates, then --commits containers
+writing --payload bytes each are committed. The report holds create and
+commit latency and the disk usage of the storage root per driver.
+
+    python3 -m test.python.bench.storage --drivers vfs,overlay --output storage.json
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+from test.python.docker.compat import constant
+from test.python.harness import LibpodClient
+from test.python.harness.profiling import PROFILE_DIR
+from test.python.harness.storage import available_drivers
+
+from . import podman_service, summarize, write_report
+
+
+def disk_usage(path):
+    """Return the bytes allocated below path, hardlinks and other file systems excluded"""
+    seen = set()
+    total = 0
+    try:
+        device = os.lstat(path).st_dev
+    except FileNotFoundError:
+        return 0
+
+    for dirpath, dirnames, filenames in os.walk(path):
+        for name in dirnames + filenames:
+            try:
+                st = os.lstat(os.path.join(dirpath, name))
+            except FileNotFoundError:
+                continue
+            if st.st_dev != device or (st.st_dev, st.st_ino) in seen:
+                continue
+            seen.add((st.st_dev, st.st_ino))
+            total += st.st_blocks * 512
+        # do not descend into mounted container file systems
+        dirnames[:] = [
+            d for d in dirnames if not os.path.ismount(os.path.join(dirpath, d))
+        ]
+    return total
+
+
+def _check(r):
+    if r.status_code >= 400:
+        raise RuntimeError(f"{r.request.method} {r.url}: {r.status_code} {r.text}")
+    return r
+
+
+def workload(service, containers, commits, payload):
+    """Run the workload against service, return the driver's report"""
+    root = os.path.join(service.podman.anchor_directory, "crio")
+    with LibpodClient(service.url, timeout=600) as api:
+        service.podman.restore_image_from_cache(api, constant.ALPINE)
+        image_usage = disk_usage(root)
+
+        create = []
+        started = time.perf_counter()
+        for _ in range(containers):
+            t = time.perf_counter()
+            _check(
+                api.post(
+                    "/containers/create",
+                    json={"image": constant.ALPINE, "command": ["true"]},
+                )
+            )
+            create.append(time.perf_counter() - t)
+        create_elapsed = time.perf_counter() - started
+
+        commit = []
+        commit_elapsed = 0.0
+        for i in range(commits):
+            r = _check(
+                api.post(
+                    "/containers/create",
+                    json={
+                        "image": constant.ALPINE,
+                        "command": [
+                            "sh",
+                            "-c",
+                            f"head -c {payload} /dev/urandom > /payload",
+                        ],
+                    },
+                )
+            )
+            id = r.json()["Id"]
+            _check(api.post(f"/containers/{id}/start"))
+            _check(api.post(f"/containers/{id}/wait"))
+
+            t = time.perf_counter()
+            _check(
+                api.post(
+                    "/commit",
+                    params={"container": id, "repo": f"localhost/bench/commit{i}"},
+                )
+            )
+            commit.append(time.perf_counter() - t)
+            commit_elapsed += commit[-1]
+
+        usage = disk_usage(root)
+
+    workload_count = containers + commits
+    return {
+        "driver": service.podman.storage_driver,
+        "create": summarize(create, create_elapsed),
+        "commit": summarize(commit, commit_elapsed),
+        "disk_bytes": {
+            "image": image_usage,
+            "total": usage,
+            "per_container": (usage - image_usage) // workload_count
+            if workload_count
+            else None,
+        },
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--drivers",
+        help="comma separated storage drivers, all usable on this host by default",
+    )
+    parser.add_argument(
+        "--containers", type=int, default=100, help="containers created"
+    )
+    parser.add_argument("--commits", type=int, default=10, help="containers committed")
+    parser.add_argument(
+        "--payload",
+        type=int,
+        default=16 * 1024 * 1024,
+        help="bytes written by each committed container",
+    )
+    parser.add_argument(
+        "--uri", default="tcp:127.0.0.1:8080", help="listener of the service"
+    )
+    parser.add_argument("--output", help="JSON report, stdout by default")
+    args = parser.parse_args(argv)
+
+    if args.drivers:
+        drivers = args.drivers.split(",")
+    else:
+        drivers = available_drivers(tempfile.gettempdir())
+
+    results = {}
+    for driver in drivers:
+        # one service per driver, each profiled on its own
+        profile = os.path.join(PROFILE_DIR, driver) if PROFILE_DIR else None
+        with podman_service(
+            args.uri, storage_driver=driver, profile=profile
+        ) as service:
+            results[driver] = workload(
+                service, args.containers, args.commits, args.payload
+            )
+        sys.stderr.write(
+            f"{driver}: create p50 {results[driver]['create']['p50_ms']}ms"
+            f" commit p50 {results[driver]['commit']['p50_ms']}ms"
+            f" disk {results[driver]['disk_bytes']['total']} bytes\n"
+        )
+
+    report = {
+        "containers": args.containers,
+        "commits": args.commits,
+        "payload": args.payload,
+        "drivers": results,
+    }
+    write_report(report, args.output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,134 @@
+"""Compare request latency and throughput of the service over TCP and a unix socket
+
+Both listeners are served in turn from the same storage root, so the only
+difference between the runs is the transport.
+
+    python3 -m test.python.bench.transport --requests 2000 --output transport.json
+"""
+import argparse
+import concurrent.futures
+import os
+import sys
+import time
+
+from test.python.docker.compat import constant
+from test.python.harness import LibpodClient, Podman, PodmanService
+
+from . import summarize, write_report
+
+CONTAINER = "bench_transport"
+
+# (name, API prefix, path) measured for each transport
+ENDPOINTS = (
+    ("ping", "", "/_ping"),
+    ("info", "/v2.0.0/libpod", "/info"),
+    ("containers_json", "/v2.0.0/libpod", "/containers/json?all=true"),
+    ("container_inspect", "/v2.0.0/libpod", f"/containers/{CONTAINER}/json"),
+)
+
+
+def prepare(client):
+    """Make sure the container inspected by the benchmark exists"""
+    r = client.get(f"/images/{constant.ALPINE}/json")
+    if r.status_code == 404:
+        r = client.post(
+            "/images/pull", params={"reference": constant.ALPINE}, timeout=300
+        )
+        r.raise_for_status()
+
+    r = client.get(f"/containers/{CONTAINER}/json")
+    if r.status_code == 404:
+        r = client.post(
+            "/containers/create",
+            json={"name": CONTAINER, "image": constant.ALPINE, "command": ["top"]},
+        )
+        r.raise_for_status()
+
+
+def measure(client, path, requests, concurrency):
+    """Issue requests GETs of path, return (latencies, elapsed seconds)
+
+    :raises RuntimeError: the service answered with an error
+    """
+
+    def worker(count):
+        latencies = []
+        for _ in range(count):
+            started = time.perf_counter()
+            # not streamed, the body is read before get() returns and the
+            # latency includes its transfer
+            r = client.get(path)
+            latencies.append(time.perf_counter() - started)
+            if r.status_code != 200:
+                raise RuntimeError(f"GET {path}: {r.status_code} {r.text}")
+        return latencies
+
+    shares = [requests // concurrency] * concurrency
+    for i in range(requests % concurrency):
+        shares[i] += 1
+
+    latencies = []
+    started = time.perf_counter()
+    with concurrent.futures.ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for result in pool.map(worker, shares):
+            latencies.extend(result)
+    return latencies, time.perf_counter() - started
+
+
+def run_transport(podman, uri, requests, warmup, concurrency):
+    """Benchmark all endpoints against a service listening on uri"""
+    with PodmanService(podman, uri) as service:
+        results = {"uri": uri, "time_to_ready": round(service.time_to_ready, 3)}
+        with LibpodClient(service.url, pool_size=concurrency, pool_block=True) as api:
+            prepare(api)
+            for name, prefix, path in ENDPOINTS:
+                client = api.with_prefix(prefix)
+                measure(client, path, warmup, 1)
+                latencies, elapsed = measure(client, path, requests, concurrency)
+                results[name] = summarize(latencies, elapsed)
+                sys.stderr.write(
+                    f"{uri} {name}: p50 {results[name]['p50_ms']}ms"
+                    f" p99 {results[name]['p99_ms']}ms {results[name]['rps']} req/s\n"
+                )
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--requests", type=int, default=1000, help="requests per endpoint"
+    )
+    parser.add_argument(
+        "--warmup", type=int, default=50, help="unmeasured requests per endpoint"
+    )
+    parser.add_argument(
+        "-c", "--concurrency", type=int, default=1, help="concurrent clients"
+    )
+    parser.add_argument("--port", type=int, default=8080, help="TCP service port")
+    parser.add_argument("--output", help="JSON report, stdout by default")
+    args = parser.parse_args(argv)
+
+    podman = Podman(prefix="podman_bench_")
+    try:
+        uris = {
+            "tcp": f"tcp:127.0.0.1:{args.port}",
+            "unix": "unix://" + os.path.join(podman.anchor_directory, "podman.sock"),
+        }
+        report = {
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "transports": {},
+        }
+        for transport, uri in uris.items():
+            report["transports"][transport] = run_transport(
+                podman, uri, args.requests, args.warmup, max(1, args.concurrency)
+            )
+    finally:
+        podman.tear_down()
+
+    write_report(report, args.output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
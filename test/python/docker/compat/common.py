@@ -3,10 +3,21 @@ from docker import DockerClient
 from test.python.docker.compat import constant
 
 
-def run_top_container(client: DockerClient):
+def run_top_container(client: DockerClient, labels=None, fixtures=None):
+    """Create and start a container running top, named top
+
+    :param fixtures: FixtureRegistry of the session recording the container
+    """
     c = client.containers.create(
-        constant.ALPINE, command="top", detach=True, tty=True, name="top"
+        constant.ALPINE,
+        command="top",
+        detach=True,
+        tty=True,
+        name="top",
+        labels=labels,
     )
+    if fixtures is not None:
+        fixtures.add("container", c.id, name="top", labels=labels)
     c.start()
     return c.id
 
@@ -0,0 +1,172 @@
+import base64
+import hashlib
+import io
+import json
+import os
+import tarfile
+import unittest
+
+from docker import DockerClient
+
+from test.python.docker.compat import common, constant
+from test.python.harness import get_session
+from test.python.harness.tarstream import (
+    TarStream,
+    dir_member,
+    file_member,
+    read_members,
+)
+
+STAT_HEADER = "X-Docker-Container-Path-Stat"
+
+
+def link_member(name, target):
+    info = tarfile.TarInfo(name)
+    info.type = tarfile.SYMTYPE
+    info.linkname = target
+    return info
+
+
+class TestArchive(unittest.TestCase):
+    session = None  # podman service and storage shared by all suites
+    podman = None  # initialized podman configuration for tests
+    topContainerId = ""
+
+    def setUp(self):
+        super().setUp()
+        self.client = DockerClient(base_url=TestArchive.session.docker_url, timeout=15)
+        if TestArchive.session.reset(images=[constant.ALPINE]):
+            TestArchive.podman.restore_image_from_cache(TestArchive.session.api)
+        TestArchive.topContainerId = common.run_top_container(
+            self.client,
+            labels=TestArchive.session.labels,
+            fixtures=TestArchive.session.fixtures,
+        )
+        self.api = TestArchive.session.api.compat
+        self.archive = f"/containers/{TestArchive.topContainerId}/archive"
+
+    def tearDown(self):
+        self.client.close()
+        return super().tearDown()
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        TestArchive.session = get_session()
+        TestArchive.podman = TestArchive.session.podman
+
+    @classmethod
+    def tearDownClass(cls):
+        TestArchive.session.profile(cls.__name__)
+        super().tearDownClass()
+
+    def put(self, path, members):
+        stream = TarStream(members, chunk=256 * 1024)
+        r = self.api.put(
+            self.archive,
+            params={"path": path},
+            data=stream,
+            headers={"Content-Type": "application/x-tar"},
+        )
+        self.assertEqual(r.status_code, 200, r.text)
+        return stream
+
+    def get(self, path):
+        """Return {name: digest} of the archive of path, read as it arrives"""
+        with self.api.get(self.archive, params={"path": path}, stream=True) as r:
+            self.assertEqual(r.status_code, 200, r.text)
+            self.assertEqual(r.headers["Content-Type"], "application/x-tar")
+            return {
+                info.name.rstrip("/"): digest for info, digest in read_members(r.raw)
+            }
+
+    def stat(self, path):
+        r = self.api.head(self.archive, params={"path": path})
+        self.assertEqual(r.status_code, 200)
+        return json.loads(base64.urlsafe_b64decode(r.headers[STAT_HEADER]))
+
+    def test_large_file(self):
+        content = os.urandom(16 * 1024 * 1024 + 7)
+        self.put("/tmp", [(file_member("large", len(content)), content)])
+
+        stat = self.stat("/tmp/large")
+        self.assertEqual(stat["name"], "large")
+        self.assertEqual(stat["size"], len(content))
+        self.assertFalse(stat["isDir"])
+
+        # a file is archived under its base name
+        self.assertEqual(
+            self.get("/tmp/large"), {"large": hashlib.sha256(content).hexdigest()}
+        )
+
+    def test_many_small_files(self):
+        files = {f"many/f{i}": b"%d\n" % i for i in range(2000)}
+        members = [(dir_member("many"), None)]
+        members.extend((file_member(n, len(c)), c) for n, c in files.items())
+        stream = self.put("/tmp", members)
+        self.assertEqual(stream.members, 2001)
+
+        self.assertTrue(self.stat("/tmp/many")["isDir"])
+        # a directory is archived with its name kept
+        fetched = self.get("/tmp/many")
+        self.assertIn("many", fetched)
+        for name, content in files.items():
+            self.assertEqual(fetched[name], hashlib.sha256(content).hexdigest())
+
+    def test_deep_tree(self):
+        # deeper than the 100 bytes of a ustar name, PAX headers carry it
+        parts = [f"level{i}" for i in range(64)]
+        members = [
+            (dir_member("/".join(parts[: i + 1])), None) for i in range(len(parts))
+        ]
+        leaf = "/".join(parts + ["leaf"])
+        members.append((file_member(leaf, 5), b"deep\n"))
+        members.append((link_member("/".join(parts + ["link"]), "leaf"), None))
+        self.put("/tmp", members)
+
+        fetched = self.get("/tmp/level0")
+        self.assertEqual(fetched[leaf], hashlib.sha256(b"deep\n").hexdigest())
+        self.assertEqual(len(fetched), len(members))
+        link = self.stat("/tmp/" + "/".join(parts + ["link"]))
+        self.assertTrue(link["linkTarget"].endswith("leaf"), link)
+
+    def test_round_trip(self):
+        content = os.urandom(300 * 1024)
+        self.put(
+            "/tmp",
+            [
+                (dir_member("src"), None),
+                (file_member("src/data", len(content)), content),
+            ],
+        )
+        with self.api.get(self.archive, params={"path": "/tmp/src"}, stream=True) as r:
+            self.assertEqual(r.status_code, 200)
+            archive = r.content
+
+        # an archive taken from a container is accepted by PUT unchanged
+        r = self.api.put(
+            self.archive, params={"path": "/root"}, data=io.BytesIO(archive)
+        )
+        self.assertEqual(r.status_code, 200, r.text)
+        self.assertEqual(self.stat("/root/src/data")["size"], len(content))
+
+    def test_not_found(self):
+        r = self.api.get(self.archive, params={"path": "/tmp/missing"})
+        self.assertEqual(r.status_code, 404)
+        r = self.api.head(self.archive, params={"path": "/tmp/missing"})
+        self.assertEqual(r.status_code, 404)
+
+        r = self.api.get(self.archive)
+        self.assertEqual(r.status_code, 400)
+
+        r = self.api.put(
+            "/containers/missing/archive",
+            params={"path": "/tmp"},
+            data=TarStream([(file_member("f", 1), b"x")]),
+        )
+        self.assertEqual(r.status_code, 404)
+
+
+if __name__ == "__main__":
+    # Setup temporary space
+    unittest.main()
@@ -1,66 +1,57 @@
-import subprocess
-import sys
-import time
 import unittest
 
 from docker import DockerClient, errors
 
-from test.python.docker import Podman
 from test.python.docker.compat import common, constant
+from test.python.harness import get_session
 
 
 class TestContainers(unittest.TestCase):
+    session = None  # podman service and storage shared by all suites
     podman = None  # initialized podman configuration for tests
-    service = None  # podman service instance
     topContainerId = ""
 
     def setUp(self):
         super().setUp()
-        self.client = DockerClient(base_url="tcp://127.0.0.1:8080", timeout=15)
-        TestContainers.podman.restore_image_from_cache(self.client)
-        TestContainers.topContainerId = common.run_top_container(self.client)
+        self.client = DockerClient(
+            base_url=TestContainers.session.docker_url, timeout=15
+        )
+        if TestContainers.session.reset(images=[constant.ALPINE]):
+            TestContainers.podman.restore_image_from_cache(TestContainers.session.api)
+        # subscribed after reset(), a snapshot restore restarts the service
+        self.waiter = TestContainers.session.waiter
+        self.fixtures = TestContainers.session.fixtures
+        TestContainers.topContainerId = common.run_top_container(
+            self.client, labels=TestContainers.session.labels, fixtures=self.fixtures
+        )
         self.assertIsNotNone(TestContainers.topContainerId)
 
     def tearDown(self):
-        common.remove_all_containers(self.client)
-        common.remove_all_images(self.client)
         self.client.close()
         return super().tearDown()
 
     @classmethod
     def setUpClass(cls):
         super().setUpClass()
-        TestContainers.podman = Podman()
-        TestContainers.service = TestContainers.podman.open(
-            "system", "service", "tcp:127.0.0.1:8080", "--time=0"
-        )
-        # give the service some time to be ready...
-        time.sleep(2)
-
-        rc = TestContainers.service.poll()
-        if rc is not None:
-            raise subprocess.CalledProcessError(rc, "podman system service")
+        TestContainers.session = get_session()
+        TestContainers.podman = TestContainers.session.podman
 
     @classmethod
     def tearDownClass(cls):
-        TestContainers.service.terminate()
-        stdout, stderr = TestContainers.service.communicate(timeout=0.5)
-        if stdout:
-            sys.stdout.write("\nContainers Service Stdout:\n" + stdout.decode("utf-8"))
-        if stderr:
-            sys.stderr.write("\nContainers Service Stderr:\n" + stderr.decode("utf-8"))
-
-        TestContainers.podman.tear_down()
-        return super().tearDownClass()
+        TestContainers.session.profile(cls.__name__)
+        super().tearDownClass()
 
     def test_create_container(self):
         # Run a container with detach mode
-        self.client.containers.create(image="alpine", detach=True)
+        ctnr = self.client.containers.create(image="alpine", detach=True)
+        self.fixtures.add("container", ctnr.id)
         self.assertEqual(len(self.client.containers.list(all=True)), 2)
 
     def test_create_network(self):
         net = self.client.networks.create("testNetwork", driver="bridge")
+        self.fixtures.add("network", net.id, name="testNetwork")
         ctnr = self.client.containers.create(image="alpine", detach=True)
+        self.fixtures.add("container", ctnr.id)
 
         #  TODO fix when ready
         # This test will not work until all connect|disconnect
@@ -83,7 +74,8 @@ class TestContainers(unittest.TestCase):
         # self.assertEqual(error.exception.response.status_code, 304)
 
         # Create a new container and validate the count
-        self.client.containers.create(image=constant.ALPINE, name="container2")
+        ctnr = self.client.containers.create(image=constant.ALPINE, name="container2")
+        self.fixtures.add("container", ctnr.id, name="container2")
         containers = self.client.containers.list(all=True)
         self.assertEqual(len(containers), 2)
 
@@ -93,6 +85,7 @@ class TestContainers(unittest.TestCase):
             name="containerWithRandomBind",
             ports={"1234/tcp": None},
         )
+        self.fixtures.add("container", container.id, name="containerWithRandomBind")
         containers = self.client.containers.list(all=True)
         self.assertTrue(container in containers)
 
@@ -102,8 +95,7 @@ class TestContainers(unittest.TestCase):
 
         # Stop a running container and validate the state
         top.stop()
-        top.reload()
-        self.assertIn(top.status, ("stopped", "exited"))
+        self.waiter.wait_for(top.id, ("stopped", "exited"))
 
     def test_kill_container(self):
         top = self.client.containers.get(TestContainers.topContainerId)
@@ -111,20 +103,18 @@ class TestContainers(unittest.TestCase):
 
         # Kill a running container and validate the state
         top.kill()
-        top.reload()
-        self.assertIn(top.status, ("stopped", "exited"))
+        self.waiter.wait_for(top.id, ("stopped", "exited"))
 
     def test_restart_container(self):
         # Validate the container state
         top = self.client.containers.get(TestContainers.topContainerId)
         top.stop()
-        top.reload()
-        self.assertIn(top.status, ("stopped", "exited"))
+        self.waiter.wait_for(top.id, ("stopped", "exited"))
 
         # restart a running container and validate the state
+        running = self.waiter.expect(top.id, "running")
         top.restart()
-        top.reload()
-        self.assertEqual(top.status, "running")
+        running.result(timeout=self.waiter.timeout)
 
     def test_remove_container(self):
         # Remove container by ID with force
@@ -154,8 +144,7 @@ class TestContainers(unittest.TestCase):
 
         # Pause a running container and validate the state
         top.pause()
-        top.reload()
-        self.assertEqual(top.status, "paused")
+        self.waiter.wait_for(top.id, "paused")
 
     def test_pause_stopped_container(self):
         # Stop the container
@@ -172,17 +161,16 @@ class TestContainers(unittest.TestCase):
 
         # Validate the container state
         top.pause()
-        top.reload()
-        self.assertEqual(top.status, "paused")
+        self.waiter.wait_for(top.id, "paused")
 
         # Pause a running container and validate the state
         top.unpause()
-        top.reload()
-        self.assertEqual(top.status, "running")
+        self.waiter.wait_for(top.id, "running")
 
     def test_list_container(self):
         # Add container and validate the count
-        self.client.containers.create(image="alpine", detach=True)
+        ctnr = self.client.containers.create(image="alpine", detach=True)
+        self.fixtures.add("container", ctnr.id)
         containers = self.client.containers.list(all=True)
         self.assertEqual(len(containers), 2)
 
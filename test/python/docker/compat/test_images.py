@@ -1,56 +1,38 @@
 import collections
 import os
-import subprocess
-import sys
-import time
 import unittest
 
 from docker import DockerClient, errors
 
-from test.python.docker import Podman
-from test.python.docker.compat import common, constant
+from test.python.docker.compat import constant
+from test.python.harness import get_session
 
 
 class TestImages(unittest.TestCase):
+    session = None  # podman service and storage shared by all suites
     podman = None  # initialized podman configuration for tests
-    service = None  # podman service instance
 
     def setUp(self):
         super().setUp()
-        self.client = DockerClient(base_url="tcp://127.0.0.1:8080", timeout=15)
-
-        TestImages.podman.restore_image_from_cache(self.client)
+        self.client = DockerClient(base_url=TestImages.session.docker_url, timeout=15)
+        if TestImages.session.reset(images=[constant.ALPINE]):
+            TestImages.podman.restore_image_from_cache(TestImages.session.api)
+        self.fixtures = TestImages.session.fixtures
 
     def tearDown(self):
-        common.remove_all_images(self.client)
         self.client.close()
         return super().tearDown()
 
     @classmethod
     def setUpClass(cls):
         super().setUpClass()
-        TestImages.podman = Podman()
-        TestImages.service = TestImages.podman.open(
-            "system", "service", "tcp:127.0.0.1:8080", "--time=0"
-        )
-        # give the service some time to be ready...
-        time.sleep(2)
-
-        returncode = TestImages.service.poll()
-        if returncode is not None:
-            raise subprocess.CalledProcessError(returncode, "podman system service")
+        TestImages.session = get_session()
+        TestImages.podman = TestImages.session.podman
 
     @classmethod
     def tearDownClass(cls):
-        TestImages.service.terminate()
-        stdout, stderr = TestImages.service.communicate(timeout=0.5)
-        if stdout:
-            sys.stdout.write("\nImages Service Stdout:\n" + stdout.decode("utf-8"))
-        if stderr:
-            sys.stderr.write("\nImAges Service Stderr:\n" + stderr.decode("utf-8"))
-
-        TestImages.podman.tear_down()
-        return super().tearDownClass()
+        TestImages.session.profile(cls.__name__)
+        super().tearDownClass()
 
     def test_tag_valid_image(self):
         """Validates if the image is tagged successfully"""
@@ -75,7 +57,8 @@ class TestImages(unittest.TestCase):
         self.assertEqual(len(self.client.images.list()), 1)
 
         # Add more images
-        self.client.images.pull(constant.BB)
+        image = self.client.images.pull(constant.BB)
+        self.fixtures.add("image", image.id, name=constant.BB)
         self.assertEqual(len(self.client.images.list()), 2)
 
         # List images with filter
@@ -126,6 +109,7 @@ class TestImages(unittest.TestCase):
     def test_save_image(self):
         """Export Image"""
         image = self.client.images.pull(constant.BB)
+        self.fixtures.add("image", image.id, name=constant.BB)
 
         file = os.path.join(TestImages.podman.image_cache, "busybox.tar")
         with open(file, mode="wb") as tarball:
@@ -139,6 +123,7 @@ class TestImages(unittest.TestCase):
         self.assertEqual(len(self.client.images.list()), 1)
 
         image = self.client.images.pull(constant.BB)
+        self.fixtures.add("image", image.id, name=constant.BB)
         file = os.path.join(TestImages.podman.image_cache, "busybox.tar")
         with open(file, mode="wb") as tarball:
             for frame in image.save():
@@ -153,6 +138,7 @@ class TestImages(unittest.TestCase):
         labels = {"apple": "red", "grape": "green"}
         _ = self.client.images.build(path="test/python/docker/build_labels", labels=labels, tag="labels")
         image = self.client.images.get("labels")
+        self.fixtures.add("image", image.id, name="labels")
         self.assertEqual(image.labels["apple"], labels["apple"])
         self.assertEqual(image.labels["grape"], labels["grape"])
 
@@ -0,0 +1,7 @@
+"""Shared harness for the python test suites driving `podman system service`"""
+
+from .aio import APIError, AsyncLibpodClient
+from .client import COMPAT_PREFIX, LIBPOD_PREFIX, LibpodClient
+from .podman import WORKER, Podman
+from .service import PodmanService, docker_url, service_url
+from .session import LABEL, SERVICE_URI, Session, get_session
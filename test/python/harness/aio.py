@@ -0,0 +1,514 @@
+"""asyncio client for the podman service, standard library only
+
+Requests are HTTP/1.1 over asyncio streams to a TCP or unix domain socket
+listener, connections are kept alive in a bounded pool. The gather_*()
+helpers fan out one call per container with bounded concurrency:
+
+    async with AsyncLibpodClient(session.url) as client:
+        ids = await client.gather_create([{"image": ALPINE}] * 500)
+        await client.gather_start(ids, limit=32)
+"""
+import asyncio
+import collections
+import json
+import urllib.parse
+
+from .client import LIBPOD_PREFIX
+from .stream import MAX_BUFFER, JSONStreamDecoder
+from .transport import SCHEME as UNIX_SCHEME
+from .transport import socket_path
+
+_CHUNK_SIZE = 64 * 1024
+
+
+class APIError(Exception):
+    """The service answered with an error status"""
+
+    def __init__(self, method, path, status, body):
+        self.method = method
+        self.path = path
+        self.status = status
+        self.body = body
+        super().__init__(
+            f"{method} {path}: {status} {body.decode('utf-8', errors='replace')}"
+        )
+
+
+class Response(object):
+    """Status, headers and body of a completed request"""
+
+    def __init__(self, method, path, status, headers, body):
+        self.method = method
+        self.path = path
+        self.status = status
+        self.headers = headers
+        self.body = body
+
+    @property
+    def text(self):
+        return self.body.decode("utf-8", errors="replace")
+
+    def json(self):
+        return json.loads(self.body)
+
+    def raise_for_status(self):
+        """:raises APIError: status is 400 or above"""
+        if self.status >= 400:
+            raise APIError(self.method, self.path, self.status, self.body)
+
+
+class _Connection(object):
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+
+    @property
+    def closed(self):
+        return self.writer.is_closing() or self.reader.at_eof()
+
+    def close(self):
+        self.writer.close()
+
+
+class StreamResponse(object):
+    """Response whose body is read incrementally, e.g. events or stats"""
+
+    def __init__(self, method, path, connection, status, headers):
+        self.method = method
+        self.path = path
+        self.status = status
+        self.headers = headers
+        self._connection = connection
+
+    async def chunks(self):
+        """Yield the body as it arrives"""
+        async for chunk in _read_body(self._connection.reader, self.headers):
+            yield chunk
+
+    async def lines(self):
+        """Yield the body line by line, without line endings"""
+        buffer = b""
+        async for chunk in self.chunks():
+            buffer += chunk
+            *lines, buffer = buffer.split(b"\n")
+            for line in lines:
+                yield line.rstrip(b"\r")
+        if buffer:
+            yield buffer
+
+    async def json_objects(self, max_buffer=MAX_BUFFER):
+        """Yield the decoded objects of a newline delimited JSON body as they arrive"""
+        decoder = JSONStreamDecoder(max_buffer)
+        async for chunk in self.chunks():
+            for obj in decoder.feed(chunk):
+                yield obj
+        for obj in decoder.close():
+            yield obj
+
+    async def read(self):
+        return b"".join([chunk async for chunk in self.chunks()])
+
+    async def raise_for_status(self):
+        """:raises APIError: status is 400 or above"""
+        if self.status >= 400:
+            raise APIError(self.method, self.path, self.status, await self.read())
+
+    def close(self):
+        self._connection.close()
+
+
+async def _read_head(reader):
+    line = await reader.readline()
+    if not line:
+        raise ConnectionResetError("connection closed by the service")
+
+    status = int(line.split(None, 2)[1])
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    return status, headers
+
+
+async def _read_body(reader, headers):
+    if headers.get("transfer-encoding", "").lower() == "chunked":
+        while True:
+            size = int((await reader.readline()).split(b";", 1)[0], 16)
+            if size == 0:
+                # skip trailers
+                while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                    pass
+                return
+            yield await reader.readexactly(size)
+            await reader.readexactly(2)
+    elif "content-length" in headers:
+        remaining = int(headers["content-length"])
+        while remaining > 0:
+            chunk = await reader.read(min(remaining, _CHUNK_SIZE))
+            if not chunk:
+                raise asyncio.IncompleteReadError(b"", remaining)
+            remaining -= len(chunk)
+            yield chunk
+    else:
+        # delimited by the service closing the connection
+        while True:
+            chunk = await reader.read(_CHUNK_SIZE)
+            if not chunk:
+                return
+            yield chunk
+
+
+def _has_body(method, status):
+    return not (method == "HEAD" or status in (204, 304) or 100 <= status < 200)
+
+
+def _reusable(method, status, headers):
+    if headers.get("connection", "").lower() == "close":
+        return False
+    return (
+        not _has_body(method, status)
+        or "content-length" in headers
+        or headers.get("transfer-encoding", "").lower() == "chunked"
+    )
+
+
+async def bounded_gather(func, items, limit=32, return_exceptions=False):
+    """Await func(item) for every item with at most limit calls in flight
+
+    :return: results in the order of items, see asyncio.gather()
+    """
+    semaphore = asyncio.Semaphore(limit)
+
+    async def call(item):
+        async with semaphore:
+            return await func(item)
+
+    return await asyncio.gather(
+        *(call(item) for item in items), return_exceptions=return_exceptions
+    )
+
+
+class AsyncLibpodClient(object):
+    """
+    asyncio client for the podman service
+
+    Paths are relative to an API prefix, the libpod API by default. An
+    instance belongs to the event loop it is first used on.
+    """
+
+    def __init__(self, base_url, prefix=LIBPOD_PREFIX, pool_size=32, timeout=None):
+        """Initialize a client for the service at base_url
+
+        :param base_url: service URL, e.g. http://localhost:8080 or http+unix://%2Frun%2Fpodman.sock
+        :param prefix: API prefix prepended to every path
+        :param pool_size: maximum number of requests in flight, streams excluded
+        :param timeout: seconds allowed for a request, None waits forever
+        """
+        self.base_url = base_url.rstrip("/")
+        self.prefix = prefix
+        self.pool_size = pool_size
+        self.timeout = timeout
+
+        if self.base_url.startswith(UNIX_SCHEME):
+            self._path = socket_path(self.base_url)
+            self._host = "localhost"
+            self._port = None
+        else:
+            parts = urllib.parse.urlsplit(self.base_url)
+            self._path = None
+            self._host = parts.hostname
+            self._port = parts.port or 80
+
+        self._idle = collections.deque()
+        self._slots = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+
+    async def close(self):
+        """Close idle connections"""
+        while self._idle:
+            connection = self._idle.pop()
+            connection.close()
+            try:
+                await connection.writer.wait_closed()
+            except OSError:
+                pass
+
+    async def _connect(self):
+        if self._path is not None:
+            reader, writer = await asyncio.open_unix_connection(
+                self._path, limit=_CHUNK_SIZE
+            )
+        else:
+            reader, writer = await asyncio.open_connection(
+                self._host, self._port, limit=_CHUNK_SIZE
+            )
+        return _Connection(reader, writer)
+
+    def _target(self, path, params, prefix):
+        target = (self.prefix if prefix is None else prefix) + path
+        query = urllib.parse.urlencode(
+            {k: v for k, v in (params or {}).items() if v is not None}, doseq=True
+        )
+        if query:
+            target += ("&" if "?" in target else "?") + query
+        return target
+
+    async def _send(self, connection, method, target, body, headers):
+        lines = [f"{method} {target} HTTP/1.1", f"Host: {self._host}"]
+        if body is not None or method in ("POST", "PUT"):
+            lines.append(f"Content-Length: {len(body or b'')}")
+        for name, value in (headers or {}).items():
+            lines.append(f"{name}: {value}")
+        head = ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1")
+
+        connection.writer.write(head + (body or b""))
+        await connection.writer.drain()
+        return await _read_head(connection.reader)
+
+    @staticmethod
+    def _encode(json_body, data, headers):
+        headers = dict(headers or {})
+        if json_body is not None:
+            headers.setdefault("Content-Type", "application/json")
+            return json.dumps(json_body).encode("utf-8"), headers
+        return data, headers
+
+    async def request(
+        self, method, path, params=None, json=None, data=None, headers=None, prefix=None
+    ):
+        """Send a request and read the whole response
+
+        :param method: HTTP method
+        :param path: path below the client's prefix, may include a query string
+        :param params: query parameters, None values are dropped
+        :param json: object sent as JSON body
+        :param data: bytes sent as body
+        :param prefix: API prefix overriding the client's prefix, "" for /_ping
+        :return: Response
+        """
+        target = self._target(path, params, prefix)
+        body, headers = self._encode(json, data, headers)
+        coro = self._request(method, target, body, headers)
+        if self.timeout is None:
+            return await coro
+        return await asyncio.wait_for(coro, self.timeout)
+
+    async def _request(self, method, target, body, headers):
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.pool_size)
+
+        async with self._slots:
+            while True:
+                reused = bool(self._idle)
+                connection = self._idle.pop() if reused else await self._connect()
+                if reused and connection.closed:
+                    connection.close()
+                    continue
+
+                try:
+                    status, response_headers = await self._send(
+                        connection, method, target, body, headers
+                    )
+                except (ConnectionError, asyncio.IncompleteReadError):
+                    connection.close()
+                    # the service may drop a keep-alive connection while idle
+                    if reused:
+                        continue
+                    raise
+                except (asyncio.CancelledError, asyncio.TimeoutError):
+                    # a timeout leaves the response unread, the connection
+                    # can neither be reused nor left open
+                    connection.close()
+                    raise
+                break
+
+            try:
+                payload = b""
+                if _has_body(method, status):
+                    payload = b"".join(
+                        [
+                            c
+                            async for c in _read_body(
+                                connection.reader, response_headers
+                            )
+                        ]
+                    )
+            except BaseException:
+                connection.close()
+                raise
+
+            if _reusable(method, status, response_headers):
+                self._idle.append(connection)
+            else:
+                connection.close()
+        return Response(method, target, status, response_headers, payload)
+
+    async def stream(
+        self, method, path, params=None, json=None, data=None, headers=None, prefix=None
+    ):
+        """Send a request on a dedicated connection, returning before the body is read
+
+        The caller must close() the response.
+
+        :return: StreamResponse
+        """
+        target = self._target(path, params, prefix)
+        body, headers = self._encode(json, data, headers)
+        connection = await self._connect()
+        try:
+            status, response_headers = await self._send(
+                connection, method, target, body, headers
+            )
+        except BaseException:
+            connection.close()
+            raise
+        return StreamResponse(method, target, connection, status, response_headers)
+
+    async def get(self, path, **kwargs):
+        return await self.request("GET", path, **kwargs)
+
+    async def post(self, path, **kwargs):
+        return await self.request("POST", path, **kwargs)
+
+    async def delete(self, path, **kwargs):
+        return await self.request("DELETE", path, **kwargs)
+
+    async def ping(self):
+        r = await self.get("/_ping", prefix="")
+        r.raise_for_status()
+        return r.text
+
+    async def list_containers(self, all=True, filters=None):
+        params = {"all": str(all).lower()}
+        if filters:
+            params["filters"] = json.dumps(filters)
+        r = await self.get("/containers/json", params=params)
+        r.raise_for_status()
+        return r.json() or []
+
+    async def inspect_container(self, id):
+        r = await self.get(f"/containers/{id}/json")
+        r.raise_for_status()
+        return r.json()
+
+    async def create_container(self, spec):
+        """Create a container from a SpecGenerator, e.g. {"image": ..., "command": [...]}
+
+        :return: Id of the new container
+        """
+        r = await self.post("/containers/create", json=spec)
+        r.raise_for_status()
+        return r.json()["Id"]
+
+    async def start_container(self, id):
+        """Start a container, starting a running container is not an error"""
+        r = await self.post(f"/containers/{id}/start")
+        r.raise_for_status()
+
+    async def stop_container(self, id, timeout=None):
+        """Stop a container, stopping a stopped container is not an error
+
+        :param timeout: seconds before the container is killed, None for its default
+        """
+        r = await self.post(f"/containers/{id}/stop", params={"t": timeout})
+        r.raise_for_status()
+
+    async def wait_container(self, id, condition=None):
+        """Wait for a container to reach condition, stopped or exited by default
+
+        :return: exit code of the container
+        """
+        r = await self.post(f"/containers/{id}/wait", params={"condition": condition})
+        r.raise_for_status()
+        return int(r.text)
+
+    async def delete_container(self, id, force=False, volumes=False):
+        r = await self.delete(
+            f"/containers/{id}",
+            params={"force": str(force).lower(), "v": str(volumes).lower()},
+        )
+        r.raise_for_status()
+
+    async def pull_image(self, reference):
+        """Pull an image, consuming the progress stream
+
+        :return: Ids of the pulled images
+        :raises APIError: the service reported an error
+        """
+        response = await self.stream(
+            "POST", "/images/pull", params={"reference": reference}
+        )
+        try:
+            await response.raise_for_status()
+            images = []
+            async for report in response.json_objects():
+                if report.get("error"):
+                    raise APIError(
+                        response.method,
+                        response.path,
+                        response.status,
+                        report["error"].encode("utf-8"),
+                    )
+                images = report.get("images") or images
+            return images
+        finally:
+            response.close()
+
+    async def events(self, filters=None, since=None, until=None):
+        """Yield events as they are reported, until the service ends the stream"""
+        params = {"stream": "true", "since": since, "until": until}
+        if filters:
+            params["filters"] = json.dumps(filters)
+        response = await self.stream("GET", "/events", params=params)
+        try:
+            await response.raise_for_status()
+            async for event in response.json_objects():
+                yield event
+        finally:
+            response.close()
+
+    async def stats(self, ids=None, stream=True):
+        """Yield stats reports of the given containers, all running ones by default"""
+        params = {"stream": str(stream).lower()}
+        if ids:
+            params["containers"] = list(ids)
+        response = await self.stream("GET", "/containers/stats", params=params)
+        try:
+            await response.raise_for_status()
+            async for report in response.json_objects():
+                yield report
+        finally:
+            response.close()
+
+    async def gather_create(self, specs, limit=32):
+        """Create containers concurrently, return their Ids in the order of specs"""
+        return await bounded_gather(self.create_container, specs, limit)
+
+    async def gather_start(self, ids, limit=32):
+        return await bounded_gather(self.start_container, ids, limit)
+
+    async def gather_stop(self, ids, limit=32, timeout=None):
+        return await bounded_gather(
+            lambda id: self.stop_container(id, timeout=timeout), ids, limit
+        )
+
+    async def gather_wait(self, ids, limit=32, condition=None):
+        """Wait for containers concurrently, return exit codes in the order of ids"""
+        return await bounded_gather(
+            lambda id: self.wait_container(id, condition=condition), ids, limit
+        )
+
+    async def gather_delete(self, ids, limit=32, force=False, volumes=False):
+        return await bounded_gather(
+            lambda id: self.delete_container(id, force=force, volumes=volumes),
+            ids,
+            limit,
+        )
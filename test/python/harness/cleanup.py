@@ -0,0 +1,86 @@
+"""Bulk removal of service objects with per kind timings
+
+Objects are pruned in one request where a prune endpoint and a filter
+select them, and whatever is left is removed concurrently on a bounded
+thread pool rather than one request after the other:
+
+    cleanup = Cleanup(workers=8)
+    cleanup.prune("containers", lambda: len(api.post("/containers/prune").json()))
+    cleanup.remove("containers", lambda id: api.delete(f"/containers/{id}"), ids)
+    cleanup.report["containers"]["seconds"]
+"""
+import concurrent.futures
+import time
+
+# Removals in flight at once, kept below the default client connection pool
+WORKERS = 8
+
+
+class Cleanup(object):
+    """Prune and remove objects, accumulating counts and seconds per kind"""
+
+    def __init__(self, workers=WORKERS):
+        """:param workers: removals in flight at once, 1 removes serially"""
+        self.workers = workers
+        # kind: {"pruned": objects, "removed": objects, "seconds": wall time}
+        self.report = {}
+
+    def _account(self, kind, started, pruned=0, removed=0):
+        entry = self.report.setdefault(
+            kind, {"pruned": 0, "removed": 0, "seconds": 0.0}
+        )
+        entry["pruned"] += pruned
+        entry["removed"] += removed
+        entry["seconds"] += time.perf_counter() - started
+
+    def prune(self, kind, prune):
+        """Call prune() once, it returns the number of objects it removed"""
+        started = time.perf_counter()
+        pruned = 0
+        try:
+            pruned = prune() or 0
+        finally:
+            self._account(kind, started, pruned=pruned)
+        return pruned
+
+    def remove(self, kind, remove, items):
+        """Call remove(item) for every item, up to workers at a time
+
+        Every item is attempted before the first failure is raised.
+
+        :return: number of items removed
+        """
+        items = list(items)
+        started = time.perf_counter()
+        errors = []
+        try:
+            if self.workers <= 1 or len(items) <= 1:
+                for item in items:
+                    try:
+                        remove(item)
+                    except Exception as e:
+                        errors.append(e)
+            else:
+                workers = min(self.workers, len(items))
+                with concurrent.futures.ThreadPoolExecutor(workers) as pool:
+                    for future in [pool.submit(remove, item) for item in items]:
+                        if future.exception() is not None:
+                            errors.append(future.exception())
+        finally:
+            self._account(kind, started, removed=len(items) - len(errors))
+
+        if errors:
+            raise errors[0]
+        return len(items)
+
+    @property
+    def seconds(self):
+        """Wall time spent on all kinds"""
+        return sum(entry["seconds"] for entry in self.report.values())
+
+    def summary(self):
+        """One line of objects removed and seconds spent per kind"""
+        return ", ".join(
+            f"{kind} {e['pruned'] + e['removed']} in {e['seconds']:.2f}s"
+            for kind, e in self.report.items()
+        )
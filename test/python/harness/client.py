@@ -0,0 +1,239 @@
+import mmap
+import os
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from .stream import MAX_BUFFER, JSONStream
+from .transport import SCHEME as UNIX_SCHEME
+from .transport import UnixHTTPAdapter, socket_path
+
+# API prefixes served by podman system service
+LIBPOD_PREFIX = "/v2.0.0/libpod"
+COMPAT_PREFIX = "/v1.40"
+
+# Buffer of save_image() and chunk of load_image()
+TRANSFER_CHUNK = 4 * 1024 * 1024
+
+
+def _read_error(r):
+    """Read the body of a streamed error response, releasing its connection
+
+    The body, a single JSON object, stays available as r.text to the
+    HTTPError raised next. Closing the response unread would close its
+    connection rather than return it to the pool.
+    """
+    body = r.content
+    r.close()
+    return body
+
+
+class _Pool(object):
+    """
+    requests.Session whose connection pool is rebuilt in a forked child,
+    pooled sockets must never be shared between processes
+    """
+
+    def __init__(self, base_url, size, block):
+        self.base_url = base_url
+        self.size = size
+        self.block = block
+        self._pid = None
+        self._session = None
+
+    @property
+    def session(self):
+        if self._pid != os.getpid():
+            self._pid = os.getpid()
+            self._session = requests.Session()
+            if self.base_url.startswith(UNIX_SCHEME):
+                adapter = UnixHTTPAdapter(
+                    socket_path(self.base_url),
+                    pool_maxsize=self.size,
+                    pool_block=self.block,
+                )
+                self._session.mount(UNIX_SCHEME, adapter)
+            else:
+                adapter = HTTPAdapter(
+                    pool_connections=1, pool_maxsize=self.size, pool_block=self.block
+                )
+                self._session.mount("http://", adapter)
+        return self._session
+
+    def close(self):
+        if self._session is not None and self._pid == os.getpid():
+            self._session.close()
+        self._session = None
+        self._pid = None
+
+
+class LibpodClient(object):
+    """
+    Pooled, keep-alive client for the podman service
+
+    Paths are relative to an API prefix, the libpod API by default. Views
+    on other prefixes share the same connection pool, see with_prefix().
+    """
+
+    def __init__(
+        self,
+        base_url,
+        prefix=LIBPOD_PREFIX,
+        pool_size=10,
+        pool_block=False,
+        timeout=None,
+        timeouts=None,
+    ):
+        """Initialize a client for the service at base_url
+
+        :param base_url: service URL, e.g. http://localhost:8080 or http+unix://%2Frun%2Fpodman.sock
+        :param prefix: API prefix prepended to every path
+        :param pool_size: maximum number of connections kept alive
+        :param pool_block: block callers rather than open connections beyond pool_size
+        :param timeout: default timeout in seconds, None waits forever
+        :param timeouts: timeouts in seconds keyed by path prefix, e.g. {"/images/pull": 120}
+        """
+        self.base_url = base_url.rstrip("/")
+        self.prefix = prefix
+        self.timeout = timeout
+        self.timeouts = dict(timeouts or {})
+        self._pool = _Pool(self.base_url, pool_size, pool_block)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    @property
+    def session(self):
+        """requests.Session backing this client"""
+        return self._pool.session
+
+    def close(self):
+        """Close pooled connections, views created by with_prefix() included"""
+        self._pool.close()
+
+    def with_prefix(self, prefix):
+        """Return a client on another API prefix sharing this client's pool
+
+        :param prefix: e.g. COMPAT_PREFIX or "" for unversioned paths like /_ping
+        """
+        view = object.__new__(LibpodClient)
+        view.__dict__.update(self.__dict__)
+        view.prefix = prefix
+        return view
+
+    @property
+    def compat(self):
+        """Client on the docker compatible API sharing this client's pool"""
+        return self.with_prefix(COMPAT_PREFIX)
+
+    def url(self, path):
+        return self.base_url + self.prefix + path
+
+    def timeout_for(self, path):
+        """Return the timeout for path, the longest matching prefix in timeouts wins"""
+        route = path.split("?", 1)[0]
+        match = None
+        for key in self.timeouts:
+            if route.startswith(key) and (match is None or len(key) > len(match)):
+                match = key
+        return self.timeouts[match] if match is not None else self.timeout
+
+    def request(self, method, path, **kwargs):
+        """Send a request, see requests.Session.request() for keywords
+
+        :param method: HTTP method
+        :param path: path below the client's prefix, may include a query string
+        """
+        kwargs.setdefault("timeout", self.timeout_for(path))
+        return self.session.request(method, self.url(path), **kwargs)
+
+    def get(self, path, **kwargs):
+        return self.request("GET", path, **kwargs)
+
+    def head(self, path, **kwargs):
+        return self.request("HEAD", path, **kwargs)
+
+    def post(self, path, **kwargs):
+        return self.request("POST", path, **kwargs)
+
+    def put(self, path, **kwargs):
+        return self.request("PUT", path, **kwargs)
+
+    def delete(self, path, **kwargs):
+        return self.request("DELETE", path, **kwargs)
+
+    def stream_json(self, method, path, max_buffer=MAX_BUFFER, **kwargs):
+        """Send a request, returning a JSONStream over the objects of the response
+
+        :raises requests.HTTPError: the service answered with an error status
+        """
+        r = self.request(method, path, stream=True, **kwargs)
+        if r.status_code >= 400:
+            _read_error(r)
+            r.raise_for_status()
+        return JSONStream(r, max_buffer=max_buffer)
+
+    def save_image(self, reference, f, format="docker-archive", chunk=TRANSFER_CHUNK):
+        """Write the tarball of reference from /images/{name}/get into f
+
+        The body is read into one preallocated buffer and written from it,
+        memory stays at chunk bytes whatever the size of the image.
+
+        :param f: binary file object, e.g. opened with "wb"
+        :param format: archive format, docker-archive, oci-archive, ...
+        :return: bytes written
+        :raises requests.HTTPError: the service answered with an error status
+        """
+        r = self.get(f"/images/{reference}/get", params={"format": format}, stream=True)
+        with r:
+            if r.status_code >= 400:
+                _read_error(r)
+                r.raise_for_status()
+
+            # a compressed body is decoded as read, as iter_content() does
+            r.raw.decode_content = True
+            buffer = bytearray(chunk)
+            view = memoryview(buffer)
+            written = 0
+            while True:
+                n = r.raw.readinto(view)
+                if not n:
+                    break
+                f.write(view[:n])
+                written += n
+            return written
+
+    def load_image(self, path, chunk=TRANSFER_CHUNK, **kwargs):
+        """Upload the tarball at path to /images/load
+
+        The body is sent chunked from a read-only mmap of the tarball,
+        pages are read by the kernel as the upload proceeds rather than
+        held in the client.
+
+        :param path: docker-archive or oci-archive tarball
+        :param chunk: bytes per chunk of the request body
+        :return: requests.Response
+        """
+        with open(path, "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                # an empty file cannot be mapped, let the service reject it
+                return self.post("/images/load", data=b"", **kwargs)
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+                if hasattr(m, "madvise"):
+                    m.madvise(mmap.MADV_SEQUENTIAL)
+                chunks = _chunks(m, chunk)
+                try:
+                    return self.post("/images/load", data=chunks, **kwargs)
+                finally:
+                    # release the slice held by an interrupted upload
+                    chunks.close()
+
+
+def _chunks(buffer, size):
+    """Yield memoryview slices of buffer, released before the next one is made"""
+    for offset in range(0, len(buffer), size):
+        with memoryview(buffer)[offset : offset + size] as view:
+            yield view
@@ -0,0 +1,589 @@
+"""In process registry serving the OCI distribution API to the service
+
+Tests pulling, pushing and searching images otherwise depend on quay.io
+and docker.io, so they fail without network access and time the internet
+rather than podman. Registry answers the endpoints podman uses:
+
+    GET        /v2/
+    GET|HEAD   /v2/<name>/manifests/<tag or digest>
+    PUT|DELETE /v2/<name>/manifests/<tag or digest>
+    GET|HEAD   /v2/<name>/blobs/<digest>
+    POST       /v2/<name>/blobs/uploads/  monolithic with ?digest=, ?mount=
+    PATCH|PUT  /v2/<name>/blobs/uploads/<id>  chunked uploads
+    GET        /v2/<name>/tags/list, /v2/_catalog
+    GET        /v1/search  the search endpoint of docker.io, used by podman search
+
+Blobs are kept in a scratch directory, manifests in memory. Images are
+seeded from docker-archive tarballs, as written by `podman save` and kept
+by the image cache:
+
+    with Registry() as registry:
+        registry.add_archive("alpine.tar")
+        podman.write_registries_conf(registry.host)
+"""
+import collections
+import hashlib
+import io
+import json
+import os
+import re
+import shutil
+import tarfile
+import tempfile
+import threading
+import urllib.parse
+import uuid
+from http import server
+
+# media types of the manifests written by put_image()
+MANIFEST = "application/vnd.docker.distribution.manifest.v2+json"
+CONFIG = "application/vnd.docker.container.image.v1+json"
+LAYER = "application/vnd.docker.image.rootfs.diff.tar"
+LAYER_GZIP = "application/vnd.docker.image.rootfs.diff.tar.gzip"
+
+# manifests accepted on PUT, those listing others are not checked for blobs
+MANIFESTS = (
+    MANIFEST,
+    "application/vnd.oci.image.manifest.v1+json",
+    "application/vnd.docker.distribution.manifest.list.v2+json",
+    "application/vnd.oci.image.index.v1+json",
+)
+
+# bytes read or written at a time when streaming blobs
+CHUNK = 1024 * 1024
+
+_DIGEST = re.compile(r"^sha256:[a-f0-9]{64}$")
+_NAME = r"(?P<name>[a-z0-9]+(?:[._/-][a-z0-9]+)*)"
+
+# method: (pattern, handler method name)
+_ROUTES = collections.defaultdict(list)
+for _method, _pattern, _action in (
+    ("GET", r"/v2/?", "version_check"),
+    ("GET", r"/v2/_catalog", "catalog"),
+    ("GET", r"/v1/search", "search"),
+    ("GET", rf"/v2/{_NAME}/tags/list", "tags"),
+    ("GET", rf"/v2/{_NAME}/manifests/(?P<reference>[^/]+)", "get_manifest"),
+    ("HEAD", rf"/v2/{_NAME}/manifests/(?P<reference>[^/]+)", "get_manifest"),
+    ("PUT", rf"/v2/{_NAME}/manifests/(?P<reference>[^/]+)", "put_manifest"),
+    ("DELETE", rf"/v2/{_NAME}/manifests/(?P<reference>[^/]+)", "delete_manifest"),
+    ("POST", rf"/v2/{_NAME}/blobs/uploads/?", "start_upload"),
+    ("GET", rf"/v2/{_NAME}/blobs/uploads/(?P<upload>[^/]+)", "upload_status"),
+    ("PATCH", rf"/v2/{_NAME}/blobs/uploads/(?P<upload>[^/]+)", "patch_upload"),
+    ("PUT", rf"/v2/{_NAME}/blobs/uploads/(?P<upload>[^/]+)", "finish_upload"),
+    ("DELETE", rf"/v2/{_NAME}/blobs/uploads/(?P<upload>[^/]+)", "cancel_upload"),
+    ("GET", rf"/v2/{_NAME}/blobs/(?P<digest>[^/]+)", "get_blob"),
+    ("HEAD", rf"/v2/{_NAME}/blobs/(?P<digest>[^/]+)", "get_blob"),
+):
+    _ROUTES[_method].append((re.compile(f"^{_pattern}$"), _action))
+
+
+class RegistryError(Exception):
+    """A request failed, reported as a distribution API error"""
+
+    def __init__(self, status, code, message):
+        super().__init__(message)
+        self.status = status
+        self.code = code
+        self.message = message
+
+    def body(self):
+        return json.dumps(
+            {"errors": [{"code": self.code, "message": self.message}]}
+        ).encode()
+
+
+def repository_name(reference):
+    """Return the repository of a reference without registry, tag or digest
+
+    e.g. quay.io/libpod/alpine:latest gives libpod/alpine and
+    docker.io/library/alpine gives library/alpine.
+    """
+    name = reference.split("@", 1)[0]
+    last = name.rsplit("/", 1)[-1]
+    if ":" in last:
+        name = name[: -len(last)] + last.split(":", 1)[0]
+    first, _, rest = name.partition("/")
+    if rest and ("." in first or ":" in first or first == "localhost"):
+        name = rest
+    return name
+
+
+def _tag(reference):
+    name = reference.split("@", 1)[0]
+    last = name.rsplit("/", 1)[-1]
+    return last.split(":", 1)[1] if ":" in last else "latest"
+
+
+class _Upload(object):
+    """Blob being uploaded, hashed as its chunks arrive"""
+
+    def __init__(self, name, path):
+        self.name = name
+        self.path = path
+        self.file = open(path, "wb")
+        self.sha256 = hashlib.sha256()
+        self.size = 0
+
+    def write(self, data):
+        self.file.write(data)
+        self.sha256.update(data)
+        self.size += len(data)
+
+
+class Registry(object):
+    """Registry listening on 127.0.0.1 in a thread of the test process"""
+
+    def __init__(self, port=0, directory=None):
+        """
+        :param port: 0 for any free port, see self.host
+        :param directory: blob store, a scratch directory removed by close() by default
+        """
+        self._owned = directory is None
+        self.directory = directory or tempfile.mkdtemp(prefix="podman_registry_")
+        os.makedirs(os.path.join(self.directory, "blobs"), exist_ok=True)
+        os.makedirs(os.path.join(self.directory, "uploads"), exist_ok=True)
+
+        # digest: (media type, bytes)
+        self.manifests = {}
+        # repository: {tag: digest}
+        self.repositories = {}
+        # repository: digests of its manifests
+        self._members = collections.defaultdict(set)
+        self._uploads = {}
+        self._lock = threading.Lock()
+
+        # bytes of blobs served and received, for benchmarks
+        self.bytes_sent = 0
+        self.bytes_received = 0
+
+        self._port = port
+        self._server = None
+        self._thread = None
+
+    @property
+    def host(self):
+        """host:port of the registry, as given to registries.conf"""
+        return f"127.0.0.1:{self._server.server_address[1]}"
+
+    @property
+    def url(self):
+        return f"http://{self.host}"
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def start(self):
+        self._server = server.ThreadingHTTPServer(("127.0.0.1", self._port), _Handler)
+        self._server.daemon_threads = True
+        self._server.registry = self
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def close(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+        for upload in self._uploads.values():
+            upload.file.close()
+        self._uploads.clear()
+        if self._owned:
+            shutil.rmtree(self.directory, ignore_errors=True)
+
+    # blobs
+
+    def blob_path(self, digest):
+        return os.path.join(self.directory, "blobs", digest.replace(":", "-"))
+
+    def has_blob(self, digest):
+        return bool(_DIGEST.match(digest)) and os.path.exists(self.blob_path(digest))
+
+    def put_blob(self, data):
+        """Store bytes or the content of a binary file object
+
+        :return: (digest, size)
+        """
+        fd, tmp = tempfile.mkstemp(dir=os.path.join(self.directory, "uploads"))
+        sha256 = hashlib.sha256()
+        size = 0
+        with os.fdopen(fd, "wb") as f:
+            if isinstance(data, (bytes, bytearray)):
+                data = io.BytesIO(data)
+            for chunk in iter(lambda: data.read(CHUNK), b""):
+                f.write(chunk)
+                sha256.update(chunk)
+                size += len(chunk)
+        digest = "sha256:" + sha256.hexdigest()
+        os.replace(tmp, self.blob_path(digest))
+        return digest, size
+
+    # manifests
+
+    def put_manifest(self, name, reference, body, media_type=MANIFEST):
+        """Store a manifest under a tag or its digest
+
+        :return: digest of the manifest
+        """
+        digest = "sha256:" + hashlib.sha256(body).hexdigest()
+        if _DIGEST.match(reference) and reference != digest:
+            raise RegistryError(400, "DIGEST_INVALID", f"{reference} != {digest}")
+        with self._lock:
+            self.manifests[digest] = (media_type, bytes(body))
+            self._members[name].add(digest)
+            tags = self.repositories.setdefault(name, {})
+            if not _DIGEST.match(reference):
+                tags[reference] = digest
+        return digest
+
+    def resolve(self, name, reference):
+        """Return (digest, media type, body) of a manifest
+
+        :raises RegistryError: unknown repository or manifest
+        """
+        with self._lock:
+            if name not in self.repositories:
+                raise RegistryError(404, "NAME_UNKNOWN", f"{name} is unknown")
+            digest = reference
+            if not _DIGEST.match(reference):
+                digest = self.repositories[name].get(reference)
+            if digest not in self._members[name]:
+                raise RegistryError(
+                    404, "MANIFEST_UNKNOWN", f"{name}:{reference} is unknown"
+                )
+            media_type, body = self.manifests[digest]
+        return digest, media_type, body
+
+    def tag(self, name, tag, target, target_tag="latest"):
+        """Tag the manifest of name:tag as target:target_tag"""
+        digest, media_type, body = self.resolve(name, tag)
+        self.put_manifest(target, target_tag, body, media_type)
+        return digest
+
+    def put_image(self, name, tag, config, layers, layer_type=LAYER):
+        """Store an image from its configuration and layer tarballs
+
+        :param config: image configuration, a dict or JSON bytes
+        :param layers: bytes or binary file objects of the layers, base first
+        :param layer_type: media type of the layers, LAYER_GZIP when compressed
+        :return: digest of the manifest
+        """
+        if isinstance(config, dict):
+            config = json.dumps(config).encode()
+        config_digest, config_size = self.put_blob(config)
+        descriptors = []
+        for layer in layers:
+            digest, size = self.put_blob(layer)
+            descriptors.append(
+                {"mediaType": layer_type, "size": size, "digest": digest}
+            )
+        manifest = {
+            "schemaVersion": 2,
+            "mediaType": MANIFEST,
+            "config": {
+                "mediaType": CONFIG,
+                "size": config_size,
+                "digest": config_digest,
+            },
+            "layers": descriptors,
+        }
+        return self.put_manifest(name, tag, json.dumps(manifest).encode())
+
+    def add_archive(self, path, references=None):
+        """Store the images of a docker-archive tarball
+
+        :param references: references of the images, by default the archive's RepoTags
+        :return: repositories stored, e.g. ["libpod/alpine"]
+        """
+        stored = []
+        with tarfile.open(path) as archive:
+            images = json.load(archive.extractfile("manifest.json"))
+            for image in images:
+                names = references or image.get("RepoTags") or []
+                if not names:
+                    continue
+                config = archive.extractfile(image["Config"]).read()
+                layers = [archive.extractfile(m) for m in image["Layers"]]
+                name, tag = repository_name(names[0]), _tag(names[0])
+                self.put_image(name, tag, config, layers)
+                stored.append(name)
+                for reference in names[1:]:
+                    self.tag(name, tag, repository_name(reference), _tag(reference))
+                    stored.append(repository_name(reference))
+        return stored
+
+    def add_short_names(self):
+        """Tag every repository under its last path component, e.g. libpod/alpine as alpine
+
+        Short names are what unqualified references such as `podman pull
+        alpine` resolve to. Names already taken are left alone.
+        """
+        for name in self.catalog():
+            short = name.rsplit("/", 1)[-1]
+            with self._lock:
+                if short in self.repositories:
+                    continue
+                tags = list(self.repositories[name])
+            for tag in tags:
+                self.tag(name, tag, short, tag)
+
+    def catalog(self):
+        with self._lock:
+            return sorted(self.repositories)
+
+
+class _Handler(server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server_version = "podman-test-registry"
+
+    @property
+    def registry(self):
+        return self.server.registry
+
+    def log_message(self, *args):
+        pass
+
+    def _dispatch(self):
+        url = urllib.parse.urlsplit(self.path)
+        self.query = dict(urllib.parse.parse_qsl(url.query))
+        self._consumed = False
+        try:
+            for pattern, action in _ROUTES[self.command]:
+                match = pattern.match(url.path)
+                if match:
+                    getattr(self, action)(**match.groupdict())
+                    return
+            raise RegistryError(404, "UNSUPPORTED", f"{self.command} {url.path}")
+        except RegistryError as e:
+            self._drain()
+            self._reply(e.status, e.body())
+
+    do_GET = do_HEAD = do_PUT = do_POST = do_PATCH = do_DELETE = _dispatch
+
+    def _reply(self, status, body=b"", headers=None, content_type="application/json"):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Docker-Distribution-API-Version", "registry/2.0")
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if self.command != "HEAD" and body:
+            self.wfile.write(body)
+
+    def _body(self):
+        """Yield the request body, plain or with chunked transfer encoding"""
+        self._consumed = True
+        if self.headers.get("Transfer-Encoding", "").lower() == "chunked":
+            while True:
+                size = int(self.rfile.readline().split(b";", 1)[0].strip(), 16)
+                if size == 0:
+                    # trailer
+                    while self.rfile.readline().strip():
+                        pass
+                    return
+                yield from self._read(size)
+                self.rfile.readline()
+        else:
+            yield from self._read(int(self.headers.get("Content-Length") or 0))
+
+    def _read(self, size):
+        while size:
+            chunk = self.rfile.read(min(size, CHUNK))
+            if not chunk:
+                raise ConnectionError("request body cut short")
+            size -= len(chunk)
+            yield chunk
+
+    def _drain(self):
+        if not self._consumed:
+            for _ in self._body():
+                pass
+
+    def version_check(self):
+        self._reply(200, b"{}")
+
+    def catalog(self):
+        names = self.registry.catalog()
+        last = self.query.get("last")
+        if last:
+            names = [n for n in names if n > last]
+        headers = {}
+        limit = int(self.query.get("n") or 0)
+        if limit and len(names) > limit:
+            names = names[:limit]
+            headers["Link"] = f'</v2/_catalog?n={limit}&last={names[-1]}>; rel="next"'
+        self._reply(200, json.dumps({"repositories": names}).encode(), headers)
+
+    def search(self):
+        term = self.query.get("q", "")
+        limit = int(self.query.get("n") or 25)
+        results = []
+        seen = set()
+        for name in self.registry.catalog():
+            # as on docker.io, library/x is the official image x
+            if name.startswith("library/"):
+                name = name[len("library/") :]
+            if term not in name or name in seen:
+                continue
+            seen.add(name)
+            results.append(
+                {
+                    "name": name,
+                    "description": "",
+                    "star_count": 0,
+                    "is_official": "/" not in name,
+                    "is_automated": False,
+                }
+            )
+        body = {"query": term, "num_results": len(results), "results": results[:limit]}
+        self._reply(200, json.dumps(body).encode())
+
+    def tags(self, name):
+        with self.registry._lock:
+            tags = self.registry.repositories.get(name)
+            if tags is None:
+                raise RegistryError(404, "NAME_UNKNOWN", f"{name} is unknown")
+            tags = sorted(tags)
+        self._reply(200, json.dumps({"name": name, "tags": tags}).encode())
+
+    def get_manifest(self, name, reference):
+        digest, media_type, body = self.registry.resolve(name, reference)
+        self._reply(200, body, {"Docker-Content-Digest": digest}, media_type)
+
+    def put_manifest(self, name, reference):
+        body = b"".join(self._body())
+        media_type = self.headers.get("Content-Type", MANIFEST).split(";")[0]
+        if media_type not in MANIFESTS:
+            raise RegistryError(400, "MANIFEST_INVALID", f"unsupported {media_type}")
+        try:
+            manifest = json.loads(body)
+        except ValueError as e:
+            raise RegistryError(400, "MANIFEST_INVALID", str(e))
+        referenced = [manifest.get("config") or {}] + manifest.get("layers", [])
+        for descriptor in referenced:
+            digest = descriptor.get("digest")
+            if digest and not self.registry.has_blob(digest):
+                raise RegistryError(
+                    400, "MANIFEST_BLOB_UNKNOWN", f"{digest} is unknown"
+                )
+
+        digest = self.registry.put_manifest(name, reference, body, media_type)
+        self._reply(
+            201,
+            headers={
+                "Location": f"/v2/{name}/manifests/{digest}",
+                "Docker-Content-Digest": digest,
+            },
+        )
+
+    def delete_manifest(self, name, reference):
+        digest, _, _ = self.registry.resolve(name, reference)
+        registry = self.registry
+        with registry._lock:
+            registry._members[name].discard(digest)
+            tags = registry.repositories[name]
+            for tag in [t for t, d in tags.items() if d == digest]:
+                del tags[tag]
+        self._reply(202)
+
+    def get_blob(self, name, digest):
+        if not self.registry.has_blob(digest):
+            raise RegistryError(404, "BLOB_UNKNOWN", f"{digest} is unknown")
+        path = self.registry.blob_path(digest)
+        size = os.path.getsize(path)
+        self.send_response(200)
+        self.send_header("Content-Type", "application/octet-stream")
+        self.send_header("Docker-Content-Digest", digest)
+        self.send_header("Content-Length", str(size))
+        self.end_headers()
+        if self.command == "HEAD":
+            return
+        with open(path, "rb") as f:
+            # zero copy from the page cache to the socket
+            self.connection.sendfile(f)
+        with self.registry._lock:
+            self.registry.bytes_sent += size
+
+    def _location(self, name, upload, size):
+        return {
+            "Location": f"/v2/{name}/blobs/uploads/{upload}",
+            "Docker-Upload-UUID": upload,
+            "Range": f"0-{max(size - 1, 0)}",
+        }
+
+    def _upload(self, upload):
+        with self.registry._lock:
+            state = self.registry._uploads.get(upload)
+        if state is None:
+            raise RegistryError(404, "BLOB_UPLOAD_UNKNOWN", f"{upload} is unknown")
+        return state
+
+    def start_upload(self, name):
+        mount = self.query.get("mount")
+        if mount and self.registry.has_blob(mount):
+            self._drain()
+            self._reply(
+                201,
+                headers={
+                    "Location": f"/v2/{name}/blobs/{mount}",
+                    "Docker-Content-Digest": mount,
+                },
+            )
+            return
+
+        upload = uuid.uuid4().hex
+        state = _Upload(name, os.path.join(self.registry.directory, "uploads", upload))
+        with self.registry._lock:
+            self.registry._uploads[upload] = state
+        if "digest" in self.query:
+            # monolithic upload
+            self.finish_upload(name, upload)
+            return
+        self._drain()
+        self._reply(202, headers=self._location(name, upload, 0))
+
+    def upload_status(self, name, upload):
+        state = self._upload(upload)
+        self._reply(204, headers=self._location(name, upload, state.size))
+
+    def patch_upload(self, name, upload):
+        state = self._upload(upload)
+        for chunk in self._body():
+            state.write(chunk)
+        self._reply(202, headers=self._location(name, upload, state.size))
+
+    def finish_upload(self, name, upload):
+        state = self._upload(upload)
+        for chunk in self._body():
+            state.write(chunk)
+        state.file.close()
+        with self.registry._lock:
+            del self.registry._uploads[upload]
+            self.registry.bytes_received += state.size
+
+        digest = "sha256:" + state.sha256.hexdigest()
+        if self.query.get("digest") != digest:
+            os.unlink(state.path)
+            raise RegistryError(
+                400, "DIGEST_INVALID", f"{self.query.get('digest')} != {digest}"
+            )
+        os.replace(state.path, self.registry.blob_path(digest))
+        self._reply(
+            201,
+            headers={
+                "Location": f"/v2/{name}/blobs/{digest}",
+                "Docker-Content-Digest": digest,
+            },
+        )
+
+    def cancel_upload(self, name, upload):
+        state = self._upload(upload)
+        with self.registry._lock:
+            del self.registry._uploads[upload]
+        state.file.close()
+        os.unlink(state.path)
+        self._reply(204)
@@ -0,0 +1,149 @@
+"""Index of the objects tests create, looked up without asking the service
+
+Tests record what they create instead of listing the service to find it
+again, and reset() removes recorded objects by id:
+
+    fixtures = session.fixtures
+    fixtures.add("container", id, name="top", labels=session.labels)
+    fixtures.latest("container").id
+    fixtures.get("container", "top")
+    fixtures.by_label("container", LABEL, session.id)
+"""
+
+# kinds in the order they are removed, pods take their containers along
+KINDS = ("pod", "container", "network", "volume", "image")
+
+# DELETE path of each kind, networks and volumes are addressed by name
+PATHS = {
+    "pod": "/pods/{}",
+    "container": "/containers/{}",
+    "network": "/networks/{}",
+    "volume": "/volumes/{}",
+    "image": "/images/{}",
+}
+
+
+class Fixture(object):
+    """An object created for a test"""
+
+    __slots__ = ("kind", "id", "name", "labels")
+
+    def __init__(self, kind, id, name=None, labels=None):
+        self.kind = kind
+        self.id = id
+        self.name = name
+        self.labels = dict(labels or {})
+
+    def __repr__(self):
+        return f"Fixture({self.kind!r}, {self.id!r}, name={self.name!r})"
+
+    @property
+    def ref(self):
+        """Name or id used to address the object in the API"""
+        if self.kind in ("network", "volume"):
+            return self.name or self.id
+        # docker-py reports image ids with their digest algorithm
+        return self.id.removeprefix("sha256:")
+
+
+class FixtureRegistry(object):
+    """Objects indexed by kind and id, name and label, in creation order"""
+
+    def __init__(self):
+        # kind: {id: Fixture}, dicts keep creation order
+        self._by_kind = {kind: {} for kind in KINDS}
+        # (kind, name): Fixture
+        self._by_name = {}
+        # (kind, label key, label value): {id: Fixture}
+        self._by_label = {}
+
+    def __len__(self):
+        return sum(len(objects) for objects in self._by_kind.values())
+
+    def __contains__(self, id):
+        return any(id in objects for objects in self._by_kind.values())
+
+    def add(self, kind, id, name=None, labels=None):
+        """Record an object, replacing an earlier record of the same id
+
+        :return: the Fixture recorded
+        """
+        if kind not in self._by_kind:
+            raise ValueError(f"Unsupported fixture kind: {kind}")
+        self.discard(kind, id)
+
+        fixture = Fixture(kind, id, name, labels)
+        self._by_kind[kind][id] = fixture
+        if name:
+            self._by_name[(kind, name)] = fixture
+        for key, value in fixture.labels.items():
+            self._by_label.setdefault((kind, key, value), {})[id] = fixture
+        return fixture
+
+    def discard(self, kind, id):
+        """Forget an object, unknown ids are ignored"""
+        fixture = self._by_kind[kind].pop(id, None)
+        if fixture is None:
+            return
+        if fixture.name and self._by_name.get((kind, fixture.name)) is fixture:
+            del self._by_name[(kind, fixture.name)]
+        for key, value in fixture.labels.items():
+            self._by_label[(kind, key, value)].pop(id, None)
+
+    def get(self, kind, name_or_id):
+        """Return the object of kind with the given name or id
+
+        :raises KeyError: no such object was recorded
+        """
+        fixture = self._by_kind[kind].get(name_or_id) or self._by_name.get(
+            (kind, name_or_id)
+        )
+        if fixture is None:
+            raise KeyError(f"No {kind} {name_or_id} recorded")
+        return fixture
+
+    def latest(self, kind):
+        """Return the object of kind recorded last
+
+        :raises LookupError: no object of kind was recorded
+        """
+        objects = self._by_kind[kind]
+        if not objects:
+            raise LookupError(f"No {kind} recorded")
+        return objects[next(reversed(objects))]
+
+    def all(self, kind):
+        """Return the objects of kind in creation order"""
+        return list(self._by_kind[kind].values())
+
+    def by_label(self, kind, key, value):
+        """Return the objects of kind labeled key=value in creation order"""
+        return list(self._by_label.get((kind, key, value), {}).values())
+
+    def clear(self):
+        self.__init__()
+
+    def remove_all(self, api, cleanup, keep=()):
+        """Remove every recorded object through the API and forget it
+
+        Objects already gone are not an error.
+
+        :param api: LibpodClient on the service
+        :param cleanup: Cleanup accounting the removals
+        :param keep: ids of objects left in place, e.g. images surviving a reset
+        """
+        keep = {id.removeprefix("sha256:") for id in keep}
+
+        def delete(fixture):
+            r = api.delete(
+                PATHS[fixture.kind].format(fixture.ref), params={"force": "true"}
+            )
+            if r.status_code != 404:
+                r.raise_for_status()
+
+        try:
+            for kind in KINDS:
+                fixtures = [f for f in self.all(kind) if f.ref not in keep]
+                cleanup.remove(f"{kind}s", delete, fixtures)
+        finally:
+            self.clear()
@@ -0,0 +1,255 @@
+"""Image tarballs cached across test runs
+
+Tarballs are stored once per image digest below a persistent directory,
+index.json maps references to digests and records size and last use.
+When the cache grows beyond its byte budget the least recently used
+tarballs are evicted. Processes sharing the directory, e.g. shard
+workers, serialize index updates with an flock(2) on .lock.
+
+    cache = ImageCache()
+    cache.restore(session.api, constant.ALPINE)
+"""
+import contextlib
+import fcntl
+import json
+import os
+import tempfile
+import time
+
+import requests
+
+# Cache directory, shared by all test runs of this user
+CACHE_DIR = os.getenv(
+    "PODMAN_TEST_IMAGE_CACHE",
+    os.path.join(
+        os.getenv("XDG_CACHE_HOME", os.path.expanduser("~/.cache")),
+        "podman-test",
+        "images",
+    ),
+)
+
+# Byte budget of the cache directory
+CACHE_BUDGET = int(os.getenv("PODMAN_TEST_IMAGE_CACHE_BYTES", str(2 * 1024**3)))
+
+_INDEX_VERSION = 1
+
+
+class ImageCacheError(Exception):
+    """An image could not be pulled, saved or loaded"""
+
+
+class ImageCache(object):
+    """Persistent, size bounded cache of docker-archive image tarballs keyed by digest"""
+
+    def __init__(self, directory=CACHE_DIR, budget=CACHE_BUDGET):
+        """Initialize a cache in directory
+
+        :param directory: cache directory, created if missing
+        :param budget: maximum bytes of tarballs kept
+        """
+        self.directory = directory
+        self.budget = budget
+        self.blobs = os.path.join(directory, "blobs")
+        self.index_path = os.path.join(directory, "index.json")
+        os.makedirs(self.blobs, exist_ok=True)
+
+    @contextlib.contextmanager
+    def _locked(self, exclusive=True):
+        with open(os.path.join(self.directory, ".lock"), "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _read_index(self):
+        try:
+            with open(self.index_path) as f:
+                index = json.load(f)
+        except (FileNotFoundError, ValueError):
+            index = {}
+        if index.get("version") != _INDEX_VERSION:
+            index = self._empty_index()
+        return index
+
+    @staticmethod
+    def _empty_index():
+        return {"version": _INDEX_VERSION, "references": {}, "entries": {}}
+
+    def _write_index(self, index):
+        fd, path = tempfile.mkstemp(dir=self.directory, prefix=".index.")
+        with os.fdopen(fd, "w") as f:
+            json.dump(index, f, indent=2)
+        os.replace(path, self.index_path)
+
+    def _blob(self, digest):
+        return os.path.join(self.blobs, digest.replace(":", "-") + ".tar")
+
+    def entries(self):
+        """Return the index entries keyed by digest"""
+        with self._locked(exclusive=False):
+            return self._read_index()["entries"]
+
+    def tarballs(self):
+        """Return (path, references) of every cached tarball"""
+        return [
+            (self._blob(digest), entry["references"])
+            for digest, entry in self.entries().items()
+            if os.path.exists(self._blob(digest))
+        ]
+
+    def size(self):
+        """Return the bytes of tarballs held"""
+        return sum(e["size"] for e in self.entries().values())
+
+    def lookup(self, reference):
+        """Return the tarball holding reference and mark it used, None on a miss"""
+        with self._locked():
+            index = self._read_index()
+            digest = index["references"].get(reference)
+            entry = index["entries"].get(digest)
+            if entry is None or not os.path.exists(self._blob(digest)):
+                return None
+
+            entry["last_used"] = time.time()
+            self._write_index(index)
+            return self._blob(digest)
+
+    def add(self, reference, digest, write):
+        """Store a tarball for reference
+
+        :param reference: image reference, e.g. quay.io/libpod/alpine:latest
+        :param digest: image digest keying the tarball, e.g. sha256:...
+        :param write: callable writing the tarball to the binary file object given
+        :return: path of the cached tarball
+        """
+        fd, tmp = tempfile.mkstemp(dir=self.blobs, prefix=".partial.")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                write(f)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+
+        with self._locked():
+            index = self._read_index()
+            entry = index["entries"].setdefault(
+                digest, {"references": [], "size": 0, "last_used": 0.0}
+            )
+            os.replace(tmp, self._blob(digest))
+            entry["size"] = os.path.getsize(self._blob(digest))
+            entry["last_used"] = time.time()
+            if reference not in entry["references"]:
+                entry["references"].append(reference)
+            index["references"][reference] = digest
+
+            self._evict(index, keep=digest)
+            self._write_index(index)
+        return self._blob(digest)
+
+    def _evict(self, index, keep=None):
+        entries = index["entries"]
+        total = sum(e["size"] for e in entries.values())
+        for digest in sorted(entries, key=lambda d: entries[d]["last_used"]):
+            if total <= self.budget:
+                break
+            if digest == keep:
+                continue
+
+            total -= entries[digest]["size"]
+            for reference in entries.pop(digest)["references"]:
+                if index["references"].get(reference) == digest:
+                    del index["references"][reference]
+            try:
+                os.unlink(self._blob(digest))
+            except FileNotFoundError:
+                pass
+
+    def evict(self):
+        """Remove least recently used tarballs until the cache fits its budget"""
+        with self._locked():
+            index = self._read_index()
+            self._evict(index)
+            self._write_index(index)
+
+    def clear(self):
+        """Remove every cached tarball"""
+        with self._locked():
+            index = self._read_index()
+            for digest in index["entries"]:
+                try:
+                    os.unlink(self._blob(digest))
+                except FileNotFoundError:
+                    pass
+            self._write_index(self._empty_index())
+
+    def restore(self, api, reference):
+        """Make reference available to the service, loading it from the cache if possible
+
+        On a miss the image is pulled and its tarball added to the cache.
+
+        :param api: LibpodClient on the service
+        :param reference: fully qualified image reference
+        :return: True on a cache hit, False if the image was pulled
+        :raises ImageCacheError: the image could not be loaded or pulled
+        """
+        path = self.lookup(reference)
+        if path is not None:
+            try:
+                # shared lock, eviction must not unlink the tarball while loading
+                with self._locked(exclusive=False):
+                    r = api.load_image(path)
+            except FileNotFoundError:
+                r = None
+            if r is not None:
+                if r.status_code != 200:
+                    raise ImageCacheError(f"load {reference}: {r.status_code} {r.text}")
+                # the tarball carries the name it was saved with, which may be
+                # another reference to the same digest
+                names = r.json().get("Names") or []
+                if names and reference not in names:
+                    self._tag(api, names[0], reference)
+                return True
+
+        self._pull(api, reference)
+        r = api.get(f"/images/{reference}/json")
+        if r.status_code != 200:
+            raise ImageCacheError(f"inspect {reference}: {r.status_code} {r.text}")
+        image = r.json()
+        digest = image.get("Digest") or "sha256:" + image["Id"]
+
+        def save(f):
+            try:
+                api.save_image(reference, f)
+            except requests.HTTPError as e:
+                raise ImageCacheError(
+                    f"save {reference}: {e.response.status_code} {e.response.text}"
+                ) from e
+
+        self.add(reference, digest, save)
+        return False
+
+    @staticmethod
+    def _tag(api, name, reference):
+        repo, tag = reference, "latest"
+        head, sep, tail = reference.rpartition(":")
+        if sep and "/" not in tail:
+            repo, tag = head, tail
+        r = api.post(f"/images/{name}/tag", params={"repo": repo, "tag": tag})
+        if r.status_code != 201:
+            raise ImageCacheError(f"tag {reference}: {r.status_code} {r.text}")
+
+    @staticmethod
+    def _pull(api, reference):
+        try:
+            pull = api.stream_json(
+                "POST", "/images/pull", params={"reference": reference}
+            )
+        except requests.HTTPError as e:
+            raise ImageCacheError(f"pull {reference}: {e.response.text}") from e
+
+        with pull:
+            # errors after the first byte are reported in the progress stream
+            for report in pull:
+                if report.get("error"):
+                    raise ImageCacheError(f"pull {reference}: {report['error']}")
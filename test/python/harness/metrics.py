@@ -0,0 +1,353 @@
+"""Per route timing of every API call made during a test run
+
+install() hooks requests.Session.send, which LibpodClient, DockerClient
+and the bare requests.get() calls of the suites all go through. Each call
+is recorded under its method and route template, e.g.
+`POST /containers/{id}/start`, with its duration and bytes sent and
+received. The report is written as JSON and CSV, and compared against a
+stored baseline:
+
+    python3 -m test.python.harness.metrics compare baseline.json run.json --threshold 1.5
+
+exits 1 when a route got slower than threshold times its baseline.
+"""
+import argparse
+import array
+import collections
+import csv
+import functools
+import json
+import math
+import re
+import sys
+import threading
+import time
+
+import requests
+
+# upper bounds in milliseconds of the histogram buckets, the last one is open
+BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+
+# statistics written per route, in CSV column order
+COLUMNS = (
+    "route",
+    "count",
+    "errors",
+    "p50_ms",
+    "p90_ms",
+    "p99_ms",
+    "max_ms",
+    "mean_ms",
+    "bytes_out",
+    "bytes_in",
+)
+
+_VERSION = re.compile(r"^/v\d+(\.\d+)*(?=/)")
+
+# collection: placeholder of the path segment naming one of its members
+_COLLECTIONS = {
+    "containers": "{id}",
+    "pods": "{id}",
+    "exec": "{id}",
+    "secrets": "{id}",
+    "images": "{name}",
+    "manifests": "{name}",
+    "networks": "{name}",
+    "volumes": "{name}",
+}
+
+# segments following a collection that are operations rather than members
+_OPERATIONS = {
+    "create",
+    "json",
+    "prune",
+    "stats",
+    "load",
+    "import",
+    "export",
+    "pull",
+    "search",
+    "remove",
+    "showmounted",
+    "kube",
+}
+
+# last segments of image routes, image names may hold slashes
+_IMAGE_ACTIONS = {
+    "json",
+    "history",
+    "tag",
+    "untag",
+    "push",
+    "get",
+    "tree",
+    "changes",
+    "exists",
+    "resolve",
+}
+
+
+def normalize_route(path):
+    """Return the route template of a request path
+
+    Version prefixes and the query are dropped and member names replaced,
+    e.g. /v1.40/containers/3f2a.../start becomes /containers/{id}/start
+    and /v2.0.0/libpod/images/quay.io/libpod/alpine:latest/json becomes
+    /libpod/images/{name}/json.
+    """
+    path = _VERSION.sub("", path.split("?", 1)[0])
+    segments = [s for s in path.split("/") if s]
+    route = []
+    index = 0
+    while index < len(segments):
+        segment = segments[index]
+        route.append(segment)
+        index += 1
+        placeholder = _COLLECTIONS.get(segment)
+        if placeholder is None or index == len(segments):
+            continue
+        if segments[index] in _OPERATIONS:
+            # e.g. /images/json, /containers/create
+            continue
+        if segment == "images":
+            # the name runs up to the action, or to the end
+            end = len(segments)
+            if end - index > 1 and segments[-1] in _IMAGE_ACTIONS:
+                end -= 1
+            index = end
+        else:
+            index += 1
+        route.append(placeholder)
+    return "/" + "/".join(route)
+
+
+def percentile(samples, p):
+    """Return the p-th percentile of samples using the nearest-rank method
+
+    :param samples: sorted sequence of numbers
+    :param p: percentile in the range 0..100
+    :return: None when samples is empty
+    """
+    if not samples:
+        return None
+    return samples[max(1, math.ceil(p / 100.0 * len(samples))) - 1]
+
+
+def _body_size(body):
+    if body is None:
+        return 0
+    if isinstance(body, (bytes, bytearray, str)):
+        return len(body)
+    # generators and files are sent as they are read
+    return 0
+
+
+class RouteStats(object):
+    """Durations and byte counts of one route"""
+
+    def __init__(self):
+        self.durations = array.array("d")
+        self.errors = 0
+        self.bytes_out = 0
+        self.bytes_in = 0
+
+    def add(self, seconds, status, bytes_out, bytes_in):
+        self.durations.append(seconds)
+        self.bytes_out += bytes_out
+        self.bytes_in += bytes_in
+        if status >= 400:
+            self.errors += 1
+
+    def summary(self):
+        samples = sorted(self.durations)
+        count = len(samples)
+
+        histogram = {}
+        for bound in BUCKETS:
+            histogram[f"le_{bound}ms"] = 0
+        histogram["gt_5000ms"] = 0
+        for seconds in samples:
+            ms = seconds * 1000.0
+            for bound in BUCKETS:
+                if ms <= bound:
+                    histogram[f"le_{bound}ms"] += 1
+                    break
+            else:
+                histogram["gt_5000ms"] += 1
+
+        return {
+            "count": count,
+            "errors": self.errors,
+            "p50_ms": round(percentile(samples, 50) * 1000.0, 3),
+            "p90_ms": round(percentile(samples, 90) * 1000.0, 3),
+            "p99_ms": round(percentile(samples, 99) * 1000.0, 3),
+            "max_ms": round(samples[-1] * 1000.0, 3),
+            "mean_ms": round(sum(samples) / count * 1000.0, 3),
+            "bytes_out": self.bytes_out,
+            "bytes_in": self.bytes_in,
+            "histogram": histogram,
+        }
+
+
+# One request as seen by the client, started is a time.monotonic() value
+Call = collections.namedtuple("Call", "method path started seconds status")
+
+
+class Recorder(object):
+    """Collect RouteStats keyed by "METHOD /route", safe across threads"""
+
+    def __init__(self, calls=0):
+        """
+        :param calls: number of most recent single calls kept in self.calls,
+            e.g. to join them with the service's timings of the same requests
+        """
+        self.routes = {}
+        self.calls = collections.deque(maxlen=calls)
+        self._lock = threading.Lock()
+
+    def record(
+        self, method, path, seconds, status, bytes_out=0, bytes_in=0, started=None
+    ):
+        key = f"{method.upper()} {normalize_route(path)}"
+        with self._lock:
+            stats = self.routes.get(key)
+            if stats is None:
+                stats = self.routes[key] = RouteStats()
+            stats.add(seconds, status, bytes_out, bytes_in)
+            if self.calls.maxlen and started is not None:
+                self.calls.append(Call(method.upper(), path, started, seconds, status))
+
+    def report(self):
+        with self._lock:
+            return {
+                "routes": {
+                    key: stats.summary() for key, stats in sorted(self.routes.items())
+                }
+            }
+
+    def write(self, prefix):
+        """Write prefix.json and prefix.csv, return the report"""
+        report = self.report()
+        with open(prefix + ".json", "w") as f:
+            json.dump(report, f, indent=2)
+
+        with open(prefix + ".csv", "w", newline="") as f:
+            buckets = list(f"le_{b}ms" for b in BUCKETS) + ["gt_5000ms"]
+            writer = csv.writer(f)
+            writer.writerow(COLUMNS + tuple(buckets))
+            for route, summary in report["routes"].items():
+                writer.writerow(
+                    [route]
+                    + [summary[c] for c in COLUMNS[1:]]
+                    + [summary["histogram"][b] for b in buckets]
+                )
+        return report
+
+
+_send = None
+
+
+def install(recorder):
+    """Record every call made through requests.Session.send into recorder"""
+    global _send
+
+    if _send is not None:
+        raise RuntimeError("metrics are already installed")
+    _send = original = requests.Session.send
+
+    @functools.wraps(original)
+    def send(session, request, **kwargs):
+        started = time.monotonic()
+        r = original(session, request, **kwargs)
+        if kwargs.get("stream"):
+            # the body is still to be read, count what the headers announce
+            bytes_in = int(r.headers.get("Content-Length") or 0)
+        else:
+            bytes_in = len(r.content)
+        recorder.record(
+            request.method,
+            request.path_url,
+            time.monotonic() - started,
+            r.status_code,
+            _body_size(request.body),
+            bytes_in,
+            started,
+        )
+        return r
+
+    requests.Session.send = send
+
+
+def uninstall():
+    global _send
+
+    if _send is not None:
+        requests.Session.send = _send
+        _send = None
+
+
+def compare(baseline, current, threshold=1.5, stat="p90_ms", min_count=5, min_ms=1.0):
+    """Return routes slower in current than threshold times baseline
+
+    :param baseline: report of a previous run
+    :param current: report of this run
+    :param stat: statistic compared, e.g. p50_ms or p90_ms
+    :param min_count: routes called fewer times in either run are ignored
+    :param min_ms: differences smaller than this are noise
+    :return: list of (route, baseline value, current value, ratio), worst first
+    """
+    regressions = []
+    for route, now in current["routes"].items():
+        before = baseline["routes"].get(route)
+        if before is None or min(before["count"], now["count"]) < min_count:
+            continue
+        if now[stat] - before[stat] < min_ms:
+            continue
+        ratio = now[stat] / before[stat] if before[stat] else math.inf
+        if ratio > threshold:
+            regressions.append((route, before[stat], now[stat], round(ratio, 2)))
+    return sorted(regressions, key=lambda r: r[3], reverse=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Compare a metrics report against a baseline"
+    )
+    sub = parser.add_subparsers(dest="command", required=True)
+    cmp = sub.add_parser("compare", help="exit 1 when a route regressed")
+    cmp.add_argument("baseline", help="JSON report of the reference run")
+    cmp.add_argument("current", help="JSON report of this run")
+    cmp.add_argument(
+        "--threshold", type=float, default=1.5, help="slowdown ratio tolerated"
+    )
+    cmp.add_argument(
+        "--stat", default="p90_ms", choices=[c for c in COLUMNS if c.endswith("_ms")]
+    )
+    cmp.add_argument(
+        "--min-count", type=int, default=5, help="calls needed to compare a route"
+    )
+    cmp.add_argument(
+        "--min-ms", type=float, default=1.0, help="smallest difference reported"
+    )
+    args = parser.parse_args(argv)
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.current) as f:
+        current = json.load(f)
+
+    regressions = compare(
+        baseline, current, args.threshold, args.stat, args.min_count, args.min_ms
+    )
+    for route, before, now, ratio in regressions:
+        sys.stdout.write(f"{route}: {args.stat} {before} -> {now} ({ratio}x)\n")
+    if regressions:
+        sys.stderr.write(
+            f"{len(regressions)} routes slower than {args.threshold}x the baseline\n"
+        )
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,255 @@
+import json
+import os
+import pathlib
+import shutil
+import subprocess
+import tempfile
+
+from test.python.docker.compat import constant
+
+from .imagecache import ImageCache
+from .snapshot import clone_tree, remove_tree
+from .storage import detect_driver, driver_options
+
+# directories below anchor_directory holding the state of the storage root
+STORAGE_DIRECTORIES = ("crio", "crio-run")
+
+# Index of this process when the suites are sharded, see harness/shard.py
+WORKER = int(os.getenv("PODMAN_TEST_WORKER", "0"))
+
+
+def mirrored_registries():
+    """Return the registries redirected by write_registries_conf()
+
+    docker.io, docker-py's default, and every registry of an image named in
+    docker/compat/constant.py, k8s.gcr.io of the pod infra image among them.
+    """
+    names = {"docker.io"}
+    for value in vars(constant).values():
+        if isinstance(value, str) and "/" in value:
+            first = value.split("/", 1)[0]
+            if "." in first or ":" in first:
+                names.add(first)
+    return sorted(names)
+
+
+class Podman(object):
+    """
+    Instances hold the configuration and setup for running podman commands
+    """
+
+    def __init__(self, prefix="podman_test_", storage_driver=None):
+        """Initialize a Podman instance with global options
+
+        :param prefix: prefix for the temporary directory anchoring storage
+        :param storage_driver: vfs, overlay or fuse-overlayfs, see storage.py for the default
+        """
+        binary = os.getenv("PODMAN", "bin/podman")
+        self.cmd = [binary]
+
+        cgroupfs = os.getenv("CGROUP_MANAGER", "systemd")
+        self.cmd.append(f"--cgroup-manager={cgroupfs}")
+
+        if os.getenv("DEBUG"):
+            # logged to stderr, where PodmanService captures the service's log
+            self.cmd.append("--log-level=debug")
+
+        self.anchor_directory = tempfile.mkdtemp(prefix=prefix)
+
+        self.storage_driver = storage_driver or detect_driver(self.anchor_directory)
+        self.cmd.extend(driver_options(self.storage_driver))
+
+        # scratch space for tarballs written by tests, removed with the storage root
+        self.image_cache = os.path.join(self.anchor_directory, "cache")
+        os.makedirs(self.image_cache, exist_ok=True)
+
+        # image tarballs kept across test runs
+        self.image_tarballs = ImageCache()
+
+        # fastest copy mode supported by the file system, found by the first snapshot
+        self.clone_mode = None
+
+        self.cmd.append("--root=" + os.path.join(self.anchor_directory, "crio"))
+        self.cmd.append("--runroot=" + os.path.join(self.anchor_directory, "crio-run"))
+
+        self.registries_conf = os.path.join(self.anchor_directory, "registry.conf")
+        os.environ["CONTAINERS_REGISTRIES_CONF"] = self.registries_conf
+        self.write_registries_conf()
+
+        os.environ["CNI_CONFIG_PATH"] = os.path.join(
+            self.anchor_directory, "cni", "net.d"
+        )
+        os.makedirs(os.environ["CNI_CONFIG_PATH"], exist_ok=True)
+        self.cmd.append("--cni-config-dir=" + os.environ["CNI_CONFIG_PATH"])
+        cni_cfg = os.path.join(
+            os.environ["CNI_CONFIG_PATH"], "87-podman-bridge.conflist"
+        )
+        # json decoded and encoded to ensure legal json
+        buf = json.loads(
+            """
+            {
+              "cniVersion": "0.3.0",
+              "name": "podman",
+              "plugins": [{
+                  "type": "bridge",
+                  "bridge": "cni0",
+                  "isGateway": true,
+                  "ipMasq": true,
+                  "ipam": {
+                    "type": "host-local",
+                    "subnet": "10.88.0.0/16",
+                    "routes": [{
+                      "dst": "0.0.0.0/0"
+                    }]
+                  }
+                },
+                {
+                  "type": "portmap",
+                  "capabilities": {
+                    "portMappings": true
+                  }
+                }
+              ]
+            }
+            """
+        )
+        # concurrent workers on one host must not share a bridge or subnet
+        buf["plugins"][0]["bridge"] = f"cni{WORKER}"
+        buf["plugins"][0]["ipam"]["subnet"] = f"10.{88 + WORKER}.0.0/16"
+        # host-local keeps its leases in <dataDir>/<network name>, below the
+        # runroot they are private to the worker and restored with snapshots
+        buf["plugins"][0]["ipam"]["dataDir"] = os.path.join(
+            self.anchor_directory, "crio-run", "cni", "networks"
+        )
+        with open(cni_cfg, "w") as w:
+            json.dump(buf, w)
+
+    def write_registries_conf(self, registry=None):
+        """Write the registries.conf of the storage root
+
+        :param registry: host:port of a harness.distribution.Registry standing
+            in for quay.io, docker.io and the other mirrored_registries(),
+            None to use them
+        """
+        if registry is None:
+            lines = ['unqualified-search-registries = ["quay.io", "docker.io"]']
+        else:
+            # short names and searches resolve against the local registry only
+            lines = [f'unqualified-search-registries = ["{registry}"]']
+            for prefix in mirrored_registries() + [registry]:
+                lines.extend(
+                    [
+                        "",
+                        "[[registry]]",
+                        f'prefix = "{prefix}"',
+                        f'location = "{registry}"',
+                        "insecure = true",
+                    ]
+                )
+        with open(self.registries_conf, "w") as w:
+            w.write("\n".join(lines) + "\n")
+
+    def open(self, command, *args, **kwargs):
+        """Podman initialized instance to run a given command
+
+        :param self: Podman instance
+        :param command: podman sub-command to run
+        :param args: arguments and options for command
+        :param kwargs: See subprocess.Popen() for shell, stdout and stderr keywords
+        :return: subprocess.Popen() instance configured to run podman instance
+        """
+        cmd = self.cmd.copy()
+        cmd.append(command)
+        cmd.extend(args)
+
+        shell = kwargs.get("shell", False)
+        stdout = kwargs.get("stdout", subprocess.DEVNULL)
+        stderr = kwargs.get("stderr", subprocess.DEVNULL)
+
+        return subprocess.Popen(
+            cmd,
+            shell=shell,
+            stdin=subprocess.DEVNULL,
+            stdout=stdout,
+            stderr=stderr,
+        )
+
+    def run(self, command, *args, **kwargs):
+        """Podman initialized instance to run a given command
+
+        :param self: Podman instance
+        :param command: podman sub-command to run
+        :param args: arguments and options for command
+        :param kwargs: See subprocess.Popen() for shell and check keywords
+        :return: subprocess.Popen() instance configured to run podman instance
+        """
+        cmd = self.cmd.copy()
+        cmd.append(command)
+        cmd.extend(args)
+
+        check = kwargs.get("check", False)
+        shell = kwargs.get("shell", False)
+
+        return subprocess.run(
+            cmd,
+            shell=shell,
+            check=check,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+        )
+
+    def snapshot(self, name="golden"):
+        """Capture the storage root, the service using it must be stopped
+
+        :param name: name of the snapshot, an existing snapshot is replaced
+        :return: copy mode used, see snapshot.clone_tree()
+        """
+        target = os.path.join(self.anchor_directory, "snapshots", name)
+        remove_tree(target)
+        os.makedirs(target)
+
+        for directory in STORAGE_DIRECTORIES:
+            self.clone_mode = clone_tree(
+                os.path.join(self.anchor_directory, directory),
+                os.path.join(target, directory),
+                self.clone_mode,
+            )
+        return self.clone_mode
+
+    def restore(self, name="golden"):
+        """Replace the storage root with a snapshot, the service using it must be stopped
+
+        :param name: name of a snapshot taken earlier
+        :return: copy mode used, see snapshot.clone_tree()
+        :raises OSError: the storage root could not be removed, e.g. a layer is still mounted
+        """
+        source = os.path.join(self.anchor_directory, "snapshots", name)
+        if not os.path.isdir(source):
+            raise FileNotFoundError(f"no snapshot {name} in {self.anchor_directory}")
+
+        for directory in STORAGE_DIRECTORIES:
+            live = os.path.join(self.anchor_directory, directory)
+            remove_tree(live)
+            self.clone_mode = clone_tree(
+                os.path.join(source, directory), live, self.clone_mode
+            )
+        return self.clone_mode
+
+    def tear_down(self):
+        shutil.rmtree(self.anchor_directory, ignore_errors=True)
+
+    def restore_image_from_cache(self, api, reference=constant.ALPINE):
+        """Load reference into storage from the persistent image cache
+
+        The image is pulled and added to the cache on a miss.
+
+        :param api: LibpodClient on the service using this storage root
+        :param reference: fully qualified image reference, see constant.py
+        :return: True on a cache hit
+        """
+        return self.image_tarballs.restore(api, reference)
+
+    def flush_image_cache(self):
+        """Remove tarballs written by tests, the persistent image cache is kept"""
+        for f in pathlib.Path(self.image_cache).glob("*.tar"):
+            f.unlink()
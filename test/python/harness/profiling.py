@@ -0,0 +1,146 @@
+"""CPU and heap profiles of the service
+
+The service is started with the global --cpu-profile option, the profile
+being written when it shuts down on SIGTERM, so it covers one run of the
+service: a suite run, a shard.py worker or a benchmark. A service
+restarted by snapshot resets writes each run to its own profile, they are
+merged by summarize(). podman has no memory profile option, instead at
+debug level the service runs the net/http/pprof sidecar on localhost:8888,
+of which snapshot() saves the heap and allocs profiles, e.g. at the end of
+a test class:
+
+    session.profiler.snapshot(cls.__name__)
+
+The sidecar's port is fixed, so profiled services run one at a time:
+shard.py starts a single worker when profiling. Profiles are summarized with `go tool pprof -top` when go is installed,
+else read them later with `go tool pprof bin/podman <file>`.
+"""
+import os
+import shutil
+import subprocess
+import sys
+
+import requests
+
+# Directory receiving the profiles, see Session
+PROFILE_DIR = os.getenv("PODMAN_TEST_PROFILE")
+
+# Number of functions listed by the summaries
+TOP = int(os.getenv("PODMAN_TEST_PROFILE_TOP", "20"))
+
+# --time of a profiled service, seconds it may be idle. With --time=0 the
+# service ignores SIGTERM and is killed before it writes the CPU profile
+SERVICE_TIME = 7 * 24 * 3600
+
+# pprof sidecar of a service running at debug level, see pkg/api/server/server.go
+PPROF_URL = "http://localhost:8888/debug/pprof"
+
+
+class Profiler(object):
+    """Profiles of one service, stored in a directory"""
+
+    def __init__(self, directory, binary=None, top=TOP, url=PPROF_URL):
+        """
+        :param directory: created if needed
+        :param binary: podman binary of the service, resolving symbols for pprof
+        :param top: number of functions listed by summarize()
+        :param url: base URL of the service's pprof sidecar
+        """
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.binary = binary
+        self.top = top
+        self.url = url
+        # CPU profile of each run of the service, in order
+        self.cpu_profiles = []
+        # profiles written by snapshot(), in order
+        self.snapshots = []
+
+    @property
+    def cpu_profile(self):
+        """CPU profile of the last run of the service, None before the first"""
+        return self.cpu_profiles[-1] if self.cpu_profiles else None
+
+    def run_name(self, name, run=None):
+        """Return name suffixed with the index of a run of the service past the first
+
+        :param run: index of the run, the last one started by default
+        """
+        run = len(self.cpu_profiles) - 1 if run is None else run
+        return f"{name}.{run}" if run > 0 else name
+
+    def service_args(self):
+        """Options of `podman system service` profiling its next run"""
+        name = self.run_name("cpu", len(self.cpu_profiles))
+        self.cpu_profiles.append(os.path.join(self.directory, f"{name}.pprof"))
+        return [
+            f"--time={SERVICE_TIME}",
+            f"--cpu-profile={self.cpu_profile}",
+        ]
+
+    def snapshot(self, name, kinds=("heap", "allocs")):
+        """Save the sidecar's profiles as <directory>/<name>.<kind>.pprof
+
+        :return: paths written, empty when the sidecar is unavailable
+        """
+        written = []
+        for kind in kinds:
+            try:
+                r = requests.get(f"{self.url}/{kind}", timeout=30)
+                r.raise_for_status()
+            except requests.exceptions.RequestException as e:
+                sys.stderr.write(f"No {kind} profile of the service: {e}\n")
+                break
+            path = os.path.join(self.directory, f"{name}.{kind}.pprof")
+            with open(path, "wb") as f:
+                f.write(r.content)
+            written.append(path)
+        self.snapshots.extend(written)
+        return written
+
+    def top_functions(self, paths, sample_index=None):
+        """Return the `go tool pprof -top` listing of profiles, merged
+
+        :param paths: profile or list of profiles, e.g. of each run
+        :param sample_index: e.g. inuse_space or alloc_space of heap profiles
+        :return: None without go or when every profile is empty, as written
+            by a service that was killed rather than stopped
+        """
+        paths = [paths] if isinstance(paths, str) else paths
+        paths = [p for p in paths if os.path.exists(p) and os.path.getsize(p)]
+        go = shutil.which("go")
+        if go is None or not paths:
+            return None
+
+        cmd = [go, "tool", "pprof", "-top", f"-nodecount={self.top}"]
+        if sample_index:
+            cmd.append(f"-sample_index={sample_index}")
+        if self.binary:
+            cmd.append(self.binary)
+        cmd.extend(paths)
+        r = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        if r.returncode != 0:
+            sys.stderr.write(
+                f"go tool pprof {' '.join(paths)}: {r.stderr.decode(errors='replace')}"
+            )
+            return None
+        return r.stdout.decode(errors="replace")
+
+    def summarize(self, stream=sys.stderr):
+        """Write the hottest functions of the CPU profiles and the last heap profile
+
+        The CPU profiles of every run are merged. Each listing is also kept
+        next to its (first) profile as <profile>.top.txt.
+        """
+        profiles = [(self.cpu_profiles, None)]
+        heaps = [p for p in self.snapshots if p.endswith(".heap.pprof")]
+        if heaps:
+            profiles.append(([heaps[-1]], "inuse_space"))
+
+        for paths, sample_index in profiles:
+            listing = self.top_functions(paths, sample_index)
+            if listing is None:
+                continue
+            with open(paths[0] + ".top.txt", "w") as f:
+                f.write(listing)
+            stream.write(f"\n{os.path.basename(paths[0])}:\n{listing}")
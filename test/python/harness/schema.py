@@ -0,0 +1,387 @@
+"""Response validators compiled from the service's swagger document
+
+Each response schema is compiled once into nested closures, so checking
+a list of tens of thousands of objects costs a few dictionary and type
+lookups per value rather than a walk of the schema:
+
+    schemas = Schemas(load_spec(api=session.api))
+    validate = schemas.response("GET", "/v1.40/images/json")
+    validate(r.json())
+    validate.rate  # objects per second
+
+The document is generated by `make swagger` into pkg/api/swagger.yaml and
+served by the service at /libpod/swagger when PODMAN_SWAGGER_SPEC names it.
+"""
+import os
+import re
+import sys
+import time
+
+import yaml
+
+# swagger document used when no service is asked
+SPEC_PATH = os.getenv("PODMAN_SWAGGER_SPEC", "pkg/api/swagger.yaml")
+
+# swagger type: types of the decoded JSON values accepted, compared exactly
+# so that bool, a subclass of int, is not taken for an integer
+TYPES = {
+    "string": frozenset({str}),
+    "integer": frozenset({int}),
+    "number": frozenset({int, float}),
+    "boolean": frozenset({bool}),
+    "object": frozenset({dict}),
+    "array": frozenset({list}),
+}
+
+# scalar types checked inline by the enclosing object or array
+_PLAIN = ("string", "integer", "number", "boolean")
+
+# API version prefix of request paths, absent from the document's paths
+_VERSION = re.compile(r"^/v\d+(\.\d+)*")
+
+
+class SchemaError(ValueError):
+    """A value does not match its schema"""
+
+    def __init__(self, message, path=None):
+        super().__init__(message)
+        self.message = message
+        # keys and indexes leading to the value, outermost first
+        self.path = path or []
+
+    def __str__(self):
+        location = "".join(
+            f"[{p}]" if isinstance(p, int) else f".{p}" for p in self.path
+        )
+        return f"${location}: {self.message}"
+
+
+class SpecUnavailable(RuntimeError):
+    """Neither a swagger file nor the service provided the document"""
+
+
+def load_spec(path=SPEC_PATH, api=None):
+    """Load the swagger document from path, else from the service
+
+    :param path: swagger.yaml generated by `make swagger`
+    :param api: LibpodClient asked for /swagger when path does not exist
+    :raises SpecUnavailable: no document was found
+    """
+    loader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+    if path and os.path.exists(path):
+        with open(path, "rb") as f:
+            return yaml.load(f, Loader=loader)
+    if api is not None:
+        r = api.get("/swagger")
+        if r.status_code == 200:
+            return yaml.load(r.content, Loader=loader)
+        raise SpecUnavailable(f"GET /swagger: {r.status_code} {r.text.strip()}")
+    raise SpecUnavailable(f"{path} does not exist, run `make swagger`")
+
+
+def _describe(value):
+    return "null" if value is None else type(value).__name__
+
+
+class Validator(object):
+    """Compiled check of one schema, counting the objects it has validated"""
+
+    def __init__(self, check, name=""):
+        self._check = check
+        self.name = name
+        self.objects = 0
+        self.seconds = 0.0
+
+    def __call__(self, value):
+        """Return value if valid
+
+        :raises SchemaError: value does not match, the error names where
+        """
+        started = time.perf_counter()
+        try:
+            self._check(value)
+        finally:
+            self.seconds += time.perf_counter() - started
+            self.objects += len(value) if isinstance(value, list) else 1
+        return value
+
+    @property
+    def rate(self):
+        """Objects validated per second"""
+        return self.objects / self.seconds if self.seconds else None
+
+
+class Compiler(object):
+    """Compile swagger 2.0 schemas into check functions
+
+    A check takes a value and raises SchemaError if it does not match.
+    Objects and arrays may be null, as Go encodes nil maps, slices and
+    pointers, other types only when marked x-nullable.
+    """
+
+    def __init__(self, spec):
+        self.spec = spec
+        # $ref: check
+        self._refs = {}
+
+    def resolve(self, ref):
+        """Return the node a local reference such as #/definitions/Foo points to"""
+        if not ref.startswith("#/"):
+            raise ValueError(f"Unsupported reference: {ref}")
+        node = self.spec
+        for part in ref[2:].split("/"):
+            node = node[part.replace("~1", "/").replace("~0", "~")]
+        return node
+
+    def compile(self, schema):
+        if "$ref" in schema:
+            return self._ref(schema["$ref"])
+        if "allOf" in schema:
+            return self._all_of(schema)
+
+        kind = schema.get("type")
+        if kind is None:
+            kind = "object" if "properties" in schema else None
+        if kind == "object":
+            return self._object(schema)
+        if kind == "array":
+            return self._array(schema)
+        if kind in TYPES:
+            return self._scalar(schema, kind)
+        # no type, anything goes
+        return _accept
+
+    def _ref(self, ref):
+        check = self._refs.get(ref)
+        if check is None:
+            # recursive definitions reach the trampoline until compiled
+            compiled = []
+            self._refs[ref] = lambda value: compiled[0](value)
+            check = self.compile(self.resolve(ref))
+            compiled.append(check)
+            self._refs[ref] = check
+        return check
+
+    def _all_of(self, schema):
+        checks = [self.compile(s) for s in schema["allOf"]]
+        rest = {k: v for k, v in schema.items() if k != "allOf"}
+        if rest.get("required") or rest.get("properties"):
+            checks.append(self._object(rest))
+
+        def check(value):
+            for c in checks:
+                c(value)
+
+        return check
+
+    def _scalar(self, schema, kind):
+        types = TYPES[kind]
+        nullable = schema.get("x-nullable", False)
+        enum = frozenset(schema["enum"]) if schema.get("enum") else None
+
+        def check(value):
+            if type(value) not in types:
+                if value is None and nullable:
+                    return
+                raise SchemaError(f"expected {kind}, got {_describe(value)}")
+            if enum is not None and value not in enum:
+                raise SchemaError(f"{value!r} is not one of {sorted(enum)}")
+
+        return check
+
+    @staticmethod
+    def _plain(schema):
+        """Return the kind of a scalar schema needing nothing but a type check"""
+        kind = schema.get("type")
+        if kind in _PLAIN and not (schema.get("enum") or schema.get("x-nullable")):
+            return kind
+        return None
+
+    def _object(self, schema):
+        # key: kind of scalars checked inline, key: check of everything else
+        plain = {}
+        properties = {}
+        for name, s in schema.get("properties", {}).items():
+            kind = self._plain(s)
+            if kind is None:
+                properties[name] = self.compile(s)
+            else:
+                plain[name] = kind
+        types = {name: TYPES[kind] for name, kind in plain.items()}
+        required = frozenset(schema.get("required", ()))
+        additional = schema.get("additionalProperties")
+        extra = self.compile(additional) if isinstance(additional, dict) else None
+
+        if not (types or properties or required or extra):
+
+            def check(value):
+                if type(value) is not dict and value is not None:
+                    raise SchemaError(f"expected object, got {_describe(value)}")
+
+            return check
+
+        def check(value):
+            if type(value) is not dict:
+                if value is None:
+                    return
+                raise SchemaError(f"expected object, got {_describe(value)}")
+            if required and not required.issubset(value):
+                missing = sorted(required.difference(value))
+                raise SchemaError(f"missing required keys {missing}")
+            for key, item in value.items():
+                expected = types.get(key)
+                if expected is not None:
+                    if type(item) not in expected:
+                        raise SchemaError(
+                            f"expected {plain[key]}, got {_describe(item)}", [key]
+                        )
+                    continue
+                c = properties.get(key, extra)
+                if c is None:
+                    continue
+                try:
+                    c(item)
+                except SchemaError as e:
+                    e.path.insert(0, key)
+                    raise
+
+        return check
+
+    def _array(self, schema):
+        kind = self._plain(schema.get("items") or {})
+        items = self.compile(schema.get("items") or {})
+        expected = TYPES[kind] if kind else None
+
+        def check(value):
+            if type(value) is not list:
+                if value is None:
+                    return
+                raise SchemaError(f"expected array, got {_describe(value)}")
+            if items is _accept:
+                return
+            if expected is not None:
+                for index, item in enumerate(value):
+                    if type(item) not in expected:
+                        raise SchemaError(
+                            f"expected {kind}, got {_describe(item)}", [index]
+                        )
+                return
+            index = 0
+            try:
+                for index, item in enumerate(value):
+                    items(item)
+            except SchemaError as e:
+                e.path.insert(0, index)
+                raise
+
+        return check
+
+
+def _accept(value):
+    pass
+
+
+def _require(schema, keys):
+    """Add required keys to an object schema, or to the items of an array"""
+    if schema.get("type") == "array":
+        return dict(schema, items=_require(schema.get("items") or {}, keys))
+    return {"allOf": [schema], "type": "object", "required": list(keys)}
+
+
+# path parameter of a template, e.g. {name} or {name:.*} matching slashes too
+_PARAMETER = re.compile(r"\{[^}]+\}|[^{]+")
+
+
+def _parameter(match):
+    text = match.group(0)
+    if not text.startswith("{"):
+        return re.escape(text)
+    return ".+" if text.endswith(":.*}") else "[^/]+"
+
+
+class Schemas(object):
+    """Validators of the responses of every operation in a swagger document"""
+
+    def __init__(self, spec):
+        self.spec = spec
+        self.compiler = Compiler(spec)
+        self._validators = {}
+
+        # (method, pattern, template), templates without parameters first
+        routes = []
+        for template, operations in spec.get("paths", {}).items():
+            pattern = re.compile("^" + _PARAMETER.sub(_parameter, template) + "/?$")
+            for method in operations:
+                routes.append((template.count("{"), method.upper(), pattern, template))
+        self._routes = [route[1:] for route in sorted(routes, key=lambda r: r[0])]
+
+    def route(self, method, path):
+        """Return the document's path template serving method and path
+
+        :param path: request path, with or without API version and query
+        :raises KeyError: no operation matches
+        """
+        path = _VERSION.sub("", path.split("?", 1)[0])
+        method = method.upper()
+        for route_method, pattern, template in self._routes:
+            if route_method == method and pattern.match(path):
+                return template
+        raise KeyError(f"No operation for {method} {path}")
+
+    def response(self, method, path, status=200, require=()):
+        """Return the Validator of the response to method and path
+
+        :param status: response status documented by the operation
+        :param require: keys required beyond the schema, of each item for arrays
+        :raises KeyError: the operation or status is not documented
+        """
+        template = self.route(method, path)
+        key = (method.upper(), template, status, tuple(require))
+        validator = self._validators.get(key)
+        if validator is None:
+            operation = self.spec["paths"][template][method.lower()]
+            responses = operation.get("responses", {})
+            response = responses.get(status, responses.get(str(status)))
+            if response is None:
+                raise KeyError(f"{method} {template} documents no {status} response")
+            if "$ref" in response:
+                response = self.compiler.resolve(response["$ref"])
+
+            schema = response.get("schema") or {}
+            if require:
+                schema = _require(schema, require)
+            validator = Validator(
+                self.compiler.compile(schema), f"{method.upper()} {template} {status}"
+            )
+            self._validators[key] = validator
+        return validator
+
+
+_schemas = None
+
+
+def response_validator(method, path, status=200, require=(), api=None):
+    """Return the Validator of a response from the document loaded by load_spec()
+
+    The document is loaded and kept on first use. Without one only the
+    require keys are checked, so callers keep their minimum guarantees.
+    """
+    global _schemas
+
+    if _schemas is None:
+        try:
+            _schemas = Schemas(load_spec(api=api))
+        except SpecUnavailable as e:
+            sys.stderr.write(f"Response schemas not checked: {e}\n")
+            _schemas = False
+    if not _schemas:
+        # the document is unknown, accept a single object or a list of them
+        item = {"type": "object", "required": list(require)}
+        check_object = Compiler({}).compile(item)
+        check_array = Compiler({}).compile({"type": "array", "items": item})
+
+        def check(value):
+            (check_array if type(value) is list else check_object)(value)
+
+        return Validator(check, f"{method} {path} {status}")
+    return _schemas.response(method, path, status, require)
@@ -0,0 +1,225 @@
+import collections
+import os
+import subprocess
+import threading
+import time
+
+import requests
+
+from .client import LibpodClient
+from .servicelog import MAX_BYTES, ServiceLog
+from .transport import unix_url
+
+
+def service_url(uri):
+    """Translate a `podman system service` listener into a base URL for clients
+
+    :param uri: listener as given to podman, e.g. tcp:localhost:8080 or unix:///run/podman.sock
+    :return: base URL, e.g. http://localhost:8080 or http+unix://%2Frun%2Fpodman.sock
+    """
+    if uri.startswith("unix://"):
+        return unix_url(uri[len("unix://") :])
+    if uri.startswith("unix:"):
+        return unix_url(uri[len("unix:") :])
+    if uri.startswith("tcp://"):
+        return "http://" + uri[len("tcp://") :]
+    if uri.startswith("tcp:"):
+        return "http://" + uri[len("tcp:") :]
+    raise ValueError(f"Unsupported podman service URI: {uri}")
+
+
+def docker_url(uri):
+    """Translate a `podman system service` listener into a DockerClient base_url
+
+    :param uri: listener as given to podman, e.g. tcp:localhost:8080 or unix:///run/podman.sock
+    :return: docker-py base_url, e.g. tcp://localhost:8080 or unix:///run/podman.sock
+    """
+    if uri.startswith("unix://"):
+        return uri
+    if uri.startswith("unix:"):
+        return "unix://" + uri[len("unix:") :]
+    if uri.startswith("tcp://"):
+        return uri
+    if uri.startswith("tcp:"):
+        return "tcp://" + uri[len("tcp:") :]
+    raise ValueError(f"Unsupported podman service URI: {uri}")
+
+
+class PodmanService(object):
+    """
+    Run `podman system service` for the life of a test class or session
+
+    Readiness is determined by polling /_ping rather than sleeping, the
+    service output is retained in bounded buffers, its log optionally in
+    a rotating file, and the process is stopped with SIGTERM, escalating
+    to SIGKILL.
+    """
+
+    def __init__(
+        self,
+        podman,
+        uri="tcp:localhost:8080",
+        timeout=30.0,
+        stop_timeout=0.5,
+        capture_lines=1000,
+        log_path=None,
+        log_bytes=MAX_BYTES,
+        log_level=None,
+        profiler=None,
+    ):
+        """Initialize a service on the given listener
+
+        :param podman: Podman instance used to launch the service
+        :param uri: listener for the service, e.g. tcp:localhost:8080 or unix:///run/podman.sock
+        :param timeout: seconds to wait for the service to answer /_ping
+        :param stop_timeout: seconds to wait after SIGTERM before SIGKILL
+        :param capture_lines: number of stdout/stderr lines retained
+        :param log_path: file receiving the service's log, rotated past log_bytes
+        :param log_bytes: size of the log file before it is rotated
+        :param log_level: --log-level of the service, "debug" records request timings
+        :param profiler: harness.profiling.Profiler receiving CPU and heap profiles
+        """
+        self.podman = podman
+        self.uri = uri
+        self.url = service_url(uri)
+        self.docker_url = docker_url(uri)
+        self.timeout = timeout
+        self.stop_timeout = stop_timeout
+        self.profiler = profiler
+        # the pprof sidecar serving heap profiles only runs at debug level
+        self.log_level = "debug" if profiler else log_level
+
+        self.process = None
+        self.stdout = collections.deque(maxlen=capture_lines)
+        # logrus writes to stderr, see self.log.timings for the requests served
+        self.log = ServiceLog(log_path, log_bytes, tail_lines=capture_lines)
+        self.stderr = self.log.tail
+        self._readers = []
+
+        # seconds between launching the service and its first /_ping response
+        self.time_to_ready = None
+
+    @property
+    def socket_path(self):
+        """Path of the unix domain socket, None for a TCP listener"""
+        for scheme in ("unix://", "unix:"):
+            if self.uri.startswith(scheme):
+                return self.uri[len(scheme) :]
+        return None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def start(self):
+        """Launch the service and block until it answers /_ping
+
+        :raises subprocess.CalledProcessError: service exited during start up
+        :raises TimeoutError: service did not answer within timeout
+        """
+        path = self.socket_path
+        if path and os.path.exists(path):
+            # podman will not listen on a socket left behind by an earlier run
+            os.unlink(path)
+
+        args = [self.uri]
+        if self.log_level:
+            args.append(f"--log-level={self.log_level}")
+        if self.profiler:
+            # a finite --time, for SIGTERM to stop it
+            args.extend(self.profiler.service_args())
+        else:
+            args.append("--time=0")
+
+        started = time.monotonic()
+        self.process = self.podman.open(
+            "system",
+            "service",
+            *args,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+        )
+        self._readers = [
+            self._capture(self.process.stdout, self.stdout),
+            self.log.follow(self.process.stderr),
+        ]
+
+        try:
+            self._wait_ready(started)
+        except Exception:
+            self.stop()
+            raise
+        self.time_to_ready = time.monotonic() - started
+        return self
+
+    def _capture(self, pipe, lines):
+        def reader():
+            with pipe:
+                for line in iter(pipe.readline, b""):
+                    lines.append(line.decode("utf-8", errors="replace"))
+
+        thread = threading.Thread(target=reader, daemon=True)
+        thread.start()
+        return thread
+
+    def _wait_ready(self, started):
+        delay = 0.005
+        with LibpodClient(self.url, prefix="", pool_size=1, timeout=1.0) as client:
+            while True:
+                returncode = self.process.poll()
+                if returncode is not None:
+                    raise subprocess.CalledProcessError(
+                        returncode,
+                        "podman system service",
+                        stderr="".join(self.stderr),
+                    )
+
+                try:
+                    r = client.get("/_ping")
+                    if r.status_code == 200:
+                        return
+                except requests.exceptions.ConnectionError:
+                    pass
+
+                remaining = self.timeout - (time.monotonic() - started)
+                if remaining <= 0:
+                    raise TimeoutError(
+                        f"podman system service not ready after {self.timeout}s"
+                    )
+                time.sleep(min(delay, remaining))
+                delay = min(delay * 2, 0.5)
+
+    def stop(self):
+        """Stop the service, escalating from SIGTERM to SIGKILL
+
+        :return: exit code of the service, None if never started
+        """
+        if self.process is None:
+            return None
+
+        running = self.process.poll() is None
+        if running:
+            if self.profiler:
+                self.profiler.snapshot(self.profiler.run_name("final"))
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=self.stop_timeout)
+            except subprocess.TimeoutExpired:
+                # an unlimited service (--time=0) ignores SIGTERM
+                self.process.kill()
+                self.process.wait()
+
+        for reader in self._readers:
+            reader.join(timeout=1.0)
+        self.log.close()
+        return self.process.returncode
+
+    def write_output(self, stdout, stderr, title="Service"):
+        """Write the captured service output to the given streams"""
+        if self.stdout:
+            stdout.write(f"\n{title} Stdout:\n" + "".join(self.stdout))
+        if self.stderr:
+            stderr.write(f"\n{title} Stderr:\n" + "".join(self.stderr))
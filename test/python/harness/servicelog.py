@@ -0,0 +1,213 @@
+"""Capture of the service's log and the timings of the requests it served
+
+The service logs through logrus to stderr. A reader thread drains the
+pipe, so the service never blocks on a full pipe, into a size capped
+rotating file and a bounded in memory tail. At debug level the API
+handler brackets every request with
+
+    time="..." level=info msg="APIHandler(<id>) -- GET /v1.40/containers/json BEGIN"
+    time="..." level=debug msg="APIHandler(<id>) -- GET /v1.40/containers/json END"
+
+logrus stamps these to the second only, so the reader stamps each line
+with time.monotonic() as it arrives, the clock harness.metrics uses for
+client calls. join() pairs both sides of a request, attribute() tells per
+route how much of the client's latency was spent in the service.
+"""
+import collections
+import os
+import re
+import threading
+import time
+
+from .metrics import normalize_route, percentile
+
+# bytes written to the log file before it is rotated
+MAX_BYTES = 64 * 1024 * 1024
+
+# number of rotated files kept, path.1 being the most recent
+BACKUPS = 3
+
+_HANDLER = re.compile(
+    r"APIHandler\((?P<rid>[^)]+)\) -- (?P<method>[A-Z]+) (?P<url>\S+) (?P<phase>BEGIN|END)"
+)
+
+# One request as seen by the service, begin and end are time.monotonic() values
+Timing = collections.namedtuple("Timing", "rid method url begin end")
+
+
+def parse_line(line):
+    """Return (request id, method, URL, "BEGIN" or "END") of an API handler line
+
+    :return: None for any other line
+    """
+    match = _HANDLER.search(line)
+    if match is None:
+        return None
+    return match.group("rid", "method", "url", "phase")
+
+
+class RotatingFile(object):
+    """Append only file moved to path.1, path.2, ... once max_bytes are written"""
+
+    def __init__(self, path, max_bytes=MAX_BYTES, backups=BACKUPS):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self._file = open(path, "ab")
+        self._size = self._file.tell()
+
+    def write(self, data):
+        if self._size and self._size + len(data) > self.max_bytes:
+            self._rotate()
+        self._file.write(data)
+        self._size += len(data)
+
+    def _rotate(self):
+        self._file.close()
+        for index in range(self.backups - 1, 0, -1):
+            older = f"{self.path}.{index}"
+            if os.path.exists(older):
+                os.replace(older, f"{self.path}.{index + 1}")
+        if self.backups:
+            os.replace(self.path, f"{self.path}.1")
+        self._file = open(self.path, "wb")
+        self._size = 0
+
+    def flush(self):
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+class ServiceLog(object):
+    """Lines of the service's log, kept in a tail, a file and as request timings"""
+
+    def __init__(
+        self,
+        path=None,
+        max_bytes=MAX_BYTES,
+        backups=BACKUPS,
+        tail_lines=1000,
+        timings=100000,
+    ):
+        """
+        :param path: file receiving every line, None to keep the tail only
+        :param max_bytes: size of the file before it is rotated
+        :param backups: number of rotated files kept
+        :param tail_lines: number of most recent lines kept in self.tail
+        :param timings: number of most recent request timings kept
+        """
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.tail = collections.deque(maxlen=tail_lines)
+        self.timings = collections.deque(maxlen=timings)
+        self._file = None
+        # request id: (method, url, begin) of requests still being served
+        self._pending = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def follow(self, pipe):
+        """Read pipe until EOF in a daemon thread, return the thread"""
+        if self.path and self._file is None:
+            self._file = RotatingFile(self.path, self.max_bytes, self.backups)
+
+        def reader():
+            with pipe:
+                for line in iter(pipe.readline, b""):
+                    self.feed(line, time.monotonic())
+            with self._lock:
+                if self._file is not None:
+                    self._file.flush()
+
+        thread = threading.Thread(target=reader, daemon=True)
+        thread.start()
+        return thread
+
+    def feed(self, line, stamp=None):
+        """Record one line of the log
+
+        :param line: bytes as read from the service
+        :param stamp: time.monotonic() the line was read at
+        """
+        text = line.decode("utf-8", errors="replace")
+        self.tail.append(text)
+        with self._lock:
+            if self._file is not None:
+                self._file.write(line)
+
+            parsed = parse_line(text)
+            if parsed is None:
+                return
+            rid, method, url, phase = parsed
+            stamp = time.monotonic() if stamp is None else stamp
+            if phase == "BEGIN":
+                self._pending[rid] = (method, url, stamp)
+                # streaming requests cut off by the end of the service never END
+                if len(self._pending) > self.timings.maxlen:
+                    self._pending.popitem(last=False)
+            else:
+                begun = self._pending.pop(rid, None)
+                if begun is not None:
+                    self.timings.append(Timing(rid, *begun, stamp))
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+def join(timings, calls, tolerance=0.25):
+    """Pair client calls with the service's timings of the same requests
+
+    Requests are matched on method and URL, in order, the service's BEGIN
+    falling within the call give or take tolerance seconds.
+
+    :param timings: Timing records of ServiceLog.timings
+    :param calls: Call records of harness.metrics.Recorder.calls
+    :return: list of (call, timing)
+    """
+    pending = {}
+    for timing in sorted(timings, key=lambda t: t.begin):
+        pending.setdefault((timing.method, timing.url), collections.deque()).append(
+            timing
+        )
+
+    pairs = []
+    for call in sorted(calls, key=lambda c: c.started):
+        queue = pending.get((call.method, call.path))
+        # requests made outside of the recorder, e.g. before it was installed
+        while queue and queue[0].begin < call.started - tolerance:
+            queue.popleft()
+        if queue and queue[0].begin <= call.started + call.seconds + tolerance:
+            pairs.append((call, queue.popleft()))
+    return pairs
+
+
+def attribute(pairs):
+    """Split the latency of each route between the service and the rest
+
+    :param pairs: result of join()
+    :return: {"METHOD /route": {count, client/server/outside p50 and p90 in ms}}
+    """
+    routes = {}
+    for call, timing in pairs:
+        key = f"{call.method} {normalize_route(call.path)}"
+        server = timing.end - timing.begin
+        samples = routes.setdefault(key, ([], [], []))
+        samples[0].append(call.seconds)
+        samples[1].append(server)
+        # transport, client and the log pipe, never below zero
+        samples[2].append(max(call.seconds - server, 0.0))
+
+    report = {}
+    for key, series in sorted(routes.items()):
+        summary = {"count": len(series[0])}
+        for name, samples in zip(("client", "server", "outside"), series):
+            samples.sort()
+            for p in (50, 90):
+                summary[f"{name}_p{p}_ms"] = round(percentile(samples, p) * 1000.0, 3)
+        report[key] = summary
+    return report
@@ -0,0 +1,408 @@
+import atexit
+import glob
+import hashlib
+import json
+import os
+import sys
+import uuid
+
+import requests
+
+from test.python.docker.compat import constant
+
+from .cleanup import Cleanup
+from .client import LibpodClient
+from .distribution import Registry, repository_name
+from .fixtures import FixtureRegistry
+from .metrics import Recorder, compare, install, uninstall
+from .podman import Podman
+from .profiling import PROFILE_DIR, Profiler
+from .service import PodmanService
+from .servicelog import attribute, join
+from .waiter import StateWaiter
+
+# Listener shared by every suite in the test run
+SERVICE_URI = os.getenv("PODMAN_SERVICE_URI", "tcp:127.0.0.1:8080")
+
+# Label applied to objects created by the harness, scoping cleanup to this run
+LABEL = "io.podman.test.session"
+
+# Networks that are part of the storage root rather than created by tests
+DEFAULT_NETWORKS = ("podman",)
+
+# How reset() cleans storage: "api" removes objects through the service,
+# "snapshot" restores a copy of the storage root taken after the first reset
+RESET_MODE = os.getenv("PODMAN_TEST_RESET", "api")
+
+# JSON file receiving the time reset() spent removing each kind of object
+CLEANUP_REPORT = os.getenv("PODMAN_TEST_CLEANUP_REPORT")
+
+# Path prefix of the per route timings written as .json and .csv, and the
+# report of a reference run they are compared with on close()
+METRICS_REPORT = os.getenv("PODMAN_TEST_METRICS")
+METRICS_BASELINE = os.getenv("PODMAN_TEST_METRICS_BASELINE")
+
+# File receiving the service's debug log, rotated past PODMAN_TEST_SERVICE_LOG_BYTES
+SERVICE_LOG = os.getenv("PODMAN_TEST_SERVICE_LOG")
+SERVICE_LOG_BYTES = int(os.getenv("PODMAN_TEST_SERVICE_LOG_BYTES", 64 * 1024 * 1024))
+
+# Registry standing in for quay.io and docker.io: "local" runs one in process,
+# seeded from the image cache and the docker-archive tarballs in
+# PODMAN_TEST_REGISTRY_SEED, host:port names one already running
+REGISTRY = os.getenv("PODMAN_TEST_REGISTRY")
+REGISTRY_SEED = os.getenv("PODMAN_TEST_REGISTRY_SEED")
+
+# client calls kept to be joined with the service's timings of them
+_CALLS = 100000
+
+_session = None
+
+
+def get_session():
+    """Return the service and storage root shared by all suites, starting it if needed"""
+    global _session
+
+    if _session is None:
+        _session = Session()
+        _session.start()
+        atexit.register(_close_session)
+    return _session
+
+
+def _close_session():
+    """Close the shared session at exit, failing the run on slower routes"""
+    if _session.close():
+        # the exit status is settled before atexit handlers run and a
+        # SystemExit raised by one is ignored
+        sys.stdout.flush()
+        sys.stderr.flush()
+        os._exit(1)
+
+
+def _worker_path(path):
+    """Return path suffixed with the index of the shard.py worker, if any"""
+    worker = os.getenv("PODMAN_TEST_WORKER")
+    return f"{path}.{worker}" if worker else path
+
+
+class Session(object):
+    """
+    One podman service and storage root for the life of the test process
+
+    Suites isolate tests by calling reset() rather than restarting the service.
+    """
+
+    def __init__(self, uri=SERVICE_URI, reset_mode=RESET_MODE):
+        if reset_mode not in ("api", "snapshot"):
+            raise ValueError(f"Unsupported reset mode: {reset_mode}")
+
+        self.id = uuid.uuid4().hex[:12]
+        self.labels = {LABEL: self.id}
+
+        self.podman = Podman()
+        options = {}
+        if SERVICE_LOG:
+            options.update(
+                log_path=_worker_path(SERVICE_LOG),
+                log_bytes=SERVICE_LOG_BYTES,
+                log_level="debug",
+            )
+        if PROFILE_DIR:
+            options["profiler"] = Profiler(
+                _worker_path(PROFILE_DIR), binary=self.podman.cmd[0]
+            )
+        self.service = PodmanService(self.podman, uri, **options)
+        self.profiler = self.service.profiler
+        self.url = self.service.url
+        self.docker_url = self.service.docker_url
+
+        self.api = LibpodClient(self.url)
+
+        self.reset_mode = reset_mode
+        self.snapshots = set()
+        self._waiter = None
+        # accumulated over every reset() of the session
+        self.cleanup = Cleanup()
+        # objects created by tests since the last reset()
+        self.fixtures = FixtureRegistry()
+        # timings of every request made by the process, see harness.metrics
+        self.metrics = None
+        # in process registry when PODMAN_TEST_REGISTRY=local
+        self.registry = None
+
+    def start(self):
+        if METRICS_REPORT and self.metrics is None:
+            self.metrics = Recorder(calls=_CALLS if SERVICE_LOG else 0)
+            install(self.metrics)
+        if REGISTRY == "local" and self.registry is None:
+            self.registry = self._start_registry()
+            self.podman.write_registries_conf(self.registry.host)
+        elif REGISTRY:
+            self.podman.write_registries_conf(REGISTRY)
+        self.service.start()
+        return self
+
+    def _start_registry(self):
+        registry = Registry().start()
+        for path, references in self.podman.image_tarballs.tarballs():
+            registry.add_archive(path, references)
+        if REGISTRY_SEED:
+            for path in sorted(glob.glob(os.path.join(REGISTRY_SEED, "*.tar"))):
+                registry.add_archive(path)
+        registry.add_short_names()
+        if repository_name(constant.infra) not in registry.catalog():
+            # pulled by every pod created without an infra image of its own
+            sys.stderr.write(
+                f"Registry: no {repository_name(constant.infra)} image in the image"
+                " cache or PODMAN_TEST_REGISTRY_SEED, pods cannot be created offline\n"
+            )
+        return registry
+
+    @property
+    def waiter(self):
+        """StateWaiter subscribed to the service's container events"""
+        if self._waiter is None or not self._waiter.alive:
+            self._waiter = StateWaiter(self.api).start()
+        return self._waiter
+
+    def _close_waiter(self):
+        if self._waiter is not None:
+            self._waiter.close()
+            self._waiter = None
+
+    def close(self):
+        """Stop the service and remove the storage root
+
+        :return: routes slower than PODMAN_TEST_METRICS_BASELINE, see
+            metrics.compare()
+        """
+        self._close_waiter()
+        try:
+            # running containers keep conmon and their mounts, the storage
+            # root could not be removed under them
+            self._remove_all(())
+        except requests.exceptions.RequestException as e:
+            sys.stderr.write(f"Storage not cleaned before stopping the service: {e}\n")
+        self.api.close()
+        returncode = self.service.stop()
+        if returncode not in (0, -9, -15):
+            self.service.write_output(sys.stdout, sys.stderr)
+        if self.profiler is not None:
+            self.profiler.summarize()
+        self.podman.tear_down()
+        if self.registry is not None:
+            self.registry.close()
+
+        if CLEANUP_REPORT:
+            with open(CLEANUP_REPORT, "w") as f:
+                json.dump(self.cleanup.report, f, indent=2, sort_keys=True)
+
+        if self.metrics is not None:
+            uninstall()
+            return self._write_metrics()
+        return []
+
+    def _write_metrics(self):
+        prefix = _worker_path(METRICS_REPORT)
+        report = self.metrics.write(prefix)
+
+        if self.service.log.timings:
+            # how much of each route's latency was spent in the service
+            pairs = join(self.service.log.timings, self.metrics.calls)
+            with open(prefix + ".server.json", "w") as f:
+                json.dump({"routes": attribute(pairs)}, f, indent=2)
+
+        if not METRICS_BASELINE or not os.path.exists(METRICS_BASELINE):
+            return []
+        with open(METRICS_BASELINE) as f:
+            baseline = json.load(f)
+        regressions = compare(baseline, report)
+        for route, before, now, ratio in regressions:
+            sys.stderr.write(
+                f"Slower than baseline: {route} p90 {before} -> {now} ms\n"
+            )
+        return regressions
+
+    def profile(self, name):
+        """Save heap profiles of the service as <name>.*.pprof when profiling
+
+        :param name: e.g. the test class just finished
+        """
+        if self.profiler is not None:
+            self.profiler.snapshot(name)
+
+    def record(self, kind, r, name=None):
+        """Record the object a create request made, for reset() to remove it
+
+        :param kind: see fixtures.KINDS
+        :param r: successful response of the request, carrying the Id of the
+            object, or the Name of a volume
+        :return: the Fixture recorded
+        """
+        obj = r.json()
+        return self.fixtures.add(kind, obj.get("Id") or obj["Name"], name=name)
+
+    def run_container(self, *args, name=None):
+        """Run `podman run` with the session labels and record the container
+
+        :param args: options, image and command, e.g. ("alpine", "/bin/ls")
+        :param name: name of the container
+        :return: id of the container
+        :raises subprocess.CalledProcessError: podman run failed
+        """
+        cidfile = os.path.join(self.podman.anchor_directory, f"{uuid.uuid4().hex}.cid")
+        options = [f"--cidfile={cidfile}"]
+        options.extend(f"--label={key}={value}" for key, value in self.labels.items())
+        if name:
+            options.append(f"--name={name}")
+        try:
+            self.podman.run("run", *options, *args, check=True)
+            with open(cidfile) as f:
+                id = f.read().strip()
+        finally:
+            if os.path.exists(cidfile):
+                os.unlink(cidfile)
+
+        self.fixtures.add("container", id, name=name, labels=self.labels)
+        return id
+
+    def _get(self, path, **kwargs):
+        r = self.api.get(path, **kwargs)
+        r.raise_for_status()
+        return r.json() or []
+
+    def _post(self, path, **kwargs):
+        r = self.api.post(path, **kwargs)
+        r.raise_for_status()
+        return r
+
+    def _delete(self, path, **kwargs):
+        r = self.api.delete(path, **kwargs)
+        # object may already be gone as a side effect of an earlier removal
+        if r.status_code != 404:
+            r.raise_for_status()
+        return r
+
+    def reset(self, images=()):
+        """Return storage to a clean state, keeping only the given images
+
+        In "snapshot" mode the first reset with a given set of images
+        cleans storage through the API. Once all images are present the
+        storage root is captured and later resets restore that copy.
+
+        :param images: fully qualified references of images that survive the reset
+        :return: references from images not present in storage
+        """
+        if self.reset_mode != "snapshot":
+            return self._remove_all(images)
+
+        name = hashlib.sha1("\n".join(sorted(images)).encode()).hexdigest()[:12]
+        if name in self.snapshots:
+            self.restore(name)
+            self.fixtures.clear()
+            return []
+
+        missing = self._remove_all(images)
+        if not missing:
+            self.snapshot(name)
+        return missing
+
+    def _quiesce(self):
+        """Stop containers and the service so the storage root may be copied"""
+        for ctnr in self._get("/containers/json"):
+            # stopping through the service also unmounts and cleans up
+            r = self.api.post(f"/containers/{ctnr['Id']}/stop", params={"t": 0})
+            if r.status_code not in (204, 304, 404):
+                r.raise_for_status()
+        self._close_waiter()
+        self.api.close()
+        self.service.stop()
+
+    def snapshot(self, name):
+        """Capture the storage root as snapshot name"""
+        self._quiesce()
+        try:
+            self.podman.snapshot(name)
+        finally:
+            self.service.start()
+        self.snapshots.add(name)
+
+    def restore(self, name):
+        """Replace the storage root with snapshot name"""
+        self._quiesce()
+        try:
+            self.podman.restore(name)
+        finally:
+            self.service.start()
+
+    def _remove_all(self, images):
+        """Remove everything through the API but the given images
+
+        Objects recorded in self.fixtures are removed by id and objects
+        labeled by this session are pruned in bulk, anything left over is
+        removed concurrently and dangling images are pruned. Time
+        spent per kind accumulates in self.cleanup.
+        """
+        keep = set()
+        missing = []
+        for reference in images:
+            r = self.api.get(f"/images/{reference}/json")
+            if r.status_code != 200:
+                missing.append(reference)
+                continue
+
+            obj = r.json()
+            keep.add(obj["Id"])
+            # drop names added by tests, e.g. docker-py's image.tag()
+            for name in obj.get("RepoTags") or []:
+                if name not in images:
+                    repo, _, tag = name.rpartition(":")
+                    self._post(
+                        f"/images/{obj['Id']}/untag", params={"repo": repo, "tag": tag}
+                    )
+
+        cleanup = self.cleanup
+        force = {"force": "true"}
+
+        # recorded objects are removed by id, the sweep below finds the rest
+        self.fixtures.remove_all(self.api, cleanup, keep=keep)
+
+        # pods first, removing a pod removes its containers including infra
+        cleanup.remove(
+            "pods",
+            lambda pod: self._delete(f"/pods/{pod['Id']}", params=force),
+            self._get("/pods/json"),
+        )
+
+        label = json.dumps({"label": [f"{LABEL}={self.id}"]})
+        cleanup.prune(
+            "containers",
+            lambda: len(
+                self._post("/containers/prune", params={"filters": label}).json() or []
+            ),
+        )
+        cleanup.remove(
+            "containers",
+            lambda ctnr: self._delete(f"/containers/{ctnr['Id']}", params=force),
+            self._get("/containers/json", params={"all": "true"}),
+        )
+
+        cleanup.prune("volumes", lambda: len(self._post("/volumes/prune").json() or []))
+        cleanup.remove(
+            "networks",
+            lambda net: self._delete(f"/networks/{net['Name']}", params=force),
+            [
+                n
+                for n in self._get("/networks/json")
+                if n["Name"] not in DEFAULT_NETWORKS
+            ],
+        )
+
+        cleanup.remove(
+            "images",
+            lambda img: self._delete(f"/images/{img['Id']}", params=force),
+            [i for i in self._get("/images/json") if i["Id"] not in keep],
+        )
+        cleanup.prune("images", lambda: len(self._post("/images/prune").json() or []))
+
+        return missing
@@ -0,0 +1,286 @@
+"""Run the python suites sharded across worker processes
+
+Each worker runs its own `podman system service` on its own port with its
+own storage root, so shards do not interfere with each other.
+
+    python3 -m test.python.harness.shard -j 4 test/apiv2/rest_api test/python/docker
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import unittest
+
+from .profiling import PROFILE_DIR
+
+DEFAULT_SUITES = ("test/apiv2/rest_api", "test/python/docker")
+
+
+def _flatten(suite):
+    for test in suite:
+        if isinstance(test, unittest.TestSuite):
+            yield from _flatten(test)
+        else:
+            yield test
+
+
+def discover(start_dirs, pattern="test*.py"):
+    """Return the ids of all tests found below the given directories
+
+    :raises ImportError: a test module failed to import
+    """
+    loader = unittest.TestLoader()
+    ids = []
+    for start_dir in start_dirs:
+        suite = loader.discover(start_dir, pattern=pattern, top_level_dir=".")
+        ids.extend(t.id() for t in _flatten(suite))
+    if loader.errors:
+        raise ImportError("\n".join(loader.errors))
+    return ids
+
+
+def split(ids, workers, by="class"):
+    """Split test ids into balanced shards
+
+    :param ids: test ids, e.g. test.python.docker.compat.test_images.TestImages.test_tag
+    :param workers: number of shards
+    :param by: "class" keeps test classes together, "test" distributes single tests
+    :return: list of test id lists, one per shard
+    """
+    if by == "test":
+        return [ids[i::workers] for i in range(workers)]
+
+    groups = {}
+    for test_id in ids:
+        groups.setdefault(test_id.rpartition(".")[0], []).append(test_id)
+
+    # largest classes first, each into the currently smallest shard
+    shards = [[] for _ in range(workers)]
+    for group in sorted(groups.values(), key=len, reverse=True):
+        min(shards, key=len).extend(group)
+    return shards
+
+
+class _Result(unittest.TextTestResult):
+    """Text result that also keeps outcomes in a form that can be serialized"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.passed = []
+
+    def addSuccess(self, test):
+        super().addSuccess(test)
+        self.passed.append(test.id())
+
+    def to_dict(self):
+        def describe(outcomes):
+            return [{"id": t.id(), "detail": detail} for t, detail in outcomes]
+
+        return {
+            "run": self.testsRun,
+            "passed": self.passed,
+            "failures": describe(self.failures),
+            "errors": describe(self.errors),
+            "skipped": describe(self.skipped),
+            "expectedFailures": describe(self.expectedFailures),
+            "unexpectedSuccesses": [t.id() for t in self.unexpectedSuccesses],
+        }
+
+
+def run_worker(ids_file, result_file, verbosity=1):
+    """Run the tests listed in ids_file, writing the outcome to result_file"""
+    with open(ids_file) as f:
+        ids = json.load(f)
+
+    suite = unittest.TestLoader().loadTestsFromNames(ids)
+    runner = unittest.TextTestRunner(verbosity=verbosity, resultclass=_Result)
+    started = time.monotonic()
+    result = runner.run(suite)
+
+    report = result.to_dict()
+    report["duration"] = time.monotonic() - started
+    with open(result_file, "w") as f:
+        json.dump(report, f)
+    return 0 if result.wasSuccessful() else 1
+
+
+def worker_uri(index, transport, port, results_dir):
+    """Return the service listener of a worker"""
+    if transport == "unix":
+        return "unix://" + os.path.join(results_dir, f"worker{index}.sock")
+    return f"tcp:127.0.0.1:{port + index}"
+
+
+def run_shards(shards, results_dir, port=8080, transport="tcp", verbosity=1):
+    """Start one worker per shard and wait for all of them
+
+    :return: list of (shard ids, worker report or None, log path, exit status)
+    """
+    workers = []
+    for index, ids in enumerate(shards):
+        if not ids:
+            continue
+
+        ids_file = os.path.join(results_dir, f"worker{index}.ids.json")
+        result_file = os.path.join(results_dir, f"worker{index}.result.json")
+        log_file = os.path.join(results_dir, f"worker{index}.log")
+        with open(ids_file, "w") as f:
+            json.dump(ids, f)
+
+        env = os.environ.copy()
+        env["PODMAN_TEST_WORKER"] = str(index)
+        env["PODMAN_SERVICE_URI"] = worker_uri(index, transport, port, results_dir)
+
+        with open(log_file, "w") as log:
+            process = subprocess.Popen(
+                [
+                    sys.executable,
+                    "-m",
+                    "test.python.harness.shard",
+                    "--worker",
+                    ids_file,
+                    result_file,
+                    f"--verbosity={verbosity}",
+                ],
+                env=env,
+                stdin=subprocess.DEVNULL,
+                stdout=log,
+                stderr=subprocess.STDOUT,
+            )
+        workers.append((ids, process, result_file, log_file))
+
+    outcomes = []
+    for ids, process, result_file, log_file in workers:
+        process.wait()
+        report = None
+        if os.path.exists(result_file):
+            with open(result_file) as f:
+                report = json.load(f)
+        outcomes.append((ids, report, log_file, process.returncode))
+    return outcomes
+
+
+def merge(outcomes):
+    """Merge worker reports, charging every test of a crashed worker as an error"""
+    merged = {
+        "run": 0,
+        "passed": [],
+        "failures": [],
+        "errors": [],
+        "skipped": [],
+        "expectedFailures": [],
+        "unexpectedSuccesses": [],
+        "duration": 0.0,
+    }
+    for ids, report, log_file, returncode in outcomes:
+        if report is None:
+            detail = f"worker exited without a result, see {log_file}"
+            merged["run"] += len(ids)
+            merged["errors"].extend({"id": i, "detail": detail} for i in ids)
+            continue
+
+        failed = report["failures"] or report["errors"] or report["unexpectedSuccesses"]
+        if returncode and not failed:
+            # failed on exit, e.g. by routes slower than the metrics baseline
+            merged["errors"].append(
+                {
+                    "id": os.path.basename(log_file),
+                    "detail": f"worker exited with status {returncode}, see {log_file}",
+                }
+            )
+
+        merged["run"] += report["run"]
+        merged["duration"] = max(merged["duration"], report["duration"])
+        for key in (
+            "passed",
+            "failures",
+            "errors",
+            "skipped",
+            "expectedFailures",
+            "unexpectedSuccesses",
+        ):
+            merged[key].extend(report[key])
+    return merged
+
+
+def write_summary(merged, stream):
+    for kind in ("errors", "failures"):
+        for outcome in merged[kind]:
+            stream.write("=" * 70 + "\n")
+            stream.write(f"{kind[:-1].upper()}: {outcome['id']}\n")
+            stream.write("-" * 70 + "\n")
+            stream.write(outcome["detail"] + "\n")
+
+    stream.write("-" * 70 + "\n")
+    stream.write(f"Ran {merged['run']} tests in {merged['duration']:.3f}s\n\n")
+
+    if merged["failures"] or merged["errors"] or merged["unexpectedSuccesses"]:
+        stream.write(
+            f"FAILED (failures={len(merged['failures'])},"
+            f" errors={len(merged['errors'])},"
+            f" skipped={len(merged['skipped'])})\n"
+        )
+        return False
+    stream.write(f"OK (skipped={len(merged['skipped'])})\n")
+    return True
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("suites", nargs="*", default=DEFAULT_SUITES)
+    parser.add_argument(
+        "-j", "--jobs", type=int, default=os.cpu_count(), help="number of workers"
+    )
+    parser.add_argument(
+        "--by",
+        choices=("class", "test"),
+        default="class",
+        help="unit of work handed to a worker",
+    )
+    parser.add_argument(
+        "--port", type=int, default=8080, help="service port of the first worker"
+    )
+    parser.add_argument(
+        "--transport",
+        choices=("tcp", "unix"),
+        default="tcp",
+        help="listener of the worker services",
+    )
+    parser.add_argument("--results", help="directory for worker logs and reports")
+    parser.add_argument("-v", "--verbosity", type=int, default=1)
+    parser.add_argument("--worker", nargs=2, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.worker:
+        return run_worker(*args.worker, verbosity=args.verbosity)
+
+    results_dir = args.results or tempfile.mkdtemp(prefix="podman_shard_")
+    os.makedirs(results_dir, exist_ok=True)
+
+    jobs = max(1, args.jobs)
+    if PROFILE_DIR and jobs > 1:
+        # the services' pprof sidecars would all bind localhost:8888
+        sys.stderr.write("PODMAN_TEST_PROFILE is set, running a single worker\n")
+        jobs = 1
+    shards = split(discover(args.suites), jobs, by=args.by)
+    outcomes = run_shards(
+        shards,
+        results_dir,
+        port=args.port,
+        transport=args.transport,
+        verbosity=args.verbosity,
+    )
+    merged = merge(outcomes)
+    with open(os.path.join(results_dir, "results.json"), "w") as f:
+        json.dump(merged, f, indent=2)
+
+    ok = write_summary(merged, sys.stderr)
+    sys.stderr.write(f"Worker logs and results in {results_dir}\n")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
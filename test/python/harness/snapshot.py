@@ -0,0 +1,76 @@
+"""Cheap copies of a storage root for snapshot and restore
+
+clone_tree() tries, in order, a reflink copy (btrfs, xfs), a hardlink
+farm and a plain copy. Hardlinked files share their data with the
+snapshot, which is safe only for files containers/storage and libpod
+replace rather than modify: databases and lock files are always copied.
+"""
+import fnmatch
+import os
+import shutil
+import subprocess
+
+# files written in place, they must never be shared with a snapshot
+MUTABLE = ("*.db", "*.lock", "*.lck", "lock")
+
+MODES = ("reflink", "hardlink", "copy")
+
+
+class CloneError(Exception):
+    """A tree could not be cloned in the requested mode"""
+
+
+def _cp(*args):
+    r = subprocess.run(["cp", *args], stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    if r.returncode != 0:
+        raise CloneError(r.stderr.decode("utf-8", errors="replace").strip())
+
+
+def _unshare_mutable(root):
+    for dirpath, _, filenames in os.walk(root):
+        for name in filenames:
+            if any(fnmatch.fnmatch(name, pattern) for pattern in MUTABLE):
+                path = os.path.join(dirpath, name)
+                if os.path.islink(path):
+                    continue
+                tmp = path + ".clone"
+                shutil.copy2(path, tmp)
+                os.replace(tmp, path)
+
+
+def remove_tree(path):
+    """Remove the directory path and everything below it, if present
+
+    :raises OSError: part of the tree could not be removed
+    """
+    try:
+        shutil.rmtree(path)
+    except FileNotFoundError:
+        pass
+
+
+def clone_tree(src, dst, mode=None):
+    """Copy the directory src to dst, which must not exist
+
+    :param mode: one of MODES, None tries each in turn
+    :return: mode used
+    :raises CloneError: the tree could not be cloned in the requested mode
+        or dst exists, cp would copy src into it
+    """
+    if os.path.lexists(dst):
+        raise CloneError(f"unable to clone {src} to {dst}: destination exists")
+    for candidate in MODES if mode is None else (mode,):
+        try:
+            if candidate == "reflink":
+                _cp("-a", "--reflink=always", src, dst)
+            elif candidate == "hardlink":
+                _cp("-a", "--link", src, dst)
+                _unshare_mutable(dst)
+            else:
+                _cp("-a", src, dst)
+            return candidate
+        except (CloneError, OSError) as e:
+            # a partial copy left behind would nest the next attempt
+            remove_tree(dst)
+            error = e
+    raise CloneError(f"unable to clone {src} to {dst}: {error}")
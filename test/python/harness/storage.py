@@ -0,0 +1,112 @@
+"""Storage driver selection for the harness
+
+The driver is taken from PODMAN_STORAGE_DRIVER or detected from the file
+system backing the storage root:
+
+- overlay, kernel overlayfs, when running as root on a file system it
+  accepts as upper directory
+- fuse-overlayfs, overlay through the fuse-overlayfs mount program, when
+  it is installed, e.g. rootless or on top of an overlay root
+- vfs otherwise, every layer is a full copy
+"""
+import os
+import shutil
+
+DRIVERS = ("vfs", "overlay", "fuse-overlayfs")
+
+# Storage driver used by the harness, detected when unset
+STORAGE_DRIVER = os.getenv("PODMAN_STORAGE_DRIVER")
+
+# File systems kernel overlayfs accepts as upper directory, no tmpfs and
+# no overlay on overlay as found in container based CI
+OVERLAY_BACKING = ("ext4", "xfs", "btrfs")
+
+
+def _unescape(field):
+    # /proc/mounts escapes blanks, tabs, newlines and backslashes as octal
+    return field.encode().decode("unicode_escape")
+
+
+def backing_filesystem(path, mounts="/proc/mounts"):
+    """Return the type of the file system holding path, None if unknown"""
+    path = os.path.realpath(path)
+    best, fstype = "", None
+    try:
+        with open(mounts) as f:
+            for line in f:
+                fields = line.split()
+                if len(fields) < 3:
+                    continue
+                mountpoint = _unescape(fields[1])
+                prefix = mountpoint.rstrip("/") + "/"
+                if (path == mountpoint or path.startswith(prefix)) and len(
+                    mountpoint
+                ) >= len(best):
+                    best, fstype = mountpoint, fields[2]
+    except OSError:
+        return None
+    return fstype
+
+
+def kernel_overlay(filesystems="/proc/filesystems"):
+    """Return True if the kernel supports overlayfs"""
+    try:
+        with open(filesystems) as f:
+            return any(line.split()[-1:] == ["overlay"] for line in f)
+    except OSError:
+        return False
+
+
+def fuse_overlayfs():
+    """Return the path of the fuse-overlayfs binary, None if it cannot be used"""
+    binary = shutil.which("fuse-overlayfs")
+    if binary is None or not os.path.exists("/dev/fuse"):
+        return None
+    return binary
+
+
+def available_drivers(path):
+    """Return the drivers usable for a storage root in path, fastest first"""
+    drivers = []
+    if (
+        os.geteuid() == 0
+        and backing_filesystem(path) in OVERLAY_BACKING
+        and kernel_overlay()
+    ):
+        drivers.append("overlay")
+    if fuse_overlayfs() is not None:
+        drivers.append("fuse-overlayfs")
+    drivers.append("vfs")
+    return drivers
+
+
+def detect_driver(path):
+    """Return STORAGE_DRIVER if set, otherwise the fastest driver usable in path
+
+    :raises ValueError: STORAGE_DRIVER is not one of DRIVERS
+    """
+    if STORAGE_DRIVER:
+        if STORAGE_DRIVER not in DRIVERS:
+            raise ValueError(f"Unsupported storage driver: {STORAGE_DRIVER}")
+        return STORAGE_DRIVER
+    return available_drivers(path)[0]
+
+
+def driver_options(driver):
+    """Return the podman global options selecting driver
+
+    :raises ValueError: driver is not one of DRIVERS or fuse-overlayfs is missing
+    """
+    if driver == "vfs":
+        return ["--storage-driver=vfs"]
+    if driver == "overlay":
+        return ["--storage-driver=overlay"]
+    if driver == "fuse-overlayfs":
+        binary = fuse_overlayfs()
+        if binary is None:
+            raise ValueError("fuse-overlayfs storage driver requested but not usable")
+        return [
+            "--storage-driver=overlay",
+            f"--storage-opt=overlay.mount_program={binary}",
+        ]
+    raise ValueError(f"Unsupported storage driver: {driver}")
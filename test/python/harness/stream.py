@@ -0,0 +1,149 @@
+"""Incremental decoding of streamed JSON responses
+
+/images/pull, /images/push, /build and /events answer with a stream of
+JSON objects, one per line. JSONStream yields each object as soon as its
+bytes arrive rather than after the response ends, holding no more than
+the current partial object in memory.
+
+    with API.stream_json("POST", "/images/pull", params={"reference": ALPINE}) as stream:
+        for report in stream:
+            ...
+    stream.stats["time_to_first"]
+"""
+import json
+import time
+
+# Largest partial object held before the stream is considered broken
+MAX_BUFFER = 16 * 1024 * 1024
+
+
+class StreamDecodeError(ValueError):
+    """The stream held invalid JSON or an object larger than the buffer limit"""
+
+
+class JSONStreamDecoder(object):
+    """Decode JSON objects from bytes fed in arbitrary pieces"""
+
+    def __init__(self, max_buffer=MAX_BUFFER):
+        """:param max_buffer: bytes of an incomplete object tolerated, None for no limit"""
+        self.max_buffer = max_buffer
+        self._buffer = bytearray()
+        self._scanned = 0
+        self._decoder = json.JSONDecoder()
+
+        self.bytes = 0
+        self.objects = 0
+        self.peak_buffer = 0
+
+    def feed(self, data):
+        """Add data, return the objects it completed
+
+        :raises StreamDecodeError: invalid JSON or max_buffer exceeded
+        """
+        self._buffer += data
+        self.bytes += len(data)
+        self.peak_buffer = max(self.peak_buffer, len(self._buffer))
+
+        objects = []
+        # only lines completed by data are decoded, the rest is not rescanned
+        end = self._buffer.rfind(b"\n", self._scanned)
+        if end != -1:
+            objects = self._decode(self._buffer[: end + 1])
+            del self._buffer[: end + 1]
+        self._scanned = len(self._buffer)
+
+        if self.max_buffer is not None and len(self._buffer) > self.max_buffer:
+            raise StreamDecodeError(
+                f"incomplete JSON object exceeds {self.max_buffer} bytes"
+            )
+        return objects
+
+    def close(self):
+        """Return objects left without a trailing newline
+
+        :raises StreamDecodeError: the stream ended inside an object
+        """
+        data = self._buffer
+        self._buffer = bytearray()
+        self._scanned = 0
+        return self._decode(data)
+
+    def _decode(self, data):
+        try:
+            text = data.decode("utf-8")
+        except UnicodeDecodeError as e:
+            raise StreamDecodeError(str(e)) from e
+
+        objects = []
+        index, end = 0, len(text)
+        while True:
+            # skip the whitespace separating objects
+            while index < end and text[index] in " \t\r\n":
+                index += 1
+            if index == end:
+                break
+            try:
+                obj, index = self._decoder.raw_decode(text, index)
+            except json.JSONDecodeError as e:
+                raise StreamDecodeError(str(e)) from e
+            objects.append(obj)
+
+        self.objects += len(objects)
+        return objects
+
+
+class JSONStream(object):
+    """Iterate over the JSON objects of a requests response opened with stream=True"""
+
+    def __init__(self, response, max_buffer=MAX_BUFFER, chunk_size=None):
+        """
+        :param response: requests.Response, body not yet consumed
+        :param max_buffer: see JSONStreamDecoder
+        :param chunk_size: see Response.iter_content(), None yields data as it arrives
+        """
+        self.response = response
+        self.chunk_size = chunk_size
+        self.decoder = JSONStreamDecoder(max_buffer)
+
+        # seconds from sending the request to the first object
+        self.time_to_first = None
+        self.elapsed = None
+        self._opened = time.perf_counter()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        self.response.close()
+
+    def _since_request(self):
+        return (
+            self.response.elapsed.total_seconds() + time.perf_counter() - self._opened
+        )
+
+    def __iter__(self):
+        for chunk in self.response.iter_content(chunk_size=self.chunk_size):
+            for obj in self.decoder.feed(chunk):
+                if self.time_to_first is None:
+                    self.time_to_first = self._since_request()
+                yield obj
+
+        for obj in self.decoder.close():
+            if self.time_to_first is None:
+                self.time_to_first = self._since_request()
+            yield obj
+        self.elapsed = self._since_request()
+
+    @property
+    def stats(self):
+        """Objects and bytes read, peak buffer size and timings in seconds"""
+        return {
+            "objects": self.decoder.objects,
+            "bytes": self.decoder.bytes,
+            "peak_buffer": self.decoder.peak_buffer,
+            "time_to_first": self.time_to_first,
+            "elapsed": self.elapsed,
+        }
@@ -0,0 +1,176 @@
+"""Tar archives generated while they are sent
+
+/build and PUT /containers/{id}/archive take a tarball as request body.
+TarStream yields the archive in chunks as members are read, rather than
+writing it to memory or a file first, so a request may carry a build
+context of any size. requests sends an iterable body chunked.
+
+    stream = TarStream(directory_members("test/python/docker/build_labels"))
+    api.compat.post("/build", data=stream, headers={"Content-Type": "application/x-tar"})
+    stream.bytes, stream.members, stream.finished
+
+read_members() is the reverse, digesting the members of an archive read
+from a response as they arrive.
+"""
+import hashlib
+import io
+import os
+import tarfile
+import time
+
+BLOCK = tarfile.BLOCKSIZE
+# archives are padded to whole records as tar(1) and tarfile do
+RECORD = tarfile.RECORDSIZE
+
+# Bytes gathered before a chunk is yielded
+CHUNK = 1024 * 1024
+
+
+class TarStream(object):
+    """Iterable over the bytes of a tar archive of members"""
+
+    def __init__(self, members, chunk=CHUNK, format=tarfile.PAX_FORMAT):
+        """Initialize a stream of members
+
+        :param members: iterable of (TarInfo, content), content being None,
+            bytes, a binary file object or the path of a file opened when
+            its turn comes
+        :param chunk: most bytes per chunk yielded, small members are
+            gathered into one chunk, larger reads sliced without a copy
+        :param format: tarfile format of the headers, PAX keeps long names
+        """
+        self._members = members
+        self.chunk = chunk
+        self.format = format
+
+        self.bytes = 0
+        self.members = 0
+        self.started = None
+        # monotonic time the last chunk was consumed
+        self.finished = None
+
+    def __iter__(self):
+        self.started = time.monotonic()
+        pending = bytearray()
+        for info, content in self._members:
+            pending += info.tobuf(self.format, "utf-8", "surrogateescape")
+            self.members += 1
+            if info.isreg() and info.size:
+                for data in self._read(info, content):
+                    view = memoryview(data)
+                    while view:
+                        if not pending and len(view) >= self.chunk:
+                            # passed on without a copy
+                            yield self._count(view[: self.chunk])
+                            view = view[self.chunk :]
+                            continue
+                        room = self.chunk - len(pending)
+                        pending += view[:room]
+                        view = view[room:]
+                        if len(pending) >= self.chunk:
+                            yield self._count(pending)
+                            pending = bytearray()
+                pending += bytes(-info.size % BLOCK)
+            if len(pending) >= self.chunk:
+                yield self._count(pending)
+                pending = bytearray()
+
+        pending += bytes(2 * BLOCK)
+        pending += bytes(-(self.bytes + len(pending)) % RECORD)
+        yield self._count(pending)
+        self.finished = time.monotonic()
+
+    def _count(self, data):
+        self.bytes += len(data)
+        return data
+
+    def _read(self, info, content):
+        if isinstance(content, (bytes, bytearray, memoryview)):
+            if len(content) != info.size:
+                raise OSError(
+                    f"{info.name}: {len(content)} bytes, header says {info.size}"
+                )
+            yield content
+            return
+
+        f = open(content, "rb") if isinstance(content, (str, os.PathLike)) else content
+        try:
+            remaining = info.size
+            while remaining:
+                data = f.read(min(remaining, self.chunk))
+                if not data:
+                    raise OSError(f"{info.name}: unexpected end of data")
+                remaining -= len(data)
+                yield data
+        finally:
+            if f is not content:
+                f.close()
+
+
+def directory_members(path, arcname=""):
+    """Yield (TarInfo, content) of the tree below path, sorted by name
+
+    Hardlinks, symlinks and ownership are kept as tarfile.add() does,
+    regular files are opened when the stream reaches them.
+
+    :param arcname: directory of the members in the archive, "" for its root
+    """
+    # gettarinfo() needs an open TarFile, it tracks inodes for hardlinks
+    tar = tarfile.TarFile(fileobj=io.BytesIO(), mode="w")
+    for dirpath, dirnames, filenames in os.walk(path):
+        dirnames.sort()
+        relative = os.path.relpath(dirpath, path)
+        prefix = arcname if relative == "." else os.path.join(arcname, relative)
+        if relative != "." or arcname:
+            yield tar.gettarinfo(dirpath, prefix), None
+
+        for name in sorted(filenames):
+            source = os.path.join(dirpath, name)
+            info = tar.gettarinfo(source, os.path.join(prefix, name))
+            if info is None:
+                # sockets and other files tar cannot hold
+                continue
+            yield info, source if info.isreg() else None
+    tar.close()
+
+
+def read_members(f, chunk=CHUNK):
+    """Yield (TarInfo, digest) of the members of an archive read from f
+
+    The archive is read once front to back, f may be a response body.
+
+    :param f: binary file object, compressed archives are recognized
+    :return: iterator of TarInfo and the sha256 hex digest of regular
+        files, None for other members
+    """
+    with tarfile.open(fileobj=f, mode="r|*") as tar:
+        for info in tar:
+            digest = None
+            if info.isreg():
+                sha256 = hashlib.sha256()
+                data = tar.extractfile(info)
+                while True:
+                    block = data.read(chunk)
+                    if not block:
+                        break
+                    sha256.update(block)
+                digest = sha256.hexdigest()
+            yield info, digest
+
+
+def file_member(name, size, mode=0o644, mtime=0):
+    """Return the TarInfo of a regular file, for generated members"""
+    info = tarfile.TarInfo(name)
+    info.size = size
+    info.mode = mode
+    info.mtime = mtime
+    return info
+
+
+def dir_member(name, mode=0o755, mtime=0):
+    """Return the TarInfo of a directory, for generated members"""
+    info = tarfile.TarInfo(name)
+    info.type = tarfile.DIRTYPE
+    info.mode = mode
+    info.mtime = mtime
+    return info
@@ -0,0 +1,217 @@
+"""Container stats telemetry held in fixed size ring buffers
+
+StatsCollector reads one streaming /containers/stats subscription for
+any number of containers. Samples are stored per container in
+array-backed ring buffers rather than as decoded JSON, so memory stays
+constant however long the collector runs:
+
+    collector = StatsCollector(session.api, capacity=120)
+    collector.start(ids)
+    ...
+    collector.stop()
+    collector.aggregates()[ids[0]]["cpu"]["p95"]
+"""
+import array
+import threading
+import time
+
+from .metrics import percentile
+from .waiter import _shutdown
+
+# name: (key in the libpod stats report, array typecode, counter)
+FIELDS = {
+    "cpu": ("CPU", "d", False),
+    "cpu_nano": ("CPUNano", "Q", True),
+    "mem_usage": ("MemUsage", "Q", False),
+    "mem_perc": ("MemPerc", "d", False),
+    "net_input": ("NetInput", "Q", True),
+    "net_output": ("NetOutput", "Q", True),
+    "block_input": ("BlockInput", "Q", True),
+    "block_output": ("BlockOutput", "Q", True),
+    "pids": ("PIDs", "Q", False),
+}
+
+
+class RingBuffer(object):
+    """Series of the last capacity numbers, stored in an array.array"""
+
+    def __init__(self, capacity, typecode="d"):
+        if capacity < 1:
+            raise ValueError("capacity must be positive")
+        self.capacity = capacity
+        self._data = array.array(typecode, [0]) * capacity
+        self._next = 0
+        self._count = 0
+
+    def __len__(self):
+        return self._count
+
+    @property
+    def nbytes(self):
+        return self._data.itemsize * self.capacity
+
+    def append(self, value):
+        self._data[self._next] = value
+        self._next = (self._next + 1) % self.capacity
+        self._count = min(self._count + 1, self.capacity)
+
+    def values(self):
+        """Return the values held, oldest first"""
+        if self._count < self.capacity:
+            return self._data[: self._count].tolist()
+        return (self._data[self._next :] + self._data[: self._next]).tolist()
+
+    def first(self):
+        if not self._count:
+            return None
+        return self._data[(self._next - self._count) % self.capacity]
+
+    def last(self):
+        if not self._count:
+            return None
+        return self._data[self._next - 1]
+
+    def max(self):
+        return max(self.values()) if self._count else None
+
+    def mean(self):
+        return sum(self.values()) / self._count if self._count else None
+
+    def percentile(self, pct):
+        """Return the pct percentile using the nearest-rank method"""
+        return percentile(sorted(self.values()), pct)
+
+
+class ContainerSeries(object):
+    """Ring buffers of every stats field of one container, plus sample times"""
+
+    def __init__(self, capacity):
+        self.times = RingBuffer(capacity, "d")
+        self.fields = {
+            name: RingBuffer(capacity, typecode)
+            for name, (_, typecode, _) in FIELDS.items()
+        }
+
+    def __len__(self):
+        return len(self.times)
+
+    @property
+    def nbytes(self):
+        return self.times.nbytes + sum(b.nbytes for b in self.fields.values())
+
+    def add(self, timestamp, stats):
+        """Record one libpod stats report of this container"""
+        self.times.append(timestamp)
+        for name, (key, typecode, _) in FIELDS.items():
+            value = stats.get(key) or 0
+            # counters are unsigned, a restarted container may report garbage
+            self.fields[name].append(max(0, value) if typecode == "Q" else value)
+
+    def rate(self, name):
+        """Return the per second increase of a counter over the buffered window"""
+        elapsed = (self.times.last() or 0) - (self.times.first() or 0)
+        if len(self) < 2 or elapsed <= 0:
+            return None
+        buffer = self.fields[name]
+        return (buffer.last() - buffer.first()) / elapsed
+
+    def aggregates(self):
+        """Return rate for counters and mean, p95 and max for gauges"""
+        report = {"samples": len(self)}
+        for name, (_, _, counter) in FIELDS.items():
+            buffer = self.fields[name]
+            if counter:
+                report[name] = {"rate": self.rate(name), "last": buffer.last()}
+            else:
+                report[name] = {
+                    "mean": buffer.mean(),
+                    "p95": buffer.percentile(95),
+                    "max": buffer.max(),
+                }
+        return report
+
+
+class StatsCollector(object):
+    """Collect streaming stats of many containers over one connection"""
+
+    def __init__(self, api, capacity=300):
+        """
+        :param api: LibpodClient on the service
+        :param capacity: samples kept per container, about one per second
+        """
+        self.api = api
+        self.capacity = capacity
+        self.series = {}
+        self.errors = []
+        self.stream = None
+        # bytes of JSON read from the stats stream
+        self.bytes_received = 0
+
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stopping = threading.Event()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def start(self, ids=None):
+        """Subscribe to stats of the given containers, all running ones by default"""
+        params = {"stream": "true"}
+        if ids:
+            params["containers"] = list(ids)
+        self.stream = self.api.stream_json("GET", "/containers/stats", params=params)
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._collect, daemon=True)
+        self._thread.start()
+        return self
+
+    def _collect(self):
+        try:
+            for report in self.stream:
+                if self._stopping.is_set():
+                    break
+                self.record(report)
+        except Exception as e:
+            # stop() closes the stream if no report arrives in time
+            if not self._stopping.is_set():
+                self.errors.append(str(e))
+
+    def record(self, report, timestamp=None):
+        """Add one report of the libpod stats stream"""
+        timestamp = time.monotonic() if timestamp is None else timestamp
+        if report.get("Error"):
+            self.errors.append(str(report["Error"]))
+        with self._lock:
+            for stats in report.get("Stats") or []:
+                series = self.series.get(stats["ContainerID"])
+                if series is None:
+                    series = ContainerSeries(self.capacity)
+                    self.series[stats["ContainerID"]] = series
+                series.add(timestamp, stats)
+
+    def stop(self):
+        """End the subscription, collected series are kept"""
+        if self.stream is None:
+            return
+        self._stopping.set()
+        # closing the socket from this thread does not wake a recv()
+        # blocked on it in the reader, shutting it down does
+        _shutdown(self.stream.response)
+        self.stream.close()
+        self._thread.join(timeout=2.5)
+        self.bytes_received += self.stream.stats["bytes"]
+        self.stream = None
+
+    @property
+    def nbytes(self):
+        """Bytes held by all ring buffers"""
+        with self._lock:
+            return sum(s.nbytes for s in self.series.values())
+
+    def aggregates(self):
+        """Return ContainerSeries.aggregates() keyed by container id"""
+        with self._lock:
+            return {id: s.aggregates() for id, s in self.series.items()}
@@ -0,0 +1,219 @@
+import asyncio
+import json
+import os
+import tempfile
+import unittest
+
+from test.python.harness.aio import APIError, AsyncLibpodClient, bounded_gather
+from test.python.harness.transport import unix_url
+
+
+class FakeService(object):
+    """Minimal HTTP/1.1 server answering like the libpod API"""
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.connections = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.requests = []
+        self.server = None
+
+    async def start_tcp(self):
+        self.server = await asyncio.start_server(self.handle, "127.0.0.1", 0)
+        port = self.server.sockets[0].getsockname()[1]
+        return f"http://127.0.0.1:{port}"
+
+    async def start_unix(self, path):
+        self.server = await asyncio.start_unix_server(self.handle, path)
+        return unix_url(path)
+
+    async def stop(self):
+        self.server.close()
+        await self.server.wait_closed()
+
+    async def handle(self, reader, writer):
+        self.connections += 1
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    return
+                method, target, _ = line.decode().split(" ", 2)
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line == b"\r\n":
+                        break
+                    name, _, value = line.decode().partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get("content-length", 0)))
+                self.requests.append((method, target, body))
+
+                self.in_flight += 1
+                self.max_in_flight = max(self.max_in_flight, self.in_flight)
+                await asyncio.sleep(self.delay)
+                self.in_flight -= 1
+
+                await self.respond(writer, method, target, body)
+        finally:
+            writer.close()
+
+    async def respond(self, writer, method, target, body):
+        path = target.split("?", 1)[0]
+        if path == "/_ping":
+            self.write(writer, 200, b"OK")
+        elif path.endswith("/containers/create"):
+            name = json.loads(body)["name"]
+            self.write(writer, 201, json.dumps({"Id": name, "Warnings": []}).encode())
+        elif path.endswith("/start"):
+            self.write(writer, 204, b"")
+        elif path.endswith("/wait"):
+            self.write(writer, 200, b"0\n")
+        elif path.endswith("/events"):
+            writer.write(
+                b"HTTP/1.1 200 OK\r\nTransfer-Encoding: chunked\r\n"
+                b"Content-Type: application/json\r\n\r\n"
+            )
+            for i in range(3):
+                event = json.dumps({"Action": "start", "id": str(i)}).encode() + b"\n"
+                # split objects across chunks the way a flushing encoder may
+                for part in (event[:5], event[5:]):
+                    writer.write(b"%x\r\n%s\r\n" % (len(part), part))
+                    await writer.drain()
+            writer.write(b"0\r\n\r\n")
+        else:
+            self.write(writer, 404, b'{"cause": "no such container"}')
+        await writer.drain()
+
+    @staticmethod
+    def write(writer, status, body):
+        head = f"HTTP/1.1 {status} X\r\n"
+        if status != 204:
+            head += f"Content-Length: {len(body)}\r\n"
+        writer.write(head.encode() + b"\r\n" + body)
+
+
+class TestAsyncLibpodClient(unittest.TestCase):
+    def run_async(self, coro):
+        return asyncio.run(asyncio.wait_for(coro, 10))
+
+    def test_keep_alive(self):
+        async def scenario():
+            service = FakeService()
+            url = await service.start_tcp()
+            async with AsyncLibpodClient(url) as client:
+                for _ in range(5):
+                    self.assertEqual(await client.ping(), "OK")
+                await client.start_container("ctnr")
+                self.assertEqual(await client.wait_container("ctnr"), 0)
+            await service.stop()
+            return service
+
+        service = self.run_async(scenario())
+        self.assertEqual(service.connections, 1)
+        self.assertEqual(service.requests[0][1], "/_ping")
+        self.assertEqual(service.requests[-1][1], "/v2.0.0/libpod/containers/ctnr/wait")
+
+    def test_unix_socket(self):
+        async def scenario(path):
+            service = FakeService()
+            url = await service.start_unix(path)
+            async with AsyncLibpodClient(url) as client:
+                result = await client.create_container({"name": "ctnr"})
+            await service.stop()
+            return result
+
+        with tempfile.TemporaryDirectory() as tmp:
+            result = self.run_async(scenario(os.path.join(tmp, "podman.sock")))
+        self.assertEqual(result, "ctnr")
+
+    def test_error(self):
+        async def scenario():
+            service = FakeService()
+            url = await service.start_tcp()
+            try:
+                async with AsyncLibpodClient(url) as client:
+                    await client.inspect_container("missing")
+            finally:
+                await service.stop()
+
+        with self.assertRaises(APIError) as e:
+            self.run_async(scenario())
+        self.assertEqual(e.exception.status, 404)
+
+    def test_timeout_closes_connection(self):
+        async def scenario():
+            service = FakeService(delay=1.0)
+            url = await service.start_tcp()
+            try:
+                async with AsyncLibpodClient(url, timeout=0.1) as client:
+                    opened = []
+                    connect = client._connect
+
+                    async def record():
+                        opened.append(await connect())
+                        return opened[-1]
+
+                    client._connect = record
+                    with self.assertRaises(asyncio.TimeoutError):
+                        await client.ping()
+                    # the connection waiting for the answer is closed, not pooled
+                    self.assertTrue(opened[0].closed)
+                    self.assertEqual(len(client._idle), 0)
+                    client.timeout = None
+                    service.delay = 0.0
+                    self.assertEqual(await client.ping(), "OK")
+            finally:
+                await service.stop()
+            return service
+
+        service = self.run_async(scenario())
+        self.assertEqual(service.connections, 2)
+
+    def test_events_stream(self):
+        async def scenario():
+            service = FakeService()
+            url = await service.start_tcp()
+            async with AsyncLibpodClient(url) as client:
+                events = [
+                    e async for e in client.events(filters={"type": ["container"]})
+                ]
+            await service.stop()
+            return events
+
+        events = self.run_async(scenario())
+        self.assertEqual([e["id"] for e in events], ["0", "1", "2"])
+
+    def test_gather_start_limit(self):
+        async def scenario():
+            service = FakeService(delay=0.01)
+            url = await service.start_tcp()
+            async with AsyncLibpodClient(url) as client:
+                ids = await client.gather_create(
+                    [{"name": f"ctnr{i}"} for i in range(40)], limit=8
+                )
+                await client.gather_start(ids, limit=4)
+            await service.stop()
+            return ids, service
+
+        ids, service = self.run_async(scenario())
+        self.assertEqual(ids, [f"ctnr{i}" for i in range(40)])
+        self.assertEqual(service.max_in_flight, 8)
+        self.assertLessEqual(service.connections, 8)
+
+    def test_bounded_gather_exceptions(self):
+        async def fail_odd(i):
+            if i % 2:
+                raise ValueError(i)
+            return i
+
+        results = self.run_async(
+            bounded_gather(fail_odd, range(4), limit=2, return_exceptions=True)
+        )
+        self.assertEqual(results[0], 0)
+        self.assertIsInstance(results[1], ValueError)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,62 @@
+import threading
+import time
+import unittest
+
+from test.python.harness.cleanup import Cleanup
+
+
+class TestCleanup(unittest.TestCase):
+    def test_bounded_concurrency(self):
+        lock = threading.Lock()
+        state = {"running": 0, "peak": 0}
+        removed = []
+
+        def remove(item):
+            with lock:
+                state["running"] += 1
+                state["peak"] = max(state["peak"], state["running"])
+            time.sleep(0.02)
+            with lock:
+                state["running"] -= 1
+                removed.append(item)
+
+        cleanup = Cleanup(workers=4)
+        started = time.perf_counter()
+        self.assertEqual(cleanup.remove("containers", remove, range(20)), 20)
+
+        self.assertEqual(sorted(removed), list(range(20)))
+        self.assertEqual(state["peak"], 4)
+        # five rounds of four rather than twenty serial removals
+        self.assertLess(time.perf_counter() - started, 20 * 0.02)
+        self.assertEqual(cleanup.report["containers"]["removed"], 20)
+
+    def test_failures(self):
+        attempted = []
+
+        def remove(item):
+            attempted.append(item)
+            if item == 3:
+                raise RuntimeError("image is in use")
+
+        cleanup = Cleanup(workers=2)
+        with self.assertRaisesRegex(RuntimeError, "in use"):
+            cleanup.remove("images", remove, range(6))
+        self.assertEqual(sorted(attempted), list(range(6)))
+        self.assertEqual(cleanup.report["images"]["removed"], 5)
+
+    def test_report(self):
+        cleanup = Cleanup(workers=1)
+        cleanup.prune("volumes", lambda: 3)
+        cleanup.prune("volumes", lambda: None)
+        cleanup.remove("volumes", lambda item: None, ["a", "b"])
+        cleanup.remove("networks", lambda item: None, [])
+
+        self.assertEqual(cleanup.report["volumes"]["pruned"], 3)
+        self.assertEqual(cleanup.report["volumes"]["removed"], 2)
+        self.assertEqual(cleanup.report["networks"]["removed"], 0)
+        self.assertGreaterEqual(cleanup.seconds, 0)
+        self.assertTrue(cleanup.summary().startswith("volumes 5 in "))
+
+
+if __name__ == "__main__":
+    unittest.main()
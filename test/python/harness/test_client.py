@@ -0,0 +1,99 @@
+import hashlib
+import http.server
+import io
+import os
+import tempfile
+import threading
+import unittest
+
+import requests
+
+from test.python.harness.client import LIBPOD_PREFIX, LibpodClient
+
+_TARBALL = os.urandom(5 * 1024 * 1024 + 3)
+
+
+class _Handler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        if self.path == f"{LIBPOD_PREFIX}/images/missing/get?format=docker-archive":
+            body = b'{"cause": "image not known"}'
+            self.send_response(404)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+
+        # streamed as the service does, without a Content-Length
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-tar")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for offset in range(0, len(_TARBALL), 1000003):
+            chunk = _TARBALL[offset : offset + 1000003]
+            self.wfile.write(b"%x\r\n%s\r\n" % (len(chunk), chunk))
+        self.wfile.write(b"0\r\n\r\n")
+
+    def do_POST(self):
+        self.server.chunked = self.headers.get("Transfer-Encoding") == "chunked"
+        sha256 = hashlib.sha256()
+        while True:
+            size = int(self.rfile.readline().split(b";")[0], 16)
+            if size == 0:
+                self.rfile.readline()
+                break
+            sha256.update(self.rfile.read(size))
+            self.rfile.readline()
+        body = sha256.hexdigest().encode()
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class TestTransfer(unittest.TestCase):
+    def setUp(self):
+        super().setUp()
+        self.server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.client = LibpodClient(f"http://127.0.0.1:{self.server.server_port}")
+        self.directory = tempfile.TemporaryDirectory(prefix="podman_client_")
+
+    def tearDown(self):
+        self.client.close()
+        self.server.shutdown()
+        self.server.server_close()
+        self.directory.cleanup()
+        super().tearDown()
+
+    def test_save_image(self):
+        f = io.BytesIO()
+        written = self.client.save_image("alpine", f, chunk=64 * 1024)
+        self.assertEqual(written, len(_TARBALL))
+        self.assertEqual(f.getvalue(), _TARBALL)
+
+        with self.assertRaises(requests.HTTPError):
+            self.client.save_image("missing", io.BytesIO())
+
+    def test_load_image(self):
+        path = os.path.join(self.directory.name, "image.tar")
+        with open(path, "wb") as f:
+            f.write(_TARBALL)
+
+        r = self.client.load_image(path, chunk=1024 * 1024)
+        self.assertEqual(r.status_code, 200)
+        self.assertTrue(self.server.chunked)
+        self.assertEqual(r.text, hashlib.sha256(_TARBALL).hexdigest())
+
+        # the connection is kept alive across transfers
+        f = io.BytesIO()
+        self.client.save_image("alpine", f)
+        self.assertEqual(f.getvalue(), _TARBALL)
+
+
+if __name__ == "__main__":
+    unittest.main()
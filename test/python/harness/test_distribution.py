@@ -0,0 +1,229 @@
+import hashlib
+import io
+import json
+import os
+import tarfile
+import tempfile
+import unittest
+
+import requests
+
+from test.python.docker.compat import constant
+from test.python.harness.distribution import MANIFEST, Registry, repository_name
+from test.python.harness.podman import mirrored_registries
+
+
+def digest(data):
+    return "sha256:" + hashlib.sha256(data).hexdigest()
+
+
+def layer(files):
+    buf = io.BytesIO()
+    with tarfile.open(fileobj=buf, mode="w") as tar:
+        for name, content in files.items():
+            info = tarfile.TarInfo(name)
+            info.size = len(content)
+            tar.addfile(info, io.BytesIO(content))
+    return buf.getvalue()
+
+
+def docker_archive(path, repo_tags, layers):
+    """Write a tarball laid out as `podman save --format docker-archive` does"""
+    config = json.dumps(
+        {
+            "architecture": "amd64",
+            "os": "linux",
+            "rootfs": {"type": "layers", "diff_ids": [digest(l) for l in layers]},
+        }
+    ).encode()
+    members = {f"{digest(config)[7:]}.json": config}
+    for data in layers:
+        members[f"{digest(data)[7:]}.tar"] = data
+    manifest = [
+        {
+            "Config": f"{digest(config)[7:]}.json",
+            "RepoTags": repo_tags,
+            "Layers": [f"{digest(l)[7:]}.tar" for l in layers],
+        }
+    ]
+    members["manifest.json"] = json.dumps(manifest).encode()
+    with tarfile.open(path, "w") as tar:
+        for name, content in members.items():
+            info = tarfile.TarInfo(name)
+            info.size = len(content)
+            tar.addfile(info, io.BytesIO(content))
+
+
+class TestRegistry(unittest.TestCase):
+    def setUp(self):
+        super().setUp()
+        self.registry = Registry().start()
+        self.url = self.registry.url
+        self.layers = [layer({"etc/os-release": b"ID=test\n"}), layer({"bin/sh": b"x"})]
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "image.tar")
+            docker_archive(
+                path,
+                ["quay.io/libpod/alpine:latest", "docker.io/library/alpine:3.12"],
+                self.layers,
+            )
+            self.assertEqual(
+                self.registry.add_archive(path), ["libpod/alpine", "library/alpine"]
+            )
+
+    def tearDown(self):
+        directory = self.registry.directory
+        self.registry.close()
+        self.assertFalse(os.path.exists(directory))
+        super().tearDown()
+
+    def test_repository_name(self):
+        self.assertEqual(
+            repository_name("quay.io/libpod/alpine:latest"), "libpod/alpine"
+        )
+        self.assertEqual(repository_name("library/alpine"), "library/alpine")
+        self.assertEqual(repository_name("localhost:5000/busybox:1"), "busybox")
+
+    def test_mirrored_registries(self):
+        registries = mirrored_registries()
+        # the pod infra image is not pulled from the network either
+        self.assertIn(constant.infra.split("/", 1)[0], registries)
+        self.assertEqual(repository_name(constant.infra), "pause")
+        for registry in ("quay.io", "docker.io"):
+            self.assertIn(registry, registries)
+
+    def test_pull(self):
+        r = requests.get(f"{self.url}/v2/")
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual(r.headers["Docker-Distribution-API-Version"], "registry/2.0")
+
+        r = requests.get(f"{self.url}/v2/libpod/alpine/manifests/latest")
+        self.assertEqual(r.status_code, 200, r.text)
+        self.assertEqual(r.headers["Content-Type"], MANIFEST)
+        self.assertEqual(r.headers["Docker-Content-Digest"], digest(r.content))
+        manifest = r.json()
+
+        by_digest = requests.head(
+            f"{self.url}/v2/libpod/alpine/manifests/{digest(r.content)}"
+        )
+        self.assertEqual(by_digest.status_code, 200)
+
+        for descriptor, data in zip(manifest["layers"], self.layers):
+            r = requests.get(
+                f"{self.url}/v2/libpod/alpine/blobs/{descriptor['digest']}"
+            )
+            self.assertEqual(r.content, data)
+        config = requests.get(
+            f"{self.url}/v2/libpod/alpine/blobs/{manifest['config']['digest']}"
+        ).json()
+        self.assertEqual(config["rootfs"]["diff_ids"], [digest(l) for l in self.layers])
+        self.assertEqual(
+            self.registry.bytes_sent,
+            sum(map(len, self.layers)) + manifest["config"]["size"],
+        )
+
+        r = requests.get(f"{self.url}/v2/library/alpine/tags/list")
+        self.assertEqual(r.json(), {"name": "library/alpine", "tags": ["3.12"]})
+
+        r = requests.get(f"{self.url}/v2/libpod/alpine/manifests/missing")
+        self.assertEqual(r.status_code, 404)
+        self.assertEqual(r.json()["errors"][0]["code"], "MANIFEST_UNKNOWN")
+        r = requests.get(f"{self.url}/v2/libpod/alpine/blobs/{digest(b'')}")
+        self.assertEqual(r.status_code, 404)
+
+    def test_push_chunked(self):
+        data = os.urandom(3 * 1024 * 1024 + 17)
+        r = requests.post(f"{self.url}/v2/test/pushed/blobs/uploads/")
+        self.assertEqual(r.status_code, 202, r.text)
+        location = r.headers["Location"]
+
+        def chunks():
+            for offset in range(0, len(data), 1024 * 1024):
+                yield data[offset : offset + 1024 * 1024]
+
+        # a generator is sent with Transfer-Encoding: chunked, as podman does
+        r = requests.patch(self.url + location, data=chunks())
+        self.assertEqual(r.status_code, 202, r.text)
+        self.assertEqual(r.headers["Range"], f"0-{len(data) - 1}")
+
+        r = requests.put(self.url + location, params={"digest": digest(b"wrong")})
+        self.assertEqual(r.status_code, 400)
+        self.assertEqual(r.json()["errors"][0]["code"], "DIGEST_INVALID")
+
+        r = requests.post(f"{self.url}/v2/test/pushed/blobs/uploads/")
+        location = r.headers["Location"]
+        requests.patch(self.url + location, data=data[:100])
+        r = requests.put(
+            self.url + location, params={"digest": digest(data)}, data=data[100:]
+        )
+        self.assertEqual(r.status_code, 201, r.text)
+        self.assertEqual(r.headers["Docker-Content-Digest"], digest(data))
+        self.assertEqual(self.registry.bytes_received, 2 * len(data))
+
+        # monolithic upload and cross repository mount
+        config = b'{"os": "linux"}'
+        r = requests.post(
+            f"{self.url}/v2/test/pushed/blobs/uploads/",
+            params={"digest": digest(config)},
+            data=config,
+        )
+        self.assertEqual(r.status_code, 201, r.text)
+        r = requests.post(
+            f"{self.url}/v2/test/other/blobs/uploads/",
+            params={"mount": digest(data), "from": "test/pushed"},
+        )
+        self.assertEqual(r.status_code, 201)
+
+        manifest = {
+            "schemaVersion": 2,
+            "mediaType": MANIFEST,
+            "config": {"mediaType": "x", "size": len(config), "digest": digest(config)},
+            "layers": [{"mediaType": "x", "size": len(data), "digest": digest(data)}],
+        }
+        body = json.dumps(manifest).encode()
+        r = requests.put(
+            f"{self.url}/v2/test/pushed/manifests/v1",
+            data=body,
+            headers={"Content-Type": MANIFEST},
+        )
+        self.assertEqual(r.status_code, 201, r.text)
+        self.assertEqual(r.headers["Docker-Content-Digest"], digest(body))
+
+        manifest["layers"][0]["digest"] = digest(b"missing")
+        r = requests.put(
+            f"{self.url}/v2/test/pushed/manifests/v2",
+            data=json.dumps(manifest),
+            headers={"Content-Type": MANIFEST},
+        )
+        self.assertEqual(r.status_code, 400)
+        self.assertEqual(r.json()["errors"][0]["code"], "MANIFEST_BLOB_UNKNOWN")
+
+        r = requests.delete(f"{self.url}/v2/test/pushed/manifests/{digest(body)}")
+        self.assertEqual(r.status_code, 202)
+        r = requests.get(f"{self.url}/v2/test/pushed/manifests/v1")
+        self.assertEqual(r.status_code, 404)
+
+    def test_catalog_and_search(self):
+        self.registry.add_short_names()
+
+        r = requests.get(f"{self.url}/v2/_catalog", params={"n": 2})
+        self.assertEqual(r.json(), {"repositories": ["alpine", "libpod/alpine"]})
+        self.assertIn("last=libpod/alpine", r.headers["Link"])
+        r = requests.get(
+            f"{self.url}/v2/_catalog", params={"n": 2, "last": "libpod/alpine"}
+        )
+        self.assertEqual(r.json(), {"repositories": ["library/alpine"]})
+
+        r = requests.get(f"{self.url}/v1/search", params={"q": "alpine", "n": 25})
+        results = r.json()["results"]
+        self.assertEqual(
+            [(o["name"], o["is_official"]) for o in results],
+            [("alpine", True), ("libpod/alpine", False)],
+        )
+        r = requests.get(f"{self.url}/v1/search", params={"q": "bogus"})
+        self.assertEqual(r.json()["results"], [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,89 @@
+import unittest
+
+from test.python.harness.cleanup import Cleanup
+from test.python.harness.fixtures import FixtureRegistry
+
+
+class Response(object):
+    def __init__(self, status_code):
+        self.status_code = status_code
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise RuntimeError(self.status_code)
+
+
+class RecordingClient(object):
+    def __init__(self, missing=()):
+        self.deleted = []
+        self.missing = set(missing)
+
+    def delete(self, path, **kwargs):
+        self.deleted.append(path)
+        return Response(404 if path in self.missing else 204)
+
+
+class TestFixtureRegistry(unittest.TestCase):
+    def setUp(self):
+        super().setUp()
+        self.fixtures = FixtureRegistry()
+        self.fixtures.add("container", "c1", name="top", labels={"app": "a"})
+        self.fixtures.add("container", "c2", labels={"app": "a"})
+        self.fixtures.add("pod", "p1", name="pod1")
+        self.fixtures.add("volume", "v1", name="data")
+
+    def test_lookup(self):
+        self.assertEqual(len(self.fixtures), 4)
+        self.assertIn("c2", self.fixtures)
+        self.assertEqual(self.fixtures.latest("container").id, "c2")
+        self.assertEqual(self.fixtures.get("container", "top").id, "c1")
+        self.assertEqual(self.fixtures.get("container", "c2").id, "c2")
+        self.assertEqual(
+            [f.id for f in self.fixtures.by_label("container", "app", "a")],
+            ["c1", "c2"],
+        )
+        with self.assertRaises(KeyError):
+            self.fixtures.get("pod", "top")
+        with self.assertRaises(LookupError):
+            self.fixtures.latest("image")
+
+    def test_discard(self):
+        self.fixtures.discard("container", "c2")
+        self.fixtures.discard("container", "unknown")
+        self.assertEqual(self.fixtures.latest("container").id, "c1")
+        self.assertEqual(len(self.fixtures.by_label("container", "app", "a")), 1)
+
+    def test_replace(self):
+        self.fixtures.add("container", "c1", name="renamed")
+        self.assertEqual(self.fixtures.latest("container").id, "c1")
+        self.assertEqual(self.fixtures.get("container", "renamed").id, "c1")
+        with self.assertRaises(KeyError):
+            self.fixtures.get("container", "top")
+
+    def test_remove_all(self):
+        api = RecordingClient(missing={"/containers/c1"})
+        cleanup = Cleanup(workers=1)
+        self.fixtures.remove_all(api, cleanup)
+
+        # pods before their containers, volumes by name
+        self.assertEqual(
+            api.deleted,
+            ["/pods/p1", "/containers/c1", "/containers/c2", "/volumes/data"],
+        )
+        self.assertEqual(cleanup.report["containers"]["removed"], 2)
+        self.assertEqual(len(self.fixtures), 0)
+
+    def test_remove_all_keep(self):
+        # docker-py reports image ids with their algorithm, libpod without
+        self.fixtures.add("image", "sha256:" + "b" * 64, name="busybox")
+        self.fixtures.add("image", "a" * 64, name="alpine")
+        api = RecordingClient()
+        self.fixtures.remove_all(api, Cleanup(workers=1), keep=["sha256:" + "a" * 64])
+
+        self.assertIn("/images/" + "b" * 64, api.deleted)
+        self.assertNotIn("/images/" + "a" * 64, api.deleted)
+        self.assertEqual(len(self.fixtures), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
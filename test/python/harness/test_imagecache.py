@@ -0,0 +1,129 @@
+import json
+import os
+import tempfile
+import unittest
+
+from test.python.harness.imagecache import ImageCache
+
+
+class FakeResponse(object):
+    def __init__(self, status_code, body=None):
+        self.status_code = status_code
+        self.body = body
+        self.text = json.dumps(body)
+
+    def json(self):
+        return self.body
+
+
+class FakeApi(object):
+    """Service loading every tarball under the name it was first saved with"""
+
+    def __init__(self, names):
+        self.names = names
+        self.tagged = []
+
+    def load_image(self, path):
+        return FakeResponse(200, {"Names": self.names})
+
+    def post(self, path, params=None):
+        self.tagged.append((path, params))
+        return FakeResponse(201)
+
+
+def writer(size):
+    def write(f):
+        f.write(b"\0" * size)
+
+    return write
+
+
+class TestImageCache(unittest.TestCase):
+    def setUp(self):
+        super().setUp()
+        self.directory = tempfile.TemporaryDirectory(prefix="podman_imagecache_")
+        self.cache = ImageCache(self.directory.name, budget=1000)
+
+    def tearDown(self):
+        self.directory.cleanup()
+        return super().tearDown()
+
+    def test_add_lookup(self):
+        self.assertIsNone(self.cache.lookup("quay.io/libpod/alpine:latest"))
+
+        path = self.cache.add("quay.io/libpod/alpine:latest", "sha256:aaa", writer(10))
+        self.assertEqual(self.cache.lookup("quay.io/libpod/alpine:latest"), path)
+        self.assertEqual(os.path.getsize(path), 10)
+
+        # a second reference to the same digest shares the tarball
+        self.assertEqual(
+            self.cache.add("alpine:latest", "sha256:aaa", writer(10)), path
+        )
+        self.assertEqual(len(self.cache.entries()), 1)
+
+        with open(os.path.join(self.directory.name, "index.json")) as f:
+            index = json.load(f)
+        self.assertEqual(
+            index["entries"]["sha256:aaa"]["references"],
+            ["quay.io/libpod/alpine:latest", "alpine:latest"],
+        )
+
+    def test_lru_eviction(self):
+        self.cache.add("a", "sha256:a", writer(400))
+        self.cache.add("b", "sha256:b", writer(400))
+        # using a makes b the least recently used
+        self.assertIsNotNone(self.cache.lookup("a"))
+        self.cache.add("c", "sha256:c", writer(400))
+
+        self.assertIsNotNone(self.cache.lookup("a"))
+        self.assertIsNone(self.cache.lookup("b"))
+        self.assertIsNotNone(self.cache.lookup("c"))
+        self.assertEqual(self.cache.size(), 800)
+
+    def test_oversized_entry_is_kept(self):
+        self.cache.add("a", "sha256:a", writer(400))
+        self.cache.add("big", "sha256:big", writer(2000))
+
+        self.assertIsNone(self.cache.lookup("a"))
+        self.assertIsNotNone(self.cache.lookup("big"))
+
+    def test_failed_write(self):
+        def fail(f):
+            f.write(b"partial")
+            raise IOError("connection reset")
+
+        with self.assertRaises(IOError):
+            self.cache.add("a", "sha256:a", fail)
+        self.assertIsNone(self.cache.lookup("a"))
+        self.assertEqual(os.listdir(self.cache.blobs), [])
+
+    def test_restore_tags_reference(self):
+        self.cache.add("quay.io/libpod/alpine:latest", "sha256:aaa", writer(10))
+        self.cache.add("docker.io/library/alpine:latest", "sha256:aaa", writer(10))
+
+        api = FakeApi(["quay.io/libpod/alpine:latest"])
+        self.assertTrue(self.cache.restore(api, "docker.io/library/alpine:latest"))
+        self.assertEqual(
+            api.tagged,
+            [
+                (
+                    "/images/quay.io/libpod/alpine:latest/tag",
+                    {"repo": "docker.io/library/alpine", "tag": "latest"},
+                )
+            ],
+        )
+
+        # the name in the tarball needs no tag
+        api.tagged = []
+        self.assertTrue(self.cache.restore(api, "quay.io/libpod/alpine:latest"))
+        self.assertEqual(api.tagged, [])
+
+    def test_clear(self):
+        path = self.cache.add("a", "sha256:a", writer(10))
+        self.cache.clear()
+        self.assertFalse(os.path.exists(path))
+        self.assertEqual(self.cache.entries(), {})
+
+
+if __name__ == "__main__":
+    unittest.main()
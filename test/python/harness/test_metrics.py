@@ -0,0 +1,166 @@
+import csv
+import http.server
+import json
+import os
+import tempfile
+import threading
+import unittest
+
+from test.python.harness import metrics
+from test.python.harness.client import LibpodClient
+from test.python.harness.metrics import Recorder, compare, normalize_route
+
+ID = "f" * 64
+
+
+class Handler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def reply(self, status):
+        length = int(self.headers.get("Content-Length") or 0)
+        self.rfile.read(length)
+        body = b'{"Id": "%s"}' % ID.encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        self.reply(404 if "missing" in self.path else 200)
+
+    def do_POST(self):
+        self.reply(201)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestNormalizeRoute(unittest.TestCase):
+    def test_members(self):
+        for path, route in (
+            (f"/v1.40/containers/{ID}/start", "/containers/{id}/start"),
+            (
+                f"/v2.0.0/libpod/containers/{ID}/json?size=true",
+                "/libpod/containers/{id}/json",
+            ),
+            ("/v1.40/containers/create?name=top", "/containers/create"),
+            ("/v1.40/containers/json?all=true", "/containers/json"),
+            ("/v2.0.0/libpod/pods/pod1", "/libpod/pods/{id}"),
+            (f"/v1.40/exec/{ID}/start", "/exec/{id}/start"),
+            ("/v1.40/volumes/data", "/volumes/{name}"),
+            ("/v1.40/volumes/prune", "/volumes/prune"),
+            ("/v1.40/networks/podman/connect", "/networks/{name}/connect"),
+            ("/_ping", "/_ping"),
+            ("/v1.40/info", "/info"),
+        ):
+            self.assertEqual(normalize_route(path), route, path)
+
+    def test_images(self):
+        for path, route in (
+            ("/v1.40/images/json", "/images/json"),
+            ("/v1.40/images/create?fromImage=alpine", "/images/create"),
+            ("/v1.40/images/alpine/json", "/images/{name}/json"),
+            (
+                "/v2.0.0/libpod/images/quay.io/libpod/alpine:latest/history",
+                "/libpod/images/{name}/history",
+            ),
+            ("/v1.40/images/quay.io/libpod/alpine:latest", "/images/{name}"),
+            ("/v1.40/images/sha256:abc", "/images/{name}"),
+        ):
+            self.assertEqual(normalize_route(path), route, path)
+
+
+class TestRecorder(unittest.TestCase):
+    def setUp(self):
+        super().setUp()
+        self.server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.client = LibpodClient(
+            f"http://127.0.0.1:{self.server.server_address[1]}", prefix="/v2.0.0/libpod"
+        )
+        self.recorder = Recorder()
+        metrics.install(self.recorder)
+
+    def tearDown(self):
+        metrics.uninstall()
+        self.client.close()
+        self.server.shutdown()
+        self.server.server_close()
+        super().tearDown()
+
+    def test_record(self):
+        for _ in range(3):
+            self.client.get(f"/containers/{ID}/json")
+        self.client.get("/containers/missing/json")
+        self.client.post(f"/containers/{ID}/start", data=b"x" * 10)
+
+        report = self.recorder.report()["routes"]
+        self.assertEqual(
+            sorted(report),
+            ["GET /libpod/containers/{id}/json", "POST /libpod/containers/{id}/start"],
+        )
+        inspect = report["GET /libpod/containers/{id}/json"]
+        self.assertEqual(inspect["count"], 4)
+        self.assertEqual(inspect["errors"], 1)
+        self.assertEqual(inspect["bytes_in"], 4 * (len(ID) + 10))
+        self.assertEqual(sum(inspect["histogram"].values()), 4)
+        self.assertLessEqual(inspect["p50_ms"], inspect["max_ms"])
+        self.assertEqual(report["POST /libpod/containers/{id}/start"]["bytes_out"], 10)
+
+        with self.assertRaises(RuntimeError):
+            metrics.install(Recorder())
+
+    def test_write(self):
+        self.client.get(f"/containers/{ID}/json")
+        with tempfile.TemporaryDirectory() as tmp:
+            prefix = os.path.join(tmp, "run")
+            report = self.recorder.write(prefix)
+            with open(prefix + ".json") as f:
+                self.assertEqual(json.load(f), report)
+            with open(prefix + ".csv", newline="") as f:
+                rows = list(csv.DictReader(f))
+        self.assertEqual(rows[0]["route"], "GET /libpod/containers/{id}/json")
+        self.assertEqual(rows[0]["count"], "1")
+
+
+class TestCompare(unittest.TestCase):
+    @staticmethod
+    def report(**routes):
+        return {
+            "routes": {
+                route: {"count": count, "p90_ms": p90}
+                for route, (count, p90) in routes.items()
+            }
+        }
+
+    def test_compare(self):
+        baseline = self.report(start=(10, 10.0), stop=(10, 10.0), rare=(2, 1.0))
+        current = self.report(
+            start=(10, 30.0), stop=(10, 12.0), rare=(2, 50.0), new=(10, 99.0)
+        )
+        self.assertEqual(compare(baseline, current), [("start", 10.0, 30.0, 3.0)])
+        self.assertEqual(compare(baseline, current, threshold=4), [])
+
+        # sub millisecond routes do not flap on noise
+        baseline = self.report(ping=(10, 0.1))
+        current = self.report(ping=(10, 0.5))
+        self.assertEqual(compare(baseline, current), [])
+
+    def test_main(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            baseline = os.path.join(tmp, "baseline.json")
+            current = os.path.join(tmp, "current.json")
+            with open(baseline, "w") as f:
+                json.dump(self.report(start=(10, 10.0)), f)
+            with open(current, "w") as f:
+                json.dump(self.report(start=(10, 11.0)), f)
+
+            self.assertEqual(metrics.main(["compare", baseline, current]), 0)
+            self.assertEqual(
+                metrics.main(["compare", baseline, current, "--threshold", "1.05"]), 1
+            )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,91 @@
+import http.server
+import io
+import os
+import tempfile
+import threading
+import unittest
+
+from test.python.harness.profiling import SERVICE_TIME, Profiler
+
+
+class PprofHandler(http.server.BaseHTTPRequestHandler):
+    def do_GET(self):
+        kind = self.path.rsplit("/", 1)[-1]
+        body = f"{kind} profile".encode()
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestProfiler(unittest.TestCase):
+    def setUp(self):
+        super().setUp()
+        self.tmp = tempfile.TemporaryDirectory()
+        self.directory = os.path.join(self.tmp.name, "profiles")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+        super().tearDown()
+
+    def test_service_args(self):
+        profiler = Profiler(self.directory)
+        self.assertTrue(os.path.isdir(self.directory))
+        self.assertIsNone(profiler.cpu_profile)
+        self.assertEqual(
+            profiler.service_args(),
+            [
+                f"--time={SERVICE_TIME}",
+                f"--cpu-profile={os.path.join(self.directory, 'cpu.pprof')}",
+            ],
+        )
+        self.assertEqual(profiler.run_name("final"), "final")
+
+        # a restarted service does not overwrite the profile of its last run
+        args = profiler.service_args()
+        self.assertEqual(
+            args[1], f"--cpu-profile={os.path.join(self.directory, 'cpu.1.pprof')}"
+        )
+        self.assertEqual(
+            profiler.cpu_profile, os.path.join(self.directory, "cpu.1.pprof")
+        )
+        self.assertEqual(profiler.run_name("final"), "final.1")
+
+    def test_snapshot(self):
+        server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), PprofHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        try:
+            url = f"http://127.0.0.1:{server.server_address[1]}/debug/pprof"
+            profiler = Profiler(self.directory, url=url)
+            written = profiler.snapshot("TestApi")
+        finally:
+            server.shutdown()
+            server.server_close()
+
+        self.assertEqual(
+            [os.path.basename(p) for p in written],
+            ["TestApi.heap.pprof", "TestApi.allocs.pprof"],
+        )
+        with open(written[0], "rb") as f:
+            self.assertEqual(f.read(), b"heap profile")
+        self.assertEqual(profiler.snapshots, written)
+
+    def test_unavailable(self):
+        # nothing listens on the discard port
+        profiler = Profiler(self.directory, url="http://127.0.0.1:9/debug/pprof")
+        self.assertEqual(profiler.snapshot("final"), [])
+
+        # a killed service leaves an empty CPU profile behind
+        profiler.service_args()
+        open(profiler.cpu_profile, "wb").close()
+        self.assertIsNone(profiler.top_functions(profiler.cpu_profile))
+        stream = io.StringIO()
+        profiler.summarize(stream)
+        self.assertEqual(stream.getvalue(), "")
+
+
+if __name__ == "__main__":
+    unittest.main()
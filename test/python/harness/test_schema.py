@@ -0,0 +1,139 @@
+import unittest
+
+from test.python.harness.schema import Compiler, SchemaError, Schemas
+
+SPEC = {
+    "paths": {
+        "/images/json": {
+            "get": {"responses": {200: {"$ref": "#/responses/ImageSummary"}}}
+        },
+        "/images/{name:.*}/json": {
+            "get": {
+                "responses": {"200": {"schema": {"$ref": "#/definitions/ImageInspect"}}}
+            }
+        },
+        "/libpod/volumes/{name}": {
+            "delete": {"responses": {"204": {"description": "no error"}}}
+        },
+    },
+    "responses": {
+        "ImageSummary": {
+            "schema": {
+                "type": "array",
+                "items": {"$ref": "#/definitions/ImageSummary"},
+            }
+        }
+    },
+    "definitions": {
+        "ImageSummary": {
+            "type": "object",
+            "required": ["Id"],
+            "properties": {
+                "Id": {"type": "string"},
+                "Size": {"type": "integer", "format": "int64"},
+                "RepoTags": {"type": "array", "items": {"type": "string"}},
+                "Labels": {
+                    "type": "object",
+                    "additionalProperties": {"type": "string"},
+                },
+            },
+        },
+        "ImageInspect": {
+            "allOf": [
+                {"$ref": "#/definitions/ImageSummary"},
+                {"properties": {"Parent": {"$ref": "#/definitions/ImageInspect"}}},
+            ]
+        },
+    },
+}
+
+
+def image(**overrides):
+    obj = {"Id": "sha256:abc", "Size": 5, "RepoTags": ["alpine:latest"], "Labels": {}}
+    obj.update(overrides)
+    return obj
+
+
+class TestCompiler(unittest.TestCase):
+    def setUp(self):
+        super().setUp()
+        self.check = Compiler(SPEC).compile({"$ref": "#/definitions/ImageSummary"})
+
+    def assertInvalid(self, value, message):
+        with self.assertRaises(SchemaError) as e:
+            self.check(value)
+        self.assertEqual(str(e.exception), message)
+
+    def test_valid(self):
+        self.check(image())
+        # Go encodes nil slices and maps as null
+        self.check(image(RepoTags=None, Labels=None, Extra=[1]))
+
+    def test_invalid(self):
+        self.assertInvalid(image(Size="5"), "$.Size: expected integer, got str")
+        self.assertInvalid(image(Size=True), "$.Size: expected integer, got bool")
+        self.assertInvalid(
+            image(RepoTags=["a", None]), "$.RepoTags[1]: expected string, got null"
+        )
+        self.assertInvalid(
+            image(Labels={"a": 1}), "$.Labels.a: expected string, got int"
+        )
+        self.assertInvalid({"Size": 1}, "$: missing required keys ['Id']")
+        self.assertInvalid([], "$: expected object, got list")
+
+    def test_recursive(self):
+        check = Compiler(SPEC).compile({"$ref": "#/definitions/ImageInspect"})
+        check(image(Parent=image(Parent=None)))
+        with self.assertRaises(SchemaError) as e:
+            check(image(Parent=image(Parent=image(Id=1))))
+        self.assertEqual(
+            str(e.exception), "$.Parent.Parent.Id: expected string, got int"
+        )
+
+
+class TestSchemas(unittest.TestCase):
+    def setUp(self):
+        super().setUp()
+        self.schemas = Schemas(SPEC)
+
+    def test_route(self):
+        self.assertEqual(
+            self.schemas.route("GET", "/v1.40/images/json"), "/images/json"
+        )
+        self.assertEqual(
+            self.schemas.route("get", "/v1.40/images/quay.io/libpod/alpine/json?x=1"),
+            "/images/{name:.*}/json",
+        )
+        self.assertEqual(
+            self.schemas.route("DELETE", "/v2.0.0/libpod/volumes/data"),
+            "/libpod/volumes/{name}",
+        )
+        with self.assertRaises(KeyError):
+            self.schemas.route("POST", "/v1.40/images/json")
+
+    def test_response(self):
+        validate = self.schemas.response("GET", "/v1.40/images/json")
+        self.assertIs(validate, self.schemas.response("GET", "/images/json"))
+        validate([image() for _ in range(1000)])
+        self.assertEqual(validate.objects, 1000)
+        self.assertGreater(validate.rate, 0)
+
+        with self.assertRaises(SchemaError) as e:
+            validate([image(), image(Size=None)])
+        self.assertEqual(str(e.exception), "$[1].Size: expected integer, got null")
+
+        # responses without a body accept anything
+        self.schemas.response("DELETE", "/libpod/volumes/data", status=204)(None)
+        with self.assertRaises(KeyError):
+            self.schemas.response("GET", "/images/json", status=404)
+
+    def test_require(self):
+        validate = self.schemas.response("GET", "/images/json", require=("Containers",))
+        validate([image(Containers=0)])
+        with self.assertRaises(SchemaError) as e:
+            validate([image(Containers=0), image()])
+        self.assertEqual(str(e.exception), "$[1]: missing required keys ['Containers']")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,107 @@
+import os
+import tempfile
+import unittest
+
+from test.python.harness.metrics import Call
+from test.python.harness.servicelog import (
+    RotatingFile,
+    ServiceLog,
+    Timing,
+    attribute,
+    join,
+    parse_line,
+)
+
+RID = "0d4f3c1e-6a0b-4f7e-9d35-1f2b3c4d5e6f"
+
+
+def handler(rid, method, url, phase, level="debug"):
+    return (
+        f'time="2021-03-02T10:11:12Z" level={level} '
+        f'msg="APIHandler({rid}) -- {method} {url} {phase}"\n'
+    ).encode()
+
+
+class TestServiceLog(unittest.TestCase):
+    def test_parse_line(self):
+        self.assertEqual(
+            parse_line(handler(RID, "GET", "/v1.40/info", "BEGIN").decode()),
+            (RID, "GET", "/v1.40/info", "BEGIN"),
+        )
+        self.assertIsNone(parse_line(f'level=debug msg="APIHandler({RID}) -- Header: '))
+        self.assertIsNone(parse_line('level=info msg="Setting parallel job count"'))
+
+    def test_timings(self):
+        log = ServiceLog(tail_lines=3)
+        log.feed(handler("a", "GET", "/v1.40/info", "BEGIN", "info"), 10.0)
+        log.feed(handler("b", "POST", "/v1.40/containers/x/start", "BEGIN"), 10.1)
+        log.feed(b'level=debug msg="APIHandler(a) -- Header: Accept=[*/*]"\n', 10.2)
+        log.feed(handler("a", "GET", "/v1.40/info", "END"), 10.5)
+        log.feed(handler("c", "GET", "/v1.40/_ping", "END"), 10.6)
+
+        self.assertEqual(
+            list(log.timings), [Timing("a", "GET", "/v1.40/info", 10.0, 10.5)]
+        )
+        self.assertEqual(len(log.tail), 3)
+        self.assertIn("END", log.tail[-1])
+
+    def test_follow(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "service.log")
+            log = ServiceLog(path)
+            read, write = os.pipe()
+            thread = log.follow(os.fdopen(read, "rb"))
+            with os.fdopen(write, "wb") as pipe:
+                pipe.write(handler(RID, "GET", "/v1.40/info", "BEGIN"))
+                pipe.write(handler(RID, "GET", "/v1.40/info", "END"))
+            thread.join(timeout=5)
+            log.close()
+
+            self.assertEqual(len(log.timings), 1)
+            with open(path, "rb") as f:
+                self.assertEqual(len(f.readlines()), 2)
+
+    def test_rotate(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "service.log")
+            f = RotatingFile(path, max_bytes=10, backups=2)
+            for line in (b"first\n", b"second\n", b"third\n", b"fourth\n"):
+                f.write(line)
+            f.close()
+
+            self.assertEqual(
+                sorted(os.listdir(tmp)),
+                ["service.log", "service.log.1", "service.log.2"],
+            )
+            with open(path, "rb") as f:
+                self.assertEqual(f.read(), b"fourth\n")
+            with open(path + ".2", "rb") as f:
+                self.assertEqual(f.read(), b"second\n")
+
+
+class TestJoin(unittest.TestCase):
+    def test_join(self):
+        timings = [
+            Timing("early", "GET", "/v1.40/info", 1.0, 1.1),
+            Timing("a", "GET", "/v1.40/info", 5.01, 5.03),
+            Timing("b", "GET", "/v1.40/info", 6.01, 6.02),
+            Timing("c", "POST", "/v1.40/containers/x/start", 7.01, 7.09),
+        ]
+        calls = [
+            Call("GET", "/v1.40/info", 5.0, 0.05, 200),
+            Call("GET", "/v1.40/info", 6.0, 0.04, 200),
+            Call("POST", "/v1.40/containers/x/start", 7.0, 0.1, 204),
+            # never reached the service
+            Call("GET", "/v1.40/version", 8.0, 0.01, 200),
+        ]
+        pairs = join(timings, calls)
+        self.assertEqual([t.rid for _, t in pairs], ["a", "b", "c"])
+
+        report = attribute(pairs)
+        self.assertEqual(report["GET /info"]["count"], 2)
+        self.assertEqual(report["POST /containers/{id}/start"]["server_p50_ms"], 80.0)
+        self.assertEqual(report["POST /containers/{id}/start"]["outside_p50_ms"], 20.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
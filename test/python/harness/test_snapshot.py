@@ -0,0 +1,89 @@
+import os
+import tempfile
+import unittest
+
+from test.python.harness.snapshot import MODES, CloneError, clone_tree, remove_tree
+
+
+class TestCloneTree(unittest.TestCase):
+    def setUp(self):
+        super().setUp()
+        self.directory = tempfile.TemporaryDirectory(prefix="podman_snapshot_")
+        self.src = os.path.join(self.directory.name, "crio")
+        os.makedirs(os.path.join(self.src, "vfs", "dir", "layer"))
+        os.makedirs(os.path.join(self.src, "libpod"))
+        self.files = {
+            "vfs/dir/layer/data": "layer",
+            "vfs-layers/layers.json": "[]",
+            "vfs-layers/layers.lock": "lock",
+            "libpod/bolt_state.db": "db",
+        }
+        for name, content in self.files.items():
+            path = os.path.join(self.src, name)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "w") as f:
+                f.write(content)
+
+    def tearDown(self):
+        self.directory.cleanup()
+        return super().tearDown()
+
+    def assertCloned(self, dst):
+        for name, content in self.files.items():
+            with open(os.path.join(dst, name)) as f:
+                self.assertEqual(f.read(), content, name)
+
+    def test_hardlink(self):
+        dst = os.path.join(self.directory.name, "clone")
+        self.assertEqual(clone_tree(self.src, dst, "hardlink"), "hardlink")
+        self.assertCloned(dst)
+
+        def same(name):
+            return os.path.samefile(
+                os.path.join(self.src, name), os.path.join(dst, name)
+            )
+
+        self.assertTrue(same("vfs/dir/layer/data"))
+        self.assertFalse(same("libpod/bolt_state.db"))
+        self.assertFalse(same("vfs-layers/layers.lock"))
+
+    def test_copy(self):
+        dst = os.path.join(self.directory.name, "clone")
+        self.assertEqual(clone_tree(self.src, dst, "copy"), "copy")
+        self.assertCloned(dst)
+        self.assertFalse(
+            os.path.samefile(
+                os.path.join(self.src, "vfs/dir/layer/data"),
+                os.path.join(dst, "vfs/dir/layer/data"),
+            )
+        )
+
+    def test_fallback(self):
+        dst = os.path.join(self.directory.name, "clone")
+        self.assertIn(clone_tree(self.src, dst), MODES)
+        self.assertCloned(dst)
+
+    def test_missing_source(self):
+        with self.assertRaises(CloneError):
+            clone_tree(
+                os.path.join(self.directory.name, "missing"),
+                os.path.join(self.directory.name, "clone"),
+            )
+
+    def test_existing_destination(self):
+        # cp -a would nest the clone as clone/crio
+        dst = os.path.join(self.directory.name, "clone")
+        os.makedirs(dst)
+        with self.assertRaises(CloneError):
+            clone_tree(self.src, dst)
+        self.assertEqual(os.listdir(dst), [])
+
+    def test_remove_tree(self):
+        remove_tree(self.src)
+        self.assertFalse(os.path.exists(self.src))
+        # a missing tree is not an error
+        remove_tree(self.src)
+
+
+if __name__ == "__main__":
+    unittest.main()
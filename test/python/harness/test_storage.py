@@ -0,0 +1,57 @@
+import os
+import tempfile
+import unittest
+
+from test.python.harness import storage
+
+MOUNTS = """\
+overlay / overlay rw,relatime,lowerdir=/l,upperdir=/u,workdir=/w 0 0
+proc /proc proc rw,nosuid,nodev,noexec,relatime 0 0
+tmpfs /tmp tmpfs rw,nosuid,nodev 0 0
+/dev/sda1 /var/lib/containers ext4 rw,relatime 0 0
+/dev/sdb1 /mnt/with\\040blank xfs rw,relatime 0 0
+"""
+
+
+class TestStorage(unittest.TestCase):
+    def setUp(self):
+        super().setUp()
+        fd, self.mounts = tempfile.mkstemp(prefix="podman_mounts_")
+        with os.fdopen(fd, "w") as f:
+            f.write(MOUNTS)
+
+    def tearDown(self):
+        os.unlink(self.mounts)
+        return super().tearDown()
+
+    def fstype(self, path):
+        return storage.backing_filesystem(path, mounts=self.mounts)
+
+    def test_backing_filesystem(self):
+        self.assertEqual(self.fstype("/home/user"), "overlay")
+        self.assertEqual(self.fstype("/tmp"), "tmpfs")
+        self.assertEqual(self.fstype("/var/lib/containers/storage"), "ext4")
+        self.assertEqual(self.fstype("/var/lib/containersX"), "overlay")
+        self.assertEqual(self.fstype("/mnt/with blank/root"), "xfs")
+
+    def test_backing_filesystem_unknown(self):
+        self.assertIsNone(
+            storage.backing_filesystem("/", mounts="/proc/does/not/exist")
+        )
+
+    def test_driver_options(self):
+        self.assertEqual(storage.driver_options("vfs"), ["--storage-driver=vfs"])
+        self.assertEqual(
+            storage.driver_options("overlay"), ["--storage-driver=overlay"]
+        )
+        with self.assertRaises(ValueError):
+            storage.driver_options("btrfs")
+
+    def test_available_drivers(self):
+        drivers = storage.available_drivers(tempfile.gettempdir())
+        self.assertEqual(drivers[-1], "vfs")
+        self.assertTrue(set(drivers) <= set(storage.DRIVERS))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,100 @@
+import http.server
+import json
+import threading
+import time
+import unittest
+
+from test.python.harness.client import LibpodClient
+from test.python.harness.stream import JSONStreamDecoder, StreamDecodeError
+
+
+class ChunkedHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for i in range(3):
+            data = json.dumps({"status": "Downloading", "progress": i}).encode()
+            for part in (data[:7], data[7:] + b"\n"):
+                self.wfile.write(b"%x\r\n%s\r\n" % (len(part), part))
+                self.wfile.flush()
+            time.sleep(0.05)
+        self.wfile.write(b"0\r\n\r\n")
+
+    def log_message(self, *args):
+        pass
+
+
+class TestJSONStreamDecoder(unittest.TestCase):
+    def test_split_objects(self):
+        decoder = JSONStreamDecoder()
+        self.assertEqual(decoder.feed(b'{"a": '), [])
+        self.assertEqual(decoder.feed(b'1}\n{"b"'), [{"a": 1}])
+        self.assertEqual(decoder.feed(b": 2}\n"), [{"b": 2}])
+        self.assertEqual(decoder.close(), [])
+        self.assertEqual(decoder.objects, 2)
+
+    def test_concatenated_objects(self):
+        decoder = JSONStreamDecoder()
+        self.assertEqual(decoder.feed(b'{"a": 1}{"b": 2}\r\n\n'), [{"a": 1}, {"b": 2}])
+
+    def test_multibyte_character_split(self):
+        decoder = JSONStreamDecoder()
+        data = json.dumps({"stream": "été"}, ensure_ascii=False).encode()
+        self.assertEqual(decoder.feed(data[:13]), [])
+        self.assertEqual(decoder.feed(data[13:] + b"\n"), [{"stream": "été"}])
+
+    def test_trailing_object(self):
+        decoder = JSONStreamDecoder()
+        self.assertEqual(decoder.feed(b'{"id": "abc"}'), [])
+        self.assertEqual(decoder.close(), [{"id": "abc"}])
+
+    def test_truncated(self):
+        decoder = JSONStreamDecoder()
+        decoder.feed(b'{"id": ')
+        with self.assertRaises(StreamDecodeError):
+            decoder.close()
+
+    def test_bounded_buffer(self):
+        decoder = JSONStreamDecoder(max_buffer=64)
+        for _ in range(100):
+            decoder.feed(b'{"stream": "' + b"x" * 40 + b'"}\n')
+        self.assertLessEqual(decoder.peak_buffer, 64)
+
+        with self.assertRaises(StreamDecodeError):
+            decoder.feed(b'{"stream": "' + b"x" * 100)
+
+
+class TestJSONStream(unittest.TestCase):
+    def setUp(self):
+        super().setUp()
+        self.server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), ChunkedHandler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.client = LibpodClient(
+            f"http://127.0.0.1:{self.server.server_address[1]}", prefix=""
+        )
+
+    def tearDown(self):
+        self.client.close()
+        self.server.shutdown()
+        self.server.server_close()
+        return super().tearDown()
+
+    def test_incremental(self):
+        arrivals = []
+        with self.client.stream_json("GET", "/events") as stream:
+            for obj in stream:
+                arrivals.append((obj["progress"], time.perf_counter()))
+
+        self.assertEqual([p for p, _ in arrivals], [0, 1, 2])
+        # the first object is yielded before the stream ends
+        self.assertGreater(arrivals[-1][1] - arrivals[0][1], 0.05)
+        self.assertLess(stream.stats["time_to_first"], stream.stats["elapsed"])
+        self.assertEqual(stream.stats["objects"], 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
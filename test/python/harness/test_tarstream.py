@@ -0,0 +1,111 @@
+import hashlib
+import io
+import os
+import tarfile
+import tempfile
+import unittest
+
+from test.python.harness.tarstream import (
+    RECORD,
+    TarStream,
+    dir_member,
+    directory_members,
+    file_member,
+    read_members,
+)
+
+
+class TestTarStream(unittest.TestCase):
+    def setUp(self):
+        super().setUp()
+        self.directory = tempfile.TemporaryDirectory(prefix="podman_tarstream_")
+        self.root = self.directory.name
+
+    def tearDown(self):
+        self.directory.cleanup()
+        super().tearDown()
+
+    def test_directory(self):
+        os.makedirs(os.path.join(self.root, "a", "b" * 120))
+        with open(os.path.join(self.root, "Dockerfile"), "w") as f:
+            f.write("FROM alpine\n")
+        big = os.urandom(3 * 1024 * 1024 + 5)
+        with open(os.path.join(self.root, "a", "b" * 120, "big"), "wb") as f:
+            f.write(big)
+        os.symlink("Dockerfile", os.path.join(self.root, "link"))
+        os.link(os.path.join(self.root, "Dockerfile"), os.path.join(self.root, "hard"))
+
+        stream = TarStream(directory_members(self.root), chunk=64 * 1024)
+        chunks = list(stream)
+        data = b"".join(chunks)
+        self.assertEqual(stream.bytes, len(data))
+        self.assertEqual(len(data) % RECORD, 0)
+        self.assertLessEqual(max(map(len, chunks)), 64 * 1024)
+        self.assertIsNotNone(stream.finished)
+
+        with tarfile.open(fileobj=io.BytesIO(data)) as tar:
+            members = {m.name: m for m in tar.getmembers()}
+            self.assertEqual(
+                sorted(members),
+                sorted(
+                    [
+                        "a",
+                        "a/" + "b" * 120,
+                        "a/" + "b" * 120 + "/big",
+                        "Dockerfile",
+                        "hard",
+                        "link",
+                    ]
+                ),
+            )
+            self.assertEqual(stream.members, len(members))
+            self.assertEqual(tar.extractfile("a/" + "b" * 120 + "/big").read(), big)
+            self.assertEqual(tar.extractfile("Dockerfile").read(), b"FROM alpine\n")
+            self.assertTrue(members["link"].issym())
+            self.assertTrue(members["hard"].islnk())
+            self.assertTrue(members["a"].isdir())
+
+    def test_generated_members(self):
+        def members():
+            yield dir_member("context"), None
+            for i in range(1000):
+                yield file_member(f"context/{i}", 3), b"%03d" % i
+            yield file_member("context/stream", 10), io.BytesIO(b"0123456789")
+
+        stream = TarStream(members(), chunk=4096)
+        data = b"".join(stream)
+        with tarfile.open(fileobj=io.BytesIO(data)) as tar:
+            self.assertEqual(len(tar.getmembers()), 1002)
+            self.assertEqual(tar.extractfile("context/999").read(), b"999")
+            self.assertEqual(tar.extractfile("context/stream").read(), b"0123456789")
+
+        # a file shorter than its header would corrupt the archive
+        short = TarStream([(file_member("short", 10), io.BytesIO(b"0123"))])
+        with self.assertRaises(OSError):
+            list(short)
+
+    def test_read_members(self):
+        content = os.urandom(200 * 1024)
+        stream = TarStream(
+            [
+                (dir_member("tree"), None),
+                (file_member("tree/data", len(content)), content),
+                (file_member("tree/empty", 0), None),
+            ]
+        )
+        members = [
+            (info.name, digest)
+            for info, digest in read_members(io.BytesIO(b"".join(stream)), chunk=4096)
+        ]
+        self.assertEqual(
+            members,
+            [
+                ("tree", None),
+                ("tree/data", hashlib.sha256(content).hexdigest()),
+                ("tree/empty", hashlib.sha256(b"").hexdigest()),
+            ],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
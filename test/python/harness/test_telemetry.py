@@ -0,0 +1,86 @@
+import unittest
+
+from test.python.harness.telemetry import ContainerSeries, RingBuffer, StatsCollector
+
+
+def report(id, second, **overrides):
+    stats = {
+        "ContainerID": id,
+        "CPU": float(second),
+        "CPUNano": second * 1000,
+        "MemUsage": 1024 * second,
+        "NetInput": 100 * second,
+        "NetOutput": 0,
+        "BlockInput": 0,
+        "BlockOutput": 4096 * second,
+        "PIDs": 1,
+    }
+    stats.update(overrides)
+    return stats
+
+
+class TestRingBuffer(unittest.TestCase):
+    def test_wraps(self):
+        buffer = RingBuffer(4, "Q")
+        self.assertIsNone(buffer.last())
+        for value in range(1, 7):
+            buffer.append(value)
+
+        self.assertEqual(len(buffer), 4)
+        self.assertEqual(buffer.values(), [3, 4, 5, 6])
+        self.assertEqual(buffer.first(), 3)
+        self.assertEqual(buffer.last(), 6)
+        self.assertEqual(buffer.max(), 6)
+        self.assertEqual(buffer.mean(), 4.5)
+
+    def test_partial(self):
+        buffer = RingBuffer(10)
+        for value in (3.0, 1.0, 2.0):
+            buffer.append(value)
+        self.assertEqual(buffer.values(), [3.0, 1.0, 2.0])
+        self.assertEqual(buffer.first(), 3.0)
+        self.assertEqual(buffer.percentile(50), 2.0)
+
+    def test_percentile(self):
+        buffer = RingBuffer(100)
+        for value in range(1, 101):
+            buffer.append(value)
+        self.assertEqual(buffer.percentile(95), 95)
+        self.assertEqual(buffer.percentile(100), 100)
+
+    def test_fixed_size(self):
+        buffer = RingBuffer(60, "Q")
+        self.assertEqual(buffer.nbytes, 60 * 8)
+        for value in range(1000):
+            buffer.append(value)
+        self.assertEqual(buffer.nbytes, 60 * 8)
+
+
+class TestStatsCollector(unittest.TestCase):
+    def test_record(self):
+        collector = StatsCollector(api=None, capacity=5)
+        for second in range(10):
+            collector.record(
+                {"Error": None, "Stats": [report("a", second), report("b", second)]},
+                timestamp=float(second),
+            )
+
+        self.assertEqual(sorted(collector.series), ["a", "b"])
+        self.assertEqual(collector.nbytes, 2 * ContainerSeries(5).nbytes)
+
+        aggregates = collector.aggregates()["a"]
+        self.assertEqual(aggregates["samples"], 5)
+        self.assertEqual(aggregates["net_input"]["rate"], 100.0)
+        self.assertEqual(aggregates["block_output"]["rate"], 4096.0)
+        self.assertEqual(aggregates["cpu"]["max"], 9.0)
+        self.assertEqual(aggregates["mem_usage"]["p95"], 9 * 1024)
+
+    def test_errors(self):
+        collector = StatsCollector(api=None)
+        collector.record({"Error": "container is not running", "Stats": None})
+        self.assertEqual(collector.errors, ["container is not running"])
+        self.assertEqual(collector.series, {})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,114 @@
+import http.server
+import json
+import queue
+import threading
+import time
+import unittest
+
+from test.python.harness.client import LibpodClient
+from test.python.harness.waiter import StateWaiter
+
+ID = "a" * 64
+
+
+def event(action, id=ID):
+    return {"Type": "container", "Action": action, "Actor": {"ID": id}}
+
+
+class EventsHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        if self.path.startswith("/events"):
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            while True:
+                obj = self.server.events.get()
+                if obj is None:
+                    break
+                data = json.dumps(obj).encode() + b"\n"
+                self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+                self.wfile.flush()
+            self.wfile.write(b"0\r\n\r\n")
+            return
+
+        self.server.inspections += 1
+        body = json.dumps({"Id": ID, "State": {"Status": self.server.state}}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestStateWaiter(unittest.TestCase):
+    def setUp(self):
+        super().setUp()
+        self.server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), EventsHandler)
+        self.server.events = queue.Queue()
+        self.server.state = "created"
+        self.server.inspections = 0
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+        self.client = LibpodClient(
+            f"http://127.0.0.1:{self.server.server_address[1]}", prefix=""
+        )
+        self.waiter = StateWaiter(self.client, timeout=5).start()
+
+    def tearDown(self):
+        self.server.events.put(None)
+        self.waiter.close()
+        self.client.close()
+        self.server.shutdown()
+        self.server.server_close()
+        return super().tearDown()
+
+    def test_resolved_by_event(self):
+        future = self.waiter.expect(ID[:12], "running")
+        self.assertFalse(future.done())
+
+        started = time.perf_counter()
+        self.server.events.put(event("start"))
+        self.assertEqual(future.result(timeout=5)["Action"], "start")
+        self.assertLess(time.perf_counter() - started, 1)
+        self.assertEqual(self.server.inspections, 1)
+
+    def test_current_state(self):
+        self.server.state = "running"
+        self.assertIsNone(self.waiter.wait_for(ID, "running"))
+
+    def test_exit_states(self):
+        future = self.waiter.expect(ID, ("stopped", "exited"))
+        self.server.events.put(event("kill"))
+        self.server.events.put(event("start", id="b" * 64))
+        self.server.events.put(event("died"))
+        self.assertEqual(future.result(timeout=5)["Action"], "died")
+
+    def test_timeout(self):
+        with self.assertRaises(TimeoutError):
+            self.waiter.wait_for(ID, "paused", timeout=0.2)
+
+        # the cancelled wait does not trip up later ones
+        future = self.waiter.expect(ID, "paused")
+        self.server.events.put(event("pause"))
+        self.assertEqual(future.result(timeout=5)["Action"], "pause")
+
+    def test_close_interrupts_read(self):
+        # no event is sent, the reader is blocked in recv() when closing
+        future = self.waiter.expect(ID, "running")
+        thread = self.waiter._thread
+        started = time.perf_counter()
+        self.waiter.close()
+        self.assertLess(time.perf_counter() - started, 1)
+        self.assertFalse(thread.is_alive())
+        self.assertTrue(future.cancelled())
+        self.assertEqual(self.waiter.errors, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,80 @@
+"""requests transport for a podman service listening on a unix domain socket
+
+URLs use the http+unix scheme with the quoted socket path as host, e.g.
+http+unix://%2Frun%2Fpodman%2Fpodman.sock/_ping
+"""
+import socket
+import urllib.parse
+
+import urllib3
+import urllib3.connection
+import urllib3.connectionpool
+from requests.adapters import HTTPAdapter
+
+SCHEME = "http+unix://"
+
+
+def unix_url(path):
+    """Return the http+unix base URL for the socket at path"""
+    return SCHEME + urllib.parse.quote(path, safe="")
+
+
+def socket_path(url):
+    """Return the socket path from an http+unix URL"""
+    netloc = urllib.parse.urlsplit(url).netloc
+    return urllib.parse.unquote(netloc)
+
+
+class UnixHTTPConnection(urllib3.connection.HTTPConnection):
+    def __init__(self, path, **kwargs):
+        super().__init__("localhost", **kwargs)
+        self.path = path
+
+    def connect(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        # urllib3 may hand over a sentinel rather than a number
+        if isinstance(self.timeout, (int, float)):
+            sock.settimeout(self.timeout)
+        try:
+            sock.connect(self.path)
+        except OSError:
+            sock.close()
+            raise
+        self.sock = sock
+
+
+class UnixHTTPConnectionPool(urllib3.connectionpool.HTTPConnectionPool):
+    def __init__(self, path, **kwargs):
+        super().__init__("localhost", **kwargs)
+        self.path = path
+
+    def _new_conn(self):
+        self.num_connections += 1
+        return UnixHTTPConnection(self.path, timeout=self.timeout.connect_timeout)
+
+
+class UnixHTTPAdapter(HTTPAdapter):
+    """Adapter sending every request to one unix domain socket"""
+
+    def __init__(self, path, pool_maxsize=10, pool_block=False):
+        self.path = path
+        self._unix_pool = UnixHTTPConnectionPool(
+            path, maxsize=pool_maxsize, block=pool_block
+        )
+        super().__init__(
+            pool_connections=1, pool_maxsize=pool_maxsize, pool_block=pool_block
+        )
+
+    def get_connection(self, url, proxies=None):
+        return self._unix_pool
+
+    def get_connection_with_tls_context(self, request, verify, proxies=None, cert=None):
+        return self._unix_pool
+
+    def request_url(self, request, proxies):
+        # proxies do not apply and the host is the socket path
+        return request.path_url
+
+    def close(self):
+        super().close()
+        self._unix_pool.close()
@@ -0,0 +1,208 @@
+"""Wait for container state changes reported by the events stream
+
+StateWaiter keeps one /events subscription open for the whole service and
+resolves waits as soon as the matching event is read, instead of each
+test re-querying /containers/json or calling reload():
+
+    waiter = session.waiter
+    waiter.wait_for(id, "running", timeout=10)
+
+An event raced by the call that causes it is not missed if the wait is
+registered first:
+
+    stopped = waiter.expect(id, "exited")
+    top.stop()
+    stopped.result(timeout=10)
+"""
+import concurrent.futures
+import socket
+import threading
+
+# container event actions and the state each one leaves the container in
+ACTIONS = {
+    "create": "created",
+    "init": "initialized",
+    "start": "running",
+    "restart": "running",
+    "unpause": "running",
+    "pause": "paused",
+    "stop": "exited",
+    "died": "exited",
+    "remove": "removed",
+}
+
+# states a container is in once its process has ended
+EXIT_STATES = ("stopped", "exited")
+
+
+def _shutdown(response):
+    """Shut down the socket a streamed response is read from"""
+    sock = getattr(response.raw.connection, "sock", None)
+    if sock is None:
+        return
+    try:
+        sock.shutdown(socket.SHUT_RDWR)
+    except OSError:
+        # the peer already closed it
+        pass
+
+
+class StateWaiter(object):
+    """Resolve futures on container state changes over a single /events connection"""
+
+    def __init__(self, api, timeout=30):
+        """
+        :param api: LibpodClient on the service
+        :param timeout: seconds wait_for() waits by default
+        """
+        self.api = api
+        self.timeout = timeout
+        self.stream = None
+        self.errors = []
+        # container id: (state, sequence number of the event reporting it)
+        self.states = {}
+        self.events = 0
+
+        self._lock = threading.Lock()
+        self._pending = []
+        self._thread = None
+        self._stopping = threading.Event()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    @property
+    def alive(self):
+        """True while the subscription is being read"""
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        """Subscribe to container events from now on"""
+        filters = '{"type": ["container"]}'
+        self.stream = self.api.stream_json(
+            "GET", "/events", params={"stream": "true", "filters": filters}
+        )
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._read, daemon=True)
+        self._thread.start()
+        return self
+
+    def _read(self):
+        try:
+            for event in self.stream:
+                self.record(event)
+        except Exception as e:
+            # close() ends the read by shutting the connection under it down
+            if not self._stopping.is_set():
+                self.errors.append(str(e))
+
+    def record(self, event):
+        """Note the state an event leaves its container in and resolve its waits"""
+        state = ACTIONS.get(event.get("Action") or event.get("status"))
+        id = (event.get("Actor") or {}).get("ID") or event.get("id")
+        if state is None or not id:
+            return
+
+        with self._lock:
+            self.events += 1
+            self.states[id] = (state, self.events)
+            pending = []
+            for wanted_id, states, future in self._pending:
+                if future.done():
+                    # cancelled by a timed out wait_for()
+                    continue
+                if wanted_id == id and state in states:
+                    future.set_result(event)
+                else:
+                    pending.append((wanted_id, states, future))
+            self._pending = pending
+
+    def close(self):
+        """End the subscription, waits still pending are cancelled"""
+        self._stopping.set()
+        if self.stream is not None:
+            # closing the socket from this thread does not wake a recv()
+            # blocked on it in the reader, shutting it down does
+            _shutdown(self.stream.response)
+            self.stream.close()
+            self._thread.join(timeout=2.5)
+            self.stream = None
+
+        with self._lock:
+            for _, _, future in self._pending:
+                future.cancel()
+            self._pending = []
+
+    def _inspect(self, id):
+        """Return the full id and the current state of a container"""
+        r = self.api.get(f"/containers/{id}/json")
+        if r.status_code == 404:
+            return id, "removed"
+        r.raise_for_status()
+        obj = r.json()
+        return obj["Id"], obj["State"]["Status"]
+
+    def expect(self, id, states):
+        """Return a future resolved by the next event leaving id in one of states
+
+        The result is the event, or None when the container was already in
+        one of the states and no event was needed.
+
+        :param id: container id or name
+        :param states: state or tuple of states, e.g. "running" or EXIT_STATES
+        """
+        states = (states,) if isinstance(states, str) else tuple(states)
+        if not self.alive:
+            raise RuntimeError("StateWaiter is not subscribed, call start()")
+        future = concurrent.futures.Future()
+
+        seen = self.events
+        full_id, current = self._inspect(id)
+        with self._lock:
+            state, sequence = self.states.get(full_id, (None, 0))
+            # the state may have been reached between inspecting and registering
+            if current in states or (sequence > seen and state in states):
+                future.set_result(None)
+            else:
+                self._pending.append((full_id, states, future))
+        return future
+
+    def wait_for(self, id, states, timeout=None):
+        """Block until the container is in one of states
+
+        Exit states fall back to /containers/{id}/wait when the subscription
+        is down.
+
+        :return: the event that resolved the wait, None if no event was needed
+        :raises TimeoutError: the state was not reached within timeout seconds
+        """
+        timeout = self.timeout if timeout is None else timeout
+        states = (states,) if isinstance(states, str) else tuple(states)
+        if not self.alive and set(states) <= set(EXIT_STATES):
+            return self._wait_exit(id, states, timeout)
+
+        future = self.expect(id, states)
+        try:
+            return future.result(timeout=timeout)
+        except concurrent.futures.TimeoutError:
+            future.cancel()
+            raise TimeoutError(
+                f"container {id} did not reach {'|'.join(states)} within {timeout}s"
+            ) from None
+
+    def _wait_exit(self, id, states, timeout):
+        r = self.api.post(
+            f"/containers/{id}/wait",
+            params={"condition": list(states)},
+            timeout=timeout,
+        )
+        if r.status_code == 404:
+            return None
+        r.raise_for_status()
+        return {
+            "Action": "died",
+            "Actor": {"ID": id, "Attributes": {"containerExitCode": r.text.strip()}},
+        }